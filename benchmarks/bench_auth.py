@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark logins at several password hashing costs, with concurrent
+callers, to pick PASSWORD_ITERATIONS.
+
+    python3 benchmarks/bench_auth.py --costs 100000,200000,400000 --concurrency 8 --target-p99-ms 250
+    python3 benchmarks/bench_auth.py --output auth.json
+    python3 benchmarks/bench_auth.py --compare auth.json
+
+For every cost the users' passwords are re-hashed at that cost and
+--concurrency threads log in at once, like that many server workers. Each
+cost reports successful logins, wrong passwords and unknown user names
+(which should all take about as long), plus the first login after the cost
+was raised, which also stores the new hash. These go straight to
+PantryVault.open_session, the path a login takes when auth.py's cache
+misses and nothing is throttled; login_cached times UserCRUD.authenticate_user
+for users verified moments before. The highest cost whose login
+p99 stays under --target-p99-ms is reported as the recommendation; the run
+exits non-zero when no cost meets the target.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import use_local_database, summarize, run_metadata, write_report, compare_reports
+
+PASSWORD = 'benchmark-password'
+
+
+def parse_costs(value):
+    try:
+        costs = sorted({int(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError("costs must be a comma-separated list of iteration counts")
+    if not costs or min(costs) < 1:
+        raise argparse.ArgumentTypeError("costs must be positive")
+    return costs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark password verification cost against a login latency target")
+    parser.add_argument('--costs', type=parse_costs, default=None,
+                        help="PBKDF2 iteration counts to try (default: half, once and twice PASSWORD_ITERATIONS)")
+    parser.add_argument('--concurrency', type=int, default=None, help="Concurrent logins (default SERVER_WORKERS)")
+    parser.add_argument('--logins', type=int, default=100, help="Logins timed per cost and outcome (default 100)")
+    parser.add_argument('--target-p99-ms', type=float, default=250.0, help="Login p99 the cost must stay under (default 250)")
+    parser.add_argument('--db', default=':memory:', help="SQLite file to use; default in-memory")
+    parser.add_argument('--output', default='-', help="Write the JSON report here ('-' for stdout)")
+    parser.add_argument('--compare', default=None, help="Baseline JSON report to check for p95 regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p95 slowdown before flagging (default 0.25)")
+    return parser.parse_args(argv)
+
+
+def progress(message):
+    print(message, file=sys.stderr)
+
+
+def run_concurrently(fn, argument_sets, concurrency):
+    """Call fn(*args) for every tuple from concurrency threads at once and summarize the latencies"""
+    pending = list(argument_sets)
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                args = pending.pop()
+            started = time.perf_counter()
+            fn(*args)
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def store_hashes(pantry_vault, credentials, user_ids, cost):
+    pantry_vault.execute_many(
+        "UPDATE users SET password = %s WHERE id = %s",
+        [(credentials.hash_password(PASSWORD, cost), user_id) for user_id in user_ids]
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    use_local_database(args.db)
+
+    from config import Config
+    from db import pantry_vault
+    import credentials
+    import crud
+    from auth import authenticator
+    import migrations
+
+    costs = args.costs or sorted({Config.PASSWORD_ITERATIONS // 2, Config.PASSWORD_ITERATIONS, Config.PASSWORD_ITERATIONS * 2})
+    concurrency = max(1, args.concurrency or Config.SERVER_WORKERS)
+
+    if not pantry_vault.connect():
+        return 1
+    migrations.migrate(pantry_vault)
+
+    # One user per concurrent caller, as if each worker served a different cook
+    names = [f"authbench{n}" for n in range(concurrency)]
+    missing = [(name, f"{name}@example.com", '') for name in names if not pantry_vault.find_user(name)]
+    if missing:
+        pantry_vault.execute_many("INSERT INTO users (user_name, email, password) VALUES (%s, %s, %s)", missing)
+    user_ids = [pantry_vault.find_user(name)['id'] for name in names]
+
+    def login(name, password, expected):
+        if bool(pantry_vault.open_session(name, password)) != expected:
+            raise RuntimeError(f"Unexpected login result for {name}")
+
+    def cached_login(name, password):
+        if not crud.UserCRUD.authenticate_user(name, password):
+            raise RuntimeError(f"Unexpected login result for {name}")
+
+    results = {}
+    recommended = None
+    previous = None
+    for cost in costs:
+        Config.PASSWORD_ITERATIONS = cost
+        # Verifications cached at the last cost would skip the hashing being measured
+        authenticator.forget()
+        if previous is not None:
+            # Hashes from the last cost: the first login at this cost verifies and re-hashes
+            results[f"login_rehash[{cost}]"] = run_concurrently(
+                login, [(name, PASSWORD, True) for name in names], concurrency)
+        store_hashes(pantry_vault, credentials, user_ids, cost)
+        # Builds the stand-in hash for unknown names once, outside the timings
+        credentials.verify_unknown_user(PASSWORD)
+
+        logins = [(names[n % len(names)], PASSWORD, True) for n in range(args.logins)]
+        results[f"login[{cost}]"] = run_concurrently(login, logins, concurrency)
+        results[f"login_wrong_password[{cost}]"] = run_concurrently(
+            login, [(name, PASSWORD + 'x', False) for name, _, _ in logins], concurrency)
+        results[f"login_unknown_user[{cost}]"] = run_concurrently(
+            login, [(name + 'x', PASSWORD, False) for name, _, _ in logins], concurrency)
+        for name in names:
+            cached_login(name, PASSWORD)
+        results[f"login_cached[{cost}]"] = run_concurrently(
+            cached_login, [(name, password) for name, password, _ in logins], concurrency)
+
+        p99 = results[f"login[{cost}]"]['p99_ms']
+        meets = p99 <= args.target_p99_ms
+        if meets:
+            recommended = cost
+        for name in (f"login[{cost}]", f"login_wrong_password[{cost}]", f"login_unknown_user[{cost}]",
+                     f"login_cached[{cost}]"):
+            result = results[name]
+            progress(f"{name}: p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+                     f"{result['ops_per_sec']:,.1f} logins/s")
+        progress(f"cost {cost:,}: login p99 {p99:.1f} ms {'meets' if meets else 'misses'} "
+                 f"the {args.target_p99_ms:g} ms target at concurrency {concurrency}")
+        previous = cost
+
+    if recommended:
+        progress(f"Highest cost under target: PASSWORD_ITERATIONS={recommended}")
+    else:
+        progress(f"No cost keeps login p99 under {args.target_p99_ms:g} ms at concurrency {concurrency}")
+
+    report = {
+        'meta': run_metadata(benchmark='auth', backend='sqlite', costs=costs, concurrency=concurrency,
+                             logins=args.logins, target_p99_ms=args.target_p99_ms),
+        'recommended_iterations': recommended,
+        'results': results,
+    }
+    write_report(report, args.output)
+    pantry_vault.disconnect()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare_reports(baseline, report, tolerance=args.tolerance)
+        for name, before, after, ratio in regressions:
+            progress(f"REGRESSION {name}: p95 {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        progress(f"No p95 regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0 if recommended else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark every CountryCRUD, FoodCRUD, RecipeCRUD and IngredientCRUD method
+against a seeded local SQLite database.
+
+    python3 benchmarks/bench_crud.py --scale 100k --output bench.json
+    python3 benchmarks/bench_crud.py --scale 100k --compare bench.json
+
+Scale is the number of recipes (1k, 100k, 1m or any integer); foods,
+ingredients and users scale with it, see seed.scale_plan. Pass --db to keep
+the seeded database on disk and reuse it across runs. Display methods only
+print and are not timed.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import use_local_database, time_calls, run_metadata, write_report, compare_reports
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+
+
+def parse_scale(value):
+    value = value.lower()
+    if value in SCALES:
+        return SCALES[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"scale must be one of {', '.join(SCALES)} or a number")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Pantry CRUD layer on a seeded SQLite database")
+    parser.add_argument('--scale', type=parse_scale, default=SCALES['1k'], help="Recipes to seed: 1k, 10k, 100k, 1m or a number")
+    parser.add_argument('--db', default=':memory:', help="SQLite file to seed (reused if already seeded); default in-memory")
+    parser.add_argument('--iterations', type=int, default=200, help="Calls per point benchmark (default 200)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for data and arguments")
+    parser.add_argument('--only', default=None, help="Only run benchmarks whose name contains this text")
+    parser.add_argument('--output', default='-', help="Write the JSON report here ('-' for stdout)")
+    parser.add_argument('--compare', default=None, help="Baseline JSON report to check for p95 regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p95 slowdown before flagging (default 0.25)")
+    return parser.parse_args(argv)
+
+
+def build_benchmarks(crud, pantry_vault, config, rng, iterations):
+    """
+    Return (name, fn, argument_sets) for every benchmarked CRUD method, in
+    run order. argument_sets may be a callable that builds the list when
+    the benchmark starts.
+    """
+    countries = crud.CountryCRUD.get_all_countries()
+    country_ids = [country['id'] for country in countries]
+    country_names = [country['name'] for country in countries]
+    food_ids = [row['id'] for row in pantry_vault.execute_query("SELECT id FROM foods")]
+    recipe_ids = [row['id'] for row in pantry_vault.execute_query("SELECT id FROM recipes")]
+    user_ids = [row['id'] for row in pantry_vault.execute_query("SELECT id FROM users")]
+    ingredient_rows = pantry_vault.execute_query("SELECT id, name FROM ingredients")
+    ingredient_ids = [row['id'] for row in ingredient_rows]
+    ingredient_names = [row['name'] for row in ingredient_rows]
+    food_names = [row['name'] for row in pantry_vault.execute_query("SELECT name FROM foods LIMIT 1000")]
+    recipe_names = [row['name'] for row in pantry_vault.execute_query("SELECT name FROM recipes LIMIT 1000")]
+    page = config.PAGE_SIZE
+    scans = max(1, iterations // 50)
+    # Letters only, so the names also pass the CLI validators
+    tag = ''.join(chr(ord('a') + int(digit)) for digit in str(int(time.time() * 1000) % 10 ** 6))
+
+    def pick(values, count=1):
+        return rng.sample(values, count) if count > 1 else rng.choice(values)
+
+    def new_recipe(number):
+        return {
+            'name': f"Bench Dish {tag} {chr(ord('a') + number % 26)}", 'country_id': pick(country_ids),
+            'instructions': "Stir and simmer", 'prep_time': "5 minutes", 'cook_time': "10 minutes",
+            'servings': 2, 'family_notes': "", 'user_id': pick(user_ids),
+        }
+
+    added_recipes = []
+
+    def add_recipe(number):
+        recipe = new_recipe(number)
+        added_recipes.append(crud.RecipeCRUD.add_recipe(
+            recipe['name'], recipe['country_id'], recipe['instructions'], recipe['prep_time'],
+            recipe['cook_time'], recipe['servings'], recipe['family_notes'], recipe['user_id']
+        ))
+
+    def delete_added(recipe_id):
+        owner = pantry_vault.execute_query("SELECT user_id FROM recipes WHERE id = %s", (recipe_id,))
+        if owner:
+            crud.RecipeCRUD.delete_recipes([recipe_id], owner[0]['user_id'])
+
+    n = range(iterations)
+    return [
+        ('CountryCRUD.get_all_countries', crud.CountryCRUD.get_all_countries, [() for _ in n]),
+        ('CountryCRUD.get_country_by_name', crud.CountryCRUD.get_country_by_name, [(pick(country_names),) for _ in n]),
+        ('CountryCRUD.add_country', crud.CountryCRUD.add_country,
+         [(f"Benchland {tag} {chr(ord('a') + i % 26)}{chr(ord('a') + i // 26 % 26)}",) for i in n]),
+
+        ('FoodCRUD.get_all_foods[first_page]', crud.FoodCRUD.get_all_foods, [(None, None, page) for _ in n]),
+        ('FoodCRUD.get_all_foods[keyset_page]', crud.FoodCRUD.get_all_foods,
+         [(pick(food_names), 0, page) for _ in n]),
+        ('FoodCRUD.iter_all_foods[full_scan]', lambda: sum(1 for _ in crud.FoodCRUD.iter_all_foods()), [() for _ in range(scans)]),
+        ('FoodCRUD.get_foods_by_country', crud.FoodCRUD.get_foods_by_country, [(pick(country_ids),) for _ in range(scans)]),
+        ('FoodCRUD.get_food_with_ingredients', crud.FoodCRUD.get_food_with_ingredients, [(pick(food_ids),) for _ in n]),
+        ('FoodCRUD.get_foods_with_ingredients_many[50]', crud.FoodCRUD.get_foods_with_ingredients_many,
+         [(pick(food_ids, min(50, len(food_ids))),) for _ in n]),
+        ('FoodCRUD.add_food', crud.FoodCRUD.add_food, [(f"Bench Food {tag}", pick(country_ids), "Benchmark food") for _ in n]),
+
+        ('RecipeCRUD.get_all_recipes[first_page]', crud.RecipeCRUD.get_all_recipes, [(None, None, page) for _ in n]),
+        ('RecipeCRUD.get_all_recipes[keyset_page]', crud.RecipeCRUD.get_all_recipes,
+         [(pick(recipe_names), 0, page) for _ in n]),
+        ('RecipeCRUD.iter_all_recipes[full_scan]', lambda: sum(1 for _ in crud.RecipeCRUD.iter_all_recipes()), [() for _ in range(scans)]),
+        ('RecipeCRUD.get_recipe_details', crud.RecipeCRUD.get_recipe_details, [(pick(recipe_ids),) for _ in n]),
+        ('RecipeCRUD.get_recipe_details_many[50]', crud.RecipeCRUD.get_recipe_details_many,
+         [(pick(recipe_ids, min(50, len(recipe_ids))),) for _ in n]),
+        ('RecipeCRUD.get_recipes_by_user', crud.RecipeCRUD.get_recipes_by_user, [(pick(user_ids),) for _ in n]),
+        ('RecipeCRUD.add_recipe', add_recipe, [(i,) for i in n]),
+        ('RecipeCRUD.add_ingredient_to_recipe', lambda: crud.RecipeCRUD.add_ingredient_to_recipe(
+            pick(added_recipes), pick(ingredient_ids), "1", "cup"), [() for _ in n]),
+        ('RecipeCRUD.add_recipe_with_ingredients[5]', crud.RecipeCRUD.add_recipe_with_ingredients,
+         [(new_recipe(i), [{'name': name, 'quantity': "1", 'unit': ""} for name in pick(ingredient_names, 5)]) for i in n]),
+        # Deletes the recipes add_recipe created, so the arguments are built when it runs
+        ('RecipeCRUD.delete_recipes[1]', delete_added, lambda: [(recipe_id,) for recipe_id in added_recipes]),
+
+        ('IngredientCRUD.get_all_ingredients[first_page]', crud.IngredientCRUD.get_all_ingredients, [(None, None, page) for _ in n]),
+        ('IngredientCRUD.get_all_ingredients[keyset_page]', crud.IngredientCRUD.get_all_ingredients,
+         [(pick(ingredient_names), 0, page) for _ in n]),
+        ('IngredientCRUD.iter_all_ingredients[full_scan]', lambda: sum(1 for _ in crud.IngredientCRUD.iter_all_ingredients()), [() for _ in range(scans)]),
+        ('IngredientCRUD.resolve_ingredient_ids[20]', crud.IngredientCRUD.resolve_ingredient_ids,
+         [(pick(ingredient_names, min(20, len(ingredient_names))),) for _ in n]),
+        ('IngredientCRUD.add_ingredient[existing]', crud.IngredientCRUD.add_ingredient, [(pick(ingredient_names),) for _ in n]),
+
+        ('SearchCRUD.rebuild_index', crud.SearchCRUD.rebuild_index, [()]),
+        ('SearchCRUD.search', crud.SearchCRUD.search, [(pick(recipe_names).split()[0][:3],) for _ in n]),
+        ('PantryMatchCRUD.rebuild_index', crud.PantryMatchCRUD.rebuild_index, [()]),
+        ('PantryMatchCRUD.what_can_i_cook[8]', crud.PantryMatchCRUD.what_can_i_cook,
+         [(pick(ingredient_names, min(8, len(ingredient_names))), 2, config.PAGE_SIZE) for _ in n]),
+    ]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    use_local_database(args.db)
+
+    from config import Config
+    from db import pantry_vault
+    import crud
+    import migrations
+    from seed import seed_database
+
+    def progress(message):
+        print(message, file=sys.stderr)
+
+    if not pantry_vault.connect():
+        return 1
+    migrations.migrate(pantry_vault)
+
+    started = time.perf_counter()
+    existing = pantry_vault.execute_query("SELECT COUNT(*) AS n FROM recipes")[0]['n']
+    if existing:
+        progress(f"Reusing {args.db} with {existing:,} recipes")
+        seed_seconds = None
+    else:
+        seed_database(pantry_vault, args.scale, args.seed, progress=progress)
+        seed_seconds = time.perf_counter() - started
+
+    counts = {
+        table: pantry_vault.execute_query(f"SELECT COUNT(*) AS n FROM {table}")[0]['n']
+        for table in ('countries', 'users', 'foods', 'recipes', 'ingredients', 'recipe_ingredients', 'food_ingredients')
+    }
+
+    rng = random.Random(args.seed)
+    results = {}
+    for name, fn, argument_sets in build_benchmarks(crud, pantry_vault, Config, rng, args.iterations):
+        if args.only and args.only not in name:
+            continue
+        if callable(argument_sets):
+            argument_sets = argument_sets()
+        if not argument_sets:
+            continue
+        # Warm-up calls would repeat writes (duplicate names, already deleted rows)
+        writes = '.add_' in name or '.delete_' in name
+        results[name] = time_calls(fn, argument_sets, warmup=0 if writes or len(argument_sets) < 10 else 3)
+        progress(f"{name}: p50 {results[name]['p50_ms']:.3f} ms, p95 {results[name]['p95_ms']:.3f} ms, "
+                 f"{results[name]['ops_per_sec']:,.0f} ops/s")
+
+    report = {
+        'meta': run_metadata(benchmark='crud', backend='sqlite', scale=args.scale,
+                             iterations=args.iterations, seed=args.seed, seed_seconds=seed_seconds),
+        'rows': counts,
+        'results': results,
+    }
+    write_report(report, args.output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare_reports(baseline, report, tolerance=args.tolerance)
+        for name, before, after, ratio in regressions:
+            progress(f"REGRESSION {name}: p95 {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        progress(f"No p95 regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+    pantry_vault.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Shared helpers for the offline benchmarks.
+
+Every benchmark runs against a local SQLite database, so nothing here needs
+a network or a MySQL server. Results are plain dicts that are written as
+JSON, which lets runs from different commits be compared.
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_local_database(path=':memory:'):
+    """
+    Point the application at a local SQLite database and make its modules
+    importable. Must run before anything imports config or the pantry modules.
+    """
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['DB_PATH'] = path
+    # Timing the instrumentation hook is not the point of a CRUD benchmark
+    os.environ.setdefault('QUERY_STATS', '0')
+    os.environ.setdefault('SLOW_QUERY_LOG', '')
+    for directory in (REPO_ROOT, os.path.join(REPO_ROOT, 'pantry')):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def summarize(samples, wall_seconds=None):
+    """Latency summary in milliseconds plus throughput for a list of durations in seconds"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    wall = wall_seconds if wall_seconds is not None else total
+    return {
+        'iterations': len(ordered),
+        'mean_ms': total * 1000 / len(ordered) if ordered else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'max_ms': ordered[-1] * 1000 if ordered else 0.0,
+        'ops_per_sec': len(ordered) / wall if wall else 0.0,
+    }
+
+
+def time_calls(fn, argument_sets, warmup=3):
+    """Call fn(*args) for every tuple in argument_sets and summarize the latencies"""
+    argument_sets = list(argument_sets)
+    for args in argument_sets[:warmup]:
+        fn(*args)
+    samples = []
+    started = time.perf_counter()
+    for args in argument_sets:
+        call_started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def git_revision():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(**extra):
+    metadata = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    metadata.update(extra)
+    return metadata
+
+
+def write_report(report, path):
+    """Write a report as JSON to path, or to stdout for '-'"""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path == '-':
+        print(text)
+    else:
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text + "\n")
+
+
+def compare_reports(baseline, current, metric='p95_ms', tolerance=0.25):
+    """
+    Return (name, baseline, current, ratio) for every benchmark in both
+    reports whose metric grew by more than tolerance (0.25 = 25% slower).
+    """
+    regressions = []
+    for name, result in current.get('results', {}).items():
+        before = baseline.get('results', {}).get(name)
+        if not before or not before.get(metric):
+            continue
+        ratio = result[metric] / before[metric]
+        if ratio > 1 + tolerance:
+            regressions.append((name, before[metric], result[metric], ratio))
+    return sorted(regressions, key=lambda item: item[3], reverse=True)
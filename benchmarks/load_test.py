@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load test for the HTTP/JSON server (main.py serve).
+
+    python3 benchmarks/load_test.py --scale 10k --concurrency 16 --duration 20
+    python3 benchmarks/load_test.py --url http://127.0.0.1:8080 --concurrency 32
+
+Without --url, a local SQLite database is seeded (see seed.py) and
+`main.py serve` is started as a separate process on a free port, so the
+clients and the server do not share an interpreter. Each client registers
+its own user, logs in, and then sends a weighted mix of reads over one
+keep-alive connection, plus a fraction of recipe inserts (--writes).
+Latency per operation and overall throughput are reported as JSON in the
+same format as bench_crud.py, so --compare works the same way.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import REPO_ROOT, use_local_database, summarize, run_metadata, write_report, compare_reports
+from bench_crud import parse_scale, SCALES
+
+# Relative weight of each read operation
+READ_MIX = {
+    'list_recipes': 30,
+    'show_recipe': 30,
+    'foods_by_country': 10,
+    'search': 20,
+    'cook': 10,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Pantry HTTP/JSON server")
+    parser.add_argument('--url', default=None, help="Server to test; default starts one on a seeded SQLite database")
+    parser.add_argument('--scale', type=parse_scale, default=SCALES['10k'], help="Recipes to seed when starting a server")
+    parser.add_argument('--db', default=None, help="SQLite file for the started server (reused if already seeded)")
+    parser.add_argument('--workers', type=int, default=8, help="Worker threads for the started server (default 8)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients (default 8)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run (default 10)")
+    parser.add_argument('--writes', type=float, default=0.05, help="Fraction of requests that add a recipe (default 0.05)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--output', default='-', help="Write the JSON report here ('-' for stdout)")
+    parser.add_argument('--compare', default=None, help="Baseline JSON report to check for p95 regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p95 slowdown before flagging (default 0.25)")
+    return parser.parse_args(argv)
+
+
+def progress(message):
+    print(message, file=sys.stderr)
+
+
+class Client:
+    """One keep-alive connection to the server"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        self.token = None
+
+    def call(self, method, path, body=None):
+        """Send one request and return (status, decoded JSON or None)"""
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        try:
+            self.connection.request(method, path, data, headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (http.client.HTTPException, OSError):
+            # The server closed an idle or handed-off connection; retry once on a new one
+            self.connection.close()
+            self.connection.request(method, path, data, headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        if not payload or not response.getheader('Content-Type', '').startswith('application/json'):
+            return response.status, None
+        return response.status, json.loads(payload)
+
+    def close(self):
+        self.connection.close()
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(db_path, workers):
+    """Start main.py serve on a free port and wait until it answers /health"""
+    port = free_port()
+    env = dict(os.environ, DB_BACKEND='sqlite', DB_PATH=db_path, QUERY_STATS='0', SLOW_QUERY_LOG='', SCHEMA_MARKER='')
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, 'main.py'), 'serve', '--port', str(port), '--workers', str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=sys.stderr
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server exited during startup")
+        try:
+            client = Client(url)
+            status, _ = client.call('GET', '/health')
+            client.close()
+            if status == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The server did not start within 60s")
+
+
+def seed(db_path, recipes, seed_value):
+    use_local_database(db_path)
+    from db import pantry_vault
+    import migrations
+    from seed import seed_database
+
+    pantry_vault.connect()
+    migrations.migrate(pantry_vault)
+    existing = pantry_vault.execute_query("SELECT COUNT(*) AS n FROM recipes")[0]['n']
+    if existing:
+        progress(f"Reusing {db_path} with {existing:,} recipes")
+    else:
+        seed_database(pantry_vault, recipes, seed_value, progress=progress)
+    pantry_vault.disconnect()
+
+
+def sample_catalog(url):
+    """Names and IDs to build requests from, fetched through the API"""
+    client = Client(url)
+    try:
+        countries = [row['name'] for row in client.call('GET', '/countries')[1]['items']]
+        recipes = client.call('GET', '/recipes?limit=500')[1]['items']
+        ingredients = [row['name'] for row in client.call('GET', '/ingredients?limit=500')[1]['items']]
+    finally:
+        client.close()
+    if not countries or not recipes or not ingredients:
+        raise RuntimeError("The server has no catalog to test against; seed it first")
+    return {
+        'countries': countries,
+        'recipe_ids': [row['id'] for row in recipes],
+        'recipe_names': [row['name'] for row in recipes],
+        'ingredients': ingredients,
+    }
+
+
+def run_client(number, url, catalog, args, ready, timing, tag, results, errors, lock):
+    rng = random.Random(args.seed + number)
+    client = Client(url)
+    samples = {}
+    failures = {}
+    # Letters only, so the names pass the server's validators
+    letters = ''.join(chr(ord('a') + int(digit)) for digit in str(number))
+    username = f"load{tag}{letters}"
+    client.call('POST', '/users', {'username': username, 'email': f"{username}@example.com", 'password': 'loadtest'})
+    status, session = client.call('POST', '/sessions', {'username': username, 'password': 'loadtest'})
+    # Registering and logging in hash passwords, so the clock starts once every client is in
+    ready.wait()
+    if status != 201:
+        with lock:
+            errors['login'] = errors.get('login', 0) + 1
+        return
+    client.token = session['token']
+    deadline = timing['deadline']
+
+    operations = list(READ_MIX)
+    weights = [READ_MIX[name] for name in operations]
+    added = 0
+    while time.monotonic() < deadline:
+        if rng.random() < args.writes:
+            name = 'add_recipe'
+            added += 1
+            method, path = 'POST', '/recipes'
+            body = {
+                'name': f"Load Dish {letters} {chr(ord('a') + added % 26)}", 'country': rng.choice(catalog['countries']),
+                'instructions': "Stir and simmer", 'prep_time': "5 minutes", 'cook_time': "10 minutes", 'servings': 2,
+                'ingredients': [{'name': ingredient, 'quantity': "1", 'unit': ""}
+                                for ingredient in rng.sample(catalog['ingredients'], 3)],
+            }
+        else:
+            name = rng.choices(operations, weights)[0]
+            method, body = 'GET', None
+            if name == 'list_recipes':
+                path = f"/recipes?limit=20&after_name={quote(rng.choice(catalog['recipe_names']))}&after_id=0"
+            elif name == 'show_recipe':
+                path = f"/recipes/{rng.choice(catalog['recipe_ids'])}"
+            elif name == 'foods_by_country':
+                path = f"/foods?country={quote(rng.choice(catalog['countries']))}"
+            elif name == 'search':
+                path = f"/search?q={quote(rng.choice(catalog['recipe_names']).split()[0][:3])}&limit=20"
+            else:
+                path = f"/cook?have={quote(','.join(rng.sample(catalog['ingredients'], 5)))}&max_missing=2&limit=20"
+
+        started = time.perf_counter()
+        try:
+            status, _ = client.call(method, path, body)
+        except (http.client.HTTPException, OSError):
+            status = 'connection error'
+        samples.setdefault(name, []).append(time.perf_counter() - started)
+        if status not in (200, 201):
+            failures[f"{name} {status}"] = failures.get(f"{name} {status}", 0) + 1
+    client.close()
+
+    with lock:
+        for name, values in samples.items():
+            results.setdefault(name, []).extend(values)
+        for key, count in failures.items():
+            errors[key] = errors.get(key, 0) + count
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    process = None
+    if args.url:
+        url = args.url.rstrip('/')
+    else:
+        db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='pantry-load-'), 'pantry.db')
+        seed(db_path, args.scale, args.seed)
+        process, url = start_server(db_path, args.workers)
+        progress(f"Started a server with {args.workers} workers at {url}")
+
+    try:
+        catalog = sample_catalog(url)
+        results = {}
+        errors = {}
+        lock = threading.Lock()
+        tag = ''.join(chr(ord('a') + int(digit)) for digit in str(int(time.time() * 1000) % 10 ** 6))
+        timing = {}
+
+        def start_clock():
+            timing['started'] = time.perf_counter()
+            timing['deadline'] = time.monotonic() + args.duration
+        ready = threading.Barrier(args.concurrency, action=start_clock)
+        clients = [
+            threading.Thread(target=run_client, args=(number, url, catalog, args, ready, timing, tag, results, errors, lock))
+            for number in range(args.concurrency)
+        ]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        wall = time.perf_counter() - timing['started']
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report_results = {name: summarize(samples, wall) for name, samples in sorted(results.items())}
+    everything = [sample for samples in results.values() for sample in samples]
+    report_results['all'] = summarize(everything, wall)
+    for name, result in report_results.items():
+        progress(f"{name}: p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, {result['ops_per_sec']:,.0f} req/s")
+    if errors:
+        progress(f"Errors: {json.dumps(errors, sort_keys=True)}")
+
+    report = {
+        'meta': run_metadata(benchmark='http', url=args.url, scale=None if args.url else args.scale,
+                             workers=None if args.url else args.workers, concurrency=args.concurrency,
+                             duration=args.duration, writes=args.writes, seed=args.seed),
+        'errors': errors,
+        'results': report_results,
+    }
+    write_report(report, args.output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare_reports(baseline, report, tolerance=args.tolerance)
+        for name, before, after, ratio in regressions:
+            progress(f"REGRESSION {name}: p95 {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        progress(f"No p95 regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Synthetic catalog generator for benchmarks and load tests.
+
+Seeding writes straight through PantryVault.execute_many in large batches,
+bypassing the CRUD layer, so a million-recipe catalog takes minutes rather
+than hours; the per-country summary counts are rebuilt once at the end.
+The same seed always produces the same catalog.
+"""
+
+import random
+
+import country_stats
+
+COUNTRIES = [
+    'Algeria', 'Angola', 'Benin', 'Botswana', 'Burkina Faso', 'Burundi', 'Cameroon', 'Chad',
+    'Congo', 'Egypt', 'Eritrea', 'Ethiopia', 'Gabon', 'Gambia', 'Ghana', 'Guinea', 'Ivory Coast',
+    'Kenya', 'Lesotho', 'Liberia', 'Libya', 'Madagascar', 'Malawi', 'Mali', 'Mauritania',
+    'Mauritius', 'Morocco', 'Mozambique', 'Namibia', 'Niger', 'Nigeria', 'Rwanda', 'Senegal',
+    'Sierra Leone', 'Somalia', 'South Africa', 'Sudan', 'Tanzania', 'Togo', 'Tunisia', 'Uganda',
+    'Zambia', 'Zimbabwe',
+]
+
+_SYLLABLES = ['ba', 'ko', 'ji', 'lo', 'fu', 'na', 'sa', 'me', 'wo', 'ti', 'gu', 'ra', 'pe', 'mu', 'ye', 'dzi']
+_WORDS = ['stew', 'soup', 'rice', 'porridge', 'bread', 'grill', 'fritters', 'salad', 'curry', 'pie']
+_BASE_INGREDIENTS = [
+    'rice', 'tomato', 'onion', 'pepper', 'garlic', 'ginger', 'palm oil', 'groundnut', 'cassava',
+    'plantain', 'yam', 'okra', 'spinach', 'beef', 'chicken', 'goat', 'fish', 'beans', 'millet',
+    'sorghum', 'maize', 'coconut', 'lemon', 'salt', 'thyme', 'curry powder', 'egusi', 'cabbage',
+]
+
+
+def scale_plan(recipes):
+    """Row counts for a catalog with the given number of recipes"""
+    return {
+        'countries': len(COUNTRIES),
+        'users': max(10, recipes // 100),
+        'ingredients': max(len(_BASE_INGREDIENTS), min(recipes // 10, 20000)),
+        'foods': max(1, recipes // 2),
+        'recipes': recipes,
+    }
+
+
+def _word(rng, syllables):
+    return ''.join(rng.choice(_SYLLABLES) for _ in range(syllables))
+
+
+def _ingredient_names(count):
+    names = list(_BASE_INGREDIENTS)
+    seen = set(names)
+    index = 0
+    while len(names) < count:
+        # Letters only, so generated names pass the ingredient validator
+        name = f"{_SYLLABLES[index % len(_SYLLABLES)]}{_word(random.Random(index), 3)}"
+        index += 1
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def seed_database(vault, recipes=1000, seed=42, batch_size=5000, progress=None):
+    """
+    Fill an empty, migrated database with a synthetic catalog and return
+    the row counts written. Ingredient links per recipe or food vary from 3 to 8.
+    """
+    rng = random.Random(seed)
+    plan = scale_plan(recipes)
+
+    def insert(query, rows):
+        for start in range(0, len(rows), batch_size):
+            vault.execute_many(query, rows[start:start + batch_size])
+
+    with vault.transaction() as txn:
+        insert("INSERT INTO countries (name) VALUES (%s)", [(name,) for name in COUNTRIES])
+        country_ids = [row['id'] for row in vault.execute_query("SELECT id FROM countries")]
+
+        insert(
+            "INSERT INTO users (user_name, email, password, country_id) VALUES (%s, %s, %s, %s)",
+            [(f"user{n}", f"user{n}@example.com", f"password{n}", rng.choice(country_ids))
+             for n in range(plan['users'])]
+        )
+        user_ids = [row['id'] for row in vault.execute_query("SELECT id FROM users")]
+
+        insert("INSERT INTO ingredients (name) VALUES (%s)", [(name,) for name in _ingredient_names(plan['ingredients'])])
+        ingredient_ids = [row['id'] for row in vault.execute_query("SELECT id FROM ingredients")]
+        txn.commit()
+        if progress:
+            progress(f"seeded {plan['countries']} countries, {plan['users']} users, {plan['ingredients']} ingredients")
+
+        def links(owner_ids):
+            return [
+                (owner_id, ingredient_id, str(rng.randint(1, 5)), rng.choice(['', 'cups', 'g', 'tbsp']))
+                for owner_id in owner_ids
+                for ingredient_id in rng.sample(ingredient_ids, rng.randint(3, 8))
+            ]
+
+        for kind, total in (('foods', plan['foods']), ('recipes', plan['recipes'])):
+            for start in range(0, total, batch_size):
+                count = min(batch_size, total - start)
+                names = [f"{_word(rng, 2).title()} {rng.choice(_WORDS).title()}" for _ in range(count)]
+                if kind == 'foods':
+                    rows = [(name, rng.choice(country_ids), f"A {name.lower()} from the market") for name in names]
+                    insert("INSERT INTO foods (name, country_id, description) VALUES (%s, %s, %s)", rows)
+                    link_table, owner_column = 'food_ingredients', 'food_id'
+                else:
+                    rows = [
+                        (name, rng.choice(country_ids), f"Cook the {name.lower()} slowly and serve warm",
+                         f"{rng.randint(5, 60)} minutes", f"{rng.randint(10, 120)} minutes",
+                         rng.randint(1, 8), '', rng.choice(user_ids))
+                        for name in names
+                    ]
+                    insert(
+                        "INSERT INTO recipes (name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id) "
+                        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                        rows
+                    )
+                    link_table, owner_column = 'recipe_ingredients', 'recipe_id'
+                # Batches are inserted in order, so the new IDs are the highest ones
+                new_ids = [row['id'] for row in vault.execute_query(
+                    f"SELECT id FROM {kind} ORDER BY id DESC LIMIT %s", (count,)
+                )]
+                insert(
+                    f"INSERT INTO {link_table} ({owner_column}, ingredient_id, quantity, unit) VALUES (%s, %s, %s, %s)",
+                    links(new_ids)
+                )
+                txn.commit()
+                if progress:
+                    progress(f"seeded {start + count:,}/{total:,} {kind}")
+
+        # The summary counts are built once from the finished catalog
+        country_stats.rebuild(vault)
+
+    return plan
@@ -12,11 +12,41 @@ class Config:
     DB_USER = os.getenv('DB_USER')
     DB_PASSWORD = os.getenv('DB_PASSWORD')
     DB_NAME = os.getenv('DB_NAME')
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+    DB_PATH = os.getenv('DB_PATH', 'pantry.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', 20))
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 1000))
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 300))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 2048))
+    RENDER_CACHE_ENTRIES = int(os.getenv('RENDER_CACHE_ENTRIES', 64))
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+    QUERY_STATS = os.getenv('QUERY_STATS', '1').lower() not in ('0', 'false', 'no', 'off')
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'slow_queries.log')
+    SCHEMA_MARKER = os.getenv('SCHEMA_MARKER', '.pantry_schema')
+    SERVER_HOST = os.getenv('SERVER_HOST', '127.0.0.1')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', 8080))
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', os.getenv('DB_POOL_SIZE', 5)))
+    SERVER_IDLE_TIMEOUT = float(os.getenv('SERVER_IDLE_TIMEOUT', 5))
+    SESSION_TTL = float(os.getenv('SESSION_TTL', 3600))
+    PASSWORD_ITERATIONS = int(os.getenv('PASSWORD_ITERATIONS', 200000))
+    AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', 60))
+    AUTH_CACHE_ENTRIES = int(os.getenv('AUTH_CACHE_ENTRIES', 1024))
+    LOGIN_BURST = int(os.getenv('LOGIN_BURST', 5))
+    LOGIN_PER_MINUTE = float(os.getenv('LOGIN_PER_MINUTE', 5))
+    LOGIN_SOURCE_BURST = int(os.getenv('LOGIN_SOURCE_BURST', 20))
+    LOGIN_SOURCE_PER_MINUTE = float(os.getenv('LOGIN_SOURCE_PER_MINUTE', 30))
+    LOGIN_THROTTLE_KEYS = int(os.getenv('LOGIN_THROTTLE_KEYS', 10000))
     
     @classmethod
     def validate_config(cls):
         """Validate that all required environment variables are set"""
-        required_vars = ['DB_HOST', 'DB_USER', 'DB_PASSWORD', 'DB_NAME']
+        if cls.DB_BACKEND == 'sqlite':
+            required_vars = ['DB_PATH']
+        else:
+            required_vars = ['DB_HOST', 'DB_USER', 'DB_PASSWORD', 'DB_NAME']
         missing_vars = []
         
         for var in required_vars:
@@ -38,4 +68,12 @@ class Config:
             'user': cls.DB_USER,
             'password': cls.DB_PASSWORD,
             'database': cls.DB_NAME
+        }
+    
+    @classmethod
+    def get_pool_params(cls):
+        """Get connection pool sizing as a dictionary"""
+        return {
+            'size': cls.DB_POOL_SIZE,
+            'timeout': cls.DB_POOL_TIMEOUT
         }
\ No newline at end of file
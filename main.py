@@ -4,9 +4,19 @@ Pantry CLI Application - Entry Point
 A food management system supporting multiple countries and family recipes.
 """
 
+import time
+
+# Taken before any other import so --profile-startup can report them
+_STARTED = time.perf_counter()
+
 import sys
 import os
+import argparse
+import builtins
+import threading
 import traceback
+from functools import partial
+from importlib.util import find_spec
 from config import Config
 
 # Add the current directory to Python path
@@ -21,16 +31,21 @@ if os.path.exists(pantry_dir):
 def check_dependencies():
     """Check if required dependencies are installed"""
     required_packages = {
-        'mysql.connector': 'mysql-connector-python',
         'tabulate': 'tabulate',
         'dotenv': 'python-dotenv'
     }
+    # The bundled SQLite backend needs no database driver
+    if Config.DB_BACKEND == 'mysql':
+        required_packages['mysql.connector'] = 'mysql-connector-python'
     
+    # Only locate the packages; they are imported when first used
     missing_packages = []
     for module, package in required_packages.items():
         try:
-            __import__(module)                  
-        except ImportError:
+            found = find_spec(module) is not None
+        except (ImportError, ValueError):
+            found = False
+        if not found:
             missing_packages.append(package)
     
     if missing_packages:
@@ -44,39 +59,97 @@ def check_dependencies():
     
     return True
 
-def import_modules():
-    """Import required modules with error handling"""
+def import_modules(interactive=True):
+    """Import required modules with error handling; the CLI is only imported when interactive"""
     try:
-        # Try direct import first (files in same directory as main.py)
-        from pantry.db import pantry_vault
-        from pantry.cli import cli
+        # The pantry modules import each other by their flat names, so main
+        # must use the same names to share one pantry_vault with them
+        from db import pantry_vault
+        if not interactive:
+            return pantry_vault, None
+        from cli import cli
         return pantry_vault, cli
-    except ImportError as e1:
+    except ImportError as e:
+        print("Error: Cannot find required modules!")
+        print(f"Import error: {e}")
+        print("\nPlease ensure the following files are in the pantry directory next to main.py:")
+        print("- db.py")
+        print("- crud.py")
+        print("- cli.py")
+        print(f"\nCurrent directory: {current_dir}")
+        print(f"Files in current directory: {os.listdir(current_dir)}")
+        if os.path.exists(pantry_dir):
+            print(f"Files in pantry subdirectory: {os.listdir(pantry_dir)}")
+        return None, None
+
+class StartupProfiler:
+    """Phase timings and per-module import times for --profile-startup"""
+    
+    def __init__(self, started):
+        self.started = started
+        self.phases = []
+        # module name -> (cumulative seconds, own seconds)
+        self.imports = {}
+        self._local = threading.local()
+        self._original_import = None
+    
+    def install(self):
+        """Time every import statement from now on"""
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+    
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+    
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.imports.setdefault(name, (elapsed, elapsed - nested))
+    
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+    
+    def checkpoint(self, name):
+        """Record the time elapsed since the process started importing main.py"""
+        self.record(name, time.perf_counter() - self.started)
+    
+    def phase(self, name, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs), recording how long it took under name"""
+        started = time.perf_counter()
         try:
-            # Try pantry subdirectory import
-            from pantry.db import pantry_vault
-            from pantry.cli import cli
-            return pantry_vault, cli
-        except ImportError as e2:
-            print("Error: Cannot find required modules!")
-            print(f"Direct import error: {e1}")
-            print(f"Subdirectory import error: {e2}")
-            print("\nPlease ensure the following files are in the same directory as main.py:")
-            print("- config.py")
-            print("- db.py")
-            print("- crud.py")
-            print("- cli.py")
-            print(f"\nCurrent directory: {current_dir}")
-            print(f"Files in current directory: {os.listdir(current_dir)}")
-            if os.path.exists(pantry_dir):
-                print(f"Files in pantry subdirectory: {os.listdir(pantry_dir)}")
-            return None, None
+            return fn(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - started)
+    
+    def report(self, limit=15):
+        print("\nSTARTUP PROFILE")
+        print("-" * 60)
+        for name, seconds in self.phases:
+            print(f"{name:<44} {seconds * 1000:>10.1f} ms")
+        print(f"\nSlowest imports (cumulative / own, first import only)")
+        print("-" * 60)
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (cumulative, own) in ranked[:limit]:
+            print(f"{name:<36} {cumulative * 1000:>9.1f} ms {own * 1000:>9.1f} ms")
+        print("-" * 60)
 
 def check_env_file():
     """Check if .env file exists and contains required variables"""
     env_path = os.path.join(current_dir, '.env')
     
-    if not os.path.exists(env_path):
+    if not os.path.exists(env_path) and Config.DB_BACKEND != 'sqlite':
         print("Warning: .env file not found!")
         print("Please create a .env file with your database configuration:")
         print("DB_HOST=your_host")
@@ -84,11 +157,13 @@ def check_env_file():
         print("DB_USER=your_username")
         print("DB_PASSWORD=your_password")
         print("DB_NAME=your_database_name")
+        print("Or use the bundled SQLite engine instead:")
+        print("DB_BACKEND=sqlite")
+        print("DB_PATH=pantry.db")
         return False
     
     # Try to validate config
     try:
-        from config import Config
         Config.validate_config()
         return True
     except Exception as e:
@@ -96,69 +171,294 @@ def check_env_file():
         print("Please check your .env file contains all required variables.")
         return False
 
-def main():
+def parse_args(argv=None):
+    """Parse command-line arguments; no command starts the interactive CLI"""
+    from commands import add_commands
+    
+    parser = argparse.ArgumentParser(description="Pantry CLI Application")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Print startup phase timings and the slowest imports on exit")
+    commands = parser.add_subparsers(dest='command')
+    
+    import_parser = commands.add_parser('import', help="Bulk import recipes from a CSV or JSON Lines file")
+    import_parser.add_argument('file', help="Path to a .csv or .jsonl file")
+    import_parser.add_argument('--chunk-size', type=int, default=None,
+                               help=f"Recipes per transaction (default {Config.IMPORT_CHUNK_SIZE})")
+    import_parser.add_argument('--checkpoint', default=None,
+                               help="Name the import's progress is saved under (default the file's absolute path)")
+    import_parser.add_argument('--restart', action='store_true',
+                               help="Ignore an existing checkpoint and start from the first row")
+    import_parser.add_argument('--user-id', type=int, default=None,
+                               help="Owner to record on the imported recipes")
+    
+    export_parser = commands.add_parser('export', help="Stream the whole vault to JSON Lines, CSV or columnar files")
+    export_parser.add_argument('output_dir', help="Directory to write <entity>.<format> files into")
+    export_parser.add_argument('--format', choices=['jsonl', 'csv', 'columnar'], default='jsonl',
+                               help="Output format (default jsonl)")
+    export_parser.add_argument('--entities', default='countries,foods,recipes',
+                               help="Comma-separated subset of countries,foods,recipes")
+    export_parser.add_argument('--batch-size', type=int, default=None,
+                               help=f"Rows fetched per round trip (default {Config.STREAM_BATCH_SIZE})")
+    
+    commands.add_parser('check', help="Report the schema version, pending migrations and missing indexes")
+    
+    stats_parser = commands.add_parser('stats', help="Summarize the slow-query log by statement")
+    stats_parser.add_argument('--log', default=Config.SLOW_QUERY_LOG,
+                              help=f"Slow-query log to read (default {Config.SLOW_QUERY_LOG})")
+    stats_parser.add_argument('--limit', type=int, default=10, help="Number of statements to show (default 10)")
+    
+    serve_parser = commands.add_parser('serve', help="Serve the CRUD operations as an HTTP/JSON API")
+    serve_parser.add_argument('--host', default=Config.SERVER_HOST, help=f"Address to bind (default {Config.SERVER_HOST})")
+    serve_parser.add_argument('--port', type=int, default=Config.SERVER_PORT, help=f"Port to listen on (default {Config.SERVER_PORT})")
+    serve_parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS,
+                              help=f"Worker threads handling connections (default {Config.SERVER_WORKERS})")
+    serve_parser.add_argument('--access-log', action='store_true', help="Log every request to stderr")
+    
+    # Scripted commands: recipes list, recipe show 42, batch FILE, ...
+    add_commands(commands)
+    
+    return parser.parse_args(argv)
+
+def connect_database(pantry_vault, log=print):
+    """Connect to the database"""
+    log("Testing database connection...")
+    if not pantry_vault.connect():
+        log("Failed to connect to database.")
+        log("Please check your .env configuration and database credentials.")
+        if Config.DB_BACKEND == 'mysql':
+            log("Make sure your MySQL server is running and accessible.")
+        return False
+    return True
+
+def setup_database(pantry_vault, log=print):
+    """Connect to the database and make sure the tables exist"""
+    from migrations import schema_marker_matches, write_schema_marker
+    
+    if not connect_database(pantry_vault, log):
+        return False
+    
+    # A matching marker means a previous start already brought this database up to date
+    if schema_marker_matches(pantry_vault, Config.SCHEMA_MARKER):
+        log("Schema marker matches; skipping schema checks.")
+        return True
+    
+    # Create tables if they don't exist
+    log("Setting up database tables...")
+    if not pantry_vault.create_tables(progress=log):
+        log("Failed to create database tables.")
+        log("Please check your database permissions.")
+        return False
+    
+    # Verify tables exist
+    if not pantry_vault.check_tables_exist():
+        log("Table verification failed.")
+        return False
+    
+    write_schema_marker(pantry_vault, Config.SCHEMA_MARKER)
+    log("Database setup completed successfully!")
+    log("=" * 50)
+    return True
+
+def start_database_setup(pantry_vault, cli, profiler=None):
+    """
+    Connect and migrate on a background thread while the welcome and
+    authentication menus render. The CLI waits for it before the first
+    statement; if it failed, the buffered setup messages are printed.
+    """
+    messages = []
+    
+    def setup(vault):
+        if profiler:
+            return profiler.phase("database setup (background)", setup_database, vault, messages.append)
+        return setup_database(vault, messages.append)
+    
+    def database_ready():
+        if pantry_vault.wait_for_setup():
+            return True
+        for message in messages:
+            print(message)
+        return False
+    
+    pantry_vault.start_background_setup(setup)
+    cli.database_ready = database_ready
+
+def run_import(args):
+    """Run a bulk recipe import"""
+    from importer import RecipeImporter
+    
+    if not os.path.exists(args.file):
+        print(f"Import file not found: {args.file}")
+        return False
+    
+    importer = RecipeImporter(
+        chunk_size=args.chunk_size,
+        checkpoint=args.checkpoint,
+        resume=not args.restart,
+        user_id=args.user_id
+    )
+    summary = importer.run(args.file)
+    print(f"Import finished: {summary['imported']:,} recipes imported, "
+          f"{summary['rejected']:,} rows rejected in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s).")
+    return True
+
+def run_export(args):
+    """Run a streaming export of the vault"""
+    from exporter import export_vault, ENTITIES
+    
+    entities = [entity.strip() for entity in args.entities.split(',') if entity.strip()]
+    unknown = [entity for entity in entities if entity not in ENTITIES]
+    if unknown:
+        print(f"Unknown entities: {', '.join(unknown)}. Choose from: {', '.join(ENTITIES)}")
+        return False
+    
+    report = export_vault(args.output_dir, args.format, entities, args.batch_size)
+    total_rows = sum(entry['rows'] for entry in report.values())
+    total_seconds = sum(entry['seconds'] for entry in report.values())
+    rate = total_rows / total_seconds if total_seconds else 0.0
+    print(f"Export finished: {total_rows:,} rows in {total_seconds:.1f}s ({rate:,.0f} rows/s).")
+    return True
+
+def run_serve(args):
+    """Serve the HTTP/JSON API until interrupted"""
+    from server import serve
+    
+    return serve(args.host, args.port, args.workers, args.access_log)
+
+def run_check(pantry_vault):
+    """Report schema drift without changing the database; returns True if everything is in place"""
+    from migrations import current_version, pending_migrations, check_indexes
+    
+    print(f"Schema version: {current_version(pantry_vault)}")
+    pending = pending_migrations(pantry_vault)
+    for version, description in pending:
+        print(f"Pending migration {version}: {description}")
+    
+    missing = check_indexes(pantry_vault)
+    for table, index, columns, reason in missing:
+        print(f"Missing index {index} on {table} ({', '.join(columns)}): {reason}")
+    
+    if not pending and not missing:
+        print("Schema is up to date and every CRUD query has the index it needs.")
+        return True
+    print("Run the application once to apply pending migrations.")
+    return False
+
+def run_stats(args):
+    """Print the statements with the largest total time in the slow-query log"""
+    from tabulate import tabulate
+    from instrumentation import summarize_slow_log
+    
+    if not args.log or not os.path.exists(args.log):
+        print(f"No slow-query log found at {args.log or '(disabled)'}.")
+        return False
+    
+    rows = summarize_slow_log(args.log, args.limit)
+    if not rows:
+        print("The slow-query log is empty.")
+        return True
+    table_data = [
+        [row['fingerprint'][:80], row['count'], f"{row['total_ms']:.1f}", f"{row['max_ms']:.1f}"]
+        for row in rows
+    ]
+    print(f"Top statements in {args.log} by total time (threshold {Config.SLOW_QUERY_MS:g} ms)")
+    print(tabulate(table_data, headers=["Statement", "Count", "Total ms", "Max ms"], tablefmt="grid"))
+    return True
+
+def main(argv=None):
     """Main entry point for the Pantry CLI application"""
+    from commands import COMMANDS, run_command
     
-    print("Starting Pantry CLI Application...")
-    print("=" * 50)
+    main_started = time.perf_counter()
+    args = parse_args(argv)
+    interactive = args.command is None
+    # Scripted commands keep stdout for their own output
+    status = print if args.command not in COMMANDS else partial(print, file=sys.stderr)
+    
+    profiler = None
+    if args.profile_startup:
+        profiler = StartupProfiler(_STARTED)
+        profiler.record("main.py imports and argument parsing", main_started - _STARTED)
+        profiler.install()
+    
+    def phase(name, fn, *fn_args):
+        return profiler.phase(name, fn, *fn_args) if profiler else fn(*fn_args)
+    
+    # Reading the slow-query log needs no database
+    if args.command == 'stats':
+        sys.exit(0 if run_stats(args) else 1)
+    
+    status("Starting Pantry CLI Application...")
+    status("=" * 50)
     
     # Check dependencies
-    if not check_dependencies():
+    if not phase("dependency check", check_dependencies):
         sys.exit(1)
     
     # Check environment configuration
-    if not check_env_file():
+    if not phase("environment check", check_env_file):
         print("You can still run the application, but database connection may fail.")
         response = input("Continue anyway? (y/n): ").lower().strip()
         if response not in ['y', 'yes']:
             sys.exit(1)
     
     # Import modules
-    pantry_vault, cli = import_modules()
-    if not pantry_vault or not cli:
-        sys.exit(1)
-    
-    # Test database connection
-    print("Testing database connection...")
-    if not pantry_vault.connect():
-        print("Failed to connect to database.")
-        print("Please check your .env configuration and database credentials.")
-        print("Make sure your MySQL server is running and accessible.")
+    pantry_vault, cli = phase("application imports", import_modules, interactive)
+    if not pantry_vault or (interactive and not cli):
         sys.exit(1)
     
+    exit_code = 0
     try:
-        # Create tables if they don't exist
-        print("Setting up database tables...")
-        if not pantry_vault.create_tables():
-            print("Failed to create database tables.")
-            print("Please check your database permissions.")
-            sys.exit(1)
-        
-        # Verify tables exist
-        if not pantry_vault.check_tables_exist():
-            print("Table verification failed.")
-            sys.exit(1)
-        
-        print("Database setup completed successfully!")
-        print("=" * 50)
-        
-        # Start the CLI application
-        cli.run()
+        if args.command == 'check':
+            # The schema marker is ignored here: check always asks the database
+            exit_code = 0 if connect_database(pantry_vault) and run_check(pantry_vault) else 1
+        elif args.command in ('import', 'export', 'serve'):
+            if not phase("database setup", setup_database, pantry_vault):
+                exit_code = 1
+            elif args.command == 'import':
+                exit_code = 0 if run_import(args) else 1
+            elif args.command == 'export':
+                exit_code = 0 if run_export(args) else 1
+            else:
+                exit_code = 0 if run_serve(args) else 1
+        elif not interactive:
+            if not phase("database setup", setup_database, pantry_vault, status):
+                exit_code = 1
+            else:
+                exit_code = 0 if run_command(args) else 1
+        else:
+            # Start the CLI application; the database is set up meanwhile
+            start_database_setup(pantry_vault, cli, profiler)
+            first_menu = None
+            if profiler:
+                # Recorded by the CLI once the first menu is on screen
+                first_menu = lambda: profiler.checkpoint("time to first menu")
+            cli.run(on_first_menu=first_menu)
         
     except KeyboardInterrupt:
         print("\n\nApplication interrupted by user.")
+    except BrokenPipeError:
+        # The reader of a piped command went away (e.g. | head); drop the rest of the output
+        sys.stdout = open(os.devnull, 'w')
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
         print("Full error traceback:")
         traceback.print_exc()
+        exit_code = 1
     finally:
-        # Clean up database connection
+        # Clean up database connection, letting a background setup finish first
         try:
+            pantry_vault.wait_for_setup()
             pantry_vault.disconnect()
         except Exception as e:
             print(f"Error during cleanup: {e}")
-        print("Application terminated successfully.")
+        if profiler:
+            profiler.uninstall()
+            profiler.report()
+        status("Application terminated successfully.")
+    
+    if exit_code:
+        sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,140 @@
+"""
+Async versions of the CRUD classes for asyncio front ends.
+
+Each method awaits the matching synchronous CRUD method on the
+AsyncPantryVault thread pool, so behaviour (validation, caching, index
+updates) is identical. Calls that only read the session object
+(get_current_user, logout_user) run directly on the event loop. Detail
+lookups fetch the header row and the ingredient rows concurrently, and
+independent calls can be combined with asyncio.gather::
+
+    recipe, foods = await asyncio.gather(
+        AsyncRecipeCRUD.get_recipe_details(42),
+        AsyncFoodCRUD.get_foods_by_country(7),
+    )
+
+Every data method of the synchronous classes has an async counterpart,
+except for:
+
+- iter_all_* generators, which fetch their batches lazily and so would
+  query from the event loop. Page with get_all_*(after_name, after_id,
+  limit) instead.
+- display_* methods, which print and do no database work. Call them on
+  the results as they are.
+- Search and match index upkeep (index_*, unindex_*, rebuild_index and
+  the like), which the write methods already do.
+"""
+
+import asyncio
+
+try:
+    from async_db import async_pantry_vault
+    from crud import (
+        UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
+    )
+except ImportError:
+    from pantry.async_db import async_pantry_vault
+    from pantry.crud import (
+        UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
+    )
+
+
+def _threaded(fn):
+    """Wrap a blocking CRUD method as an async staticmethod"""
+    async def call(*args, **kwargs):
+        return await async_pantry_vault.run(fn, *args, **kwargs)
+    call.__name__ = fn.__name__
+    call.__doc__ = fn.__doc__
+    return staticmethod(call)
+
+
+def _inline(fn):
+    """Wrap a CRUD method that does no I/O as an async staticmethod called on the event loop"""
+    async def call(*args, **kwargs):
+        return fn(*args, **kwargs)
+    call.__name__ = fn.__name__
+    call.__doc__ = fn.__doc__
+    return staticmethod(call)
+
+
+async def _details(crud, record_id, owner_key):
+    """Fetch one record and its ingredients with two concurrent queries"""
+    header, ingredients = await asyncio.gather(
+        async_pantry_vault.execute_query(crud.DETAILS_QUERY.format(ids="%s"), (record_id,)),
+        async_pantry_vault.execute_query(crud.INGREDIENTS_QUERY.format(ids="%s"), (record_id,)),
+    )
+    if not header:
+        return None
+    record = header[0]
+    record['ingredients'] = []
+    for ingredient in ingredients:
+        ingredient.pop(owner_key, None)
+        record['ingredients'].append(ingredient)
+    return record
+
+
+class AsyncUserCRUD:
+    """Async user authentication operations"""
+
+    authenticate_user = _threaded(UserCRUD.authenticate_user)
+    register_new_user = _threaded(UserCRUD.register_new_user)
+    get_current_user = _inline(UserCRUD.get_current_user)
+    logout_user = _inline(UserCRUD.logout_user)
+
+
+class AsyncCountryCRUD:
+    """Async country operations"""
+
+    get_all_countries = _threaded(CountryCRUD.get_all_countries)
+    get_country_by_name = _threaded(CountryCRUD.get_country_by_name)
+    add_country = _threaded(CountryCRUD.add_country)
+    get_country_overview = _threaded(CountryCRUD.get_country_overview)
+    rebuild_stats = _threaded(CountryCRUD.rebuild_stats)
+
+
+class AsyncFoodCRUD:
+    """Async food operations"""
+
+    get_all_foods = _threaded(FoodCRUD.get_all_foods)
+    get_foods_by_country = _threaded(FoodCRUD.get_foods_by_country)
+    get_foods_with_ingredients_many = _threaded(FoodCRUD.get_foods_with_ingredients_many)
+    add_food = _threaded(FoodCRUD.add_food)
+
+    @staticmethod
+    async def get_food_with_ingredients(food_id):
+        """Get food details with ingredients, fetching both concurrently"""
+        return await _details(FoodCRUD, food_id, 'food_id')
+
+
+class AsyncRecipeCRUD:
+    """Async recipe operations"""
+
+    get_all_recipes = _threaded(RecipeCRUD.get_all_recipes)
+    get_recipes_by_user = _threaded(RecipeCRUD.get_recipes_by_user)
+    get_recipes_by_country = _threaded(RecipeCRUD.get_recipes_by_country)
+    get_recipe_details_many = _threaded(RecipeCRUD.get_recipe_details_many)
+    add_recipe = _threaded(RecipeCRUD.add_recipe)
+    add_recipe_with_ingredients = _threaded(RecipeCRUD.add_recipe_with_ingredients)
+    add_ingredient_to_recipe = _threaded(RecipeCRUD.add_ingredient_to_recipe)
+    delete_recipe = _threaded(RecipeCRUD.delete_recipe)
+    delete_recipes = _threaded(RecipeCRUD.delete_recipes)
+
+    @staticmethod
+    async def get_recipe_details(recipe_id):
+        """Get detailed recipe information, fetching the recipe and its ingredients concurrently"""
+        return await _details(RecipeCRUD, recipe_id, 'recipe_id')
+
+
+class AsyncIngredientCRUD:
+    """Async ingredient operations"""
+
+    get_all_ingredients = _threaded(IngredientCRUD.get_all_ingredients)
+    resolve_ingredient_ids = _threaded(IngredientCRUD.resolve_ingredient_ids)
+    add_ingredient = _threaded(IngredientCRUD.add_ingredient)
+
+
+class AsyncSearchCRUD:
+    """Async full-text search and pantry matching"""
+
+    search = _threaded(SearchCRUD.search)
+    what_can_i_cook = _threaded(PantryMatchCRUD.what_can_i_cook)
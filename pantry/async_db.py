@@ -0,0 +1,121 @@
+"""
+Asyncio front end for PantryVault.
+
+The database drivers used here (mysql-connector and sqlite3) only block, so
+AsyncPantryVault runs each call on a small dedicated thread pool, with one
+thread per pooled connection. An asyncio.Semaphore of the same size hands
+out connection slots. Coroutines waiting for a slot are suspended on the
+event loop rather than parked in a thread, and a full pool fails with
+PoolTimeout after DB_POOL_TIMEOUT seconds instead of queueing forever.
+
+Transactions are bound to a thread, so a multi-statement transaction is run
+as one blocking function with run_in_transaction().
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from config import Config
+
+try:
+    from db import pantry_vault, PoolTimeout
+except ImportError:
+    from pantry.db import pantry_vault, PoolTimeout
+
+
+class AsyncPantryVault:
+    """Awaitable wrapper around a PantryVault sharing its connection pool"""
+
+    def __init__(self, vault=None, size=None, timeout=None):
+        pool_params = Config.get_pool_params()
+        self.vault = vault or pantry_vault
+        self.size = max(1, int(size or pool_params['size']))
+        self.timeout = timeout if timeout is not None else pool_params['timeout']
+        self._executor = None
+        self._slots = None
+        self._loop = None
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='pantry-db')
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            # A semaphore belongs to one event loop; asyncio.run() makes a new one each time
+            self._slots = asyncio.Semaphore(self.size)
+            self._loop = loop
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking function on the database thread pool and await its result"""
+        self._ensure_started()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"No database connection became free within {self.timeout}s") from None
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            self._slots.release()
+
+    async def connect(self):
+        return await self.run(self.vault.connect)
+
+    async def disconnect(self):
+        """Close the pooled connections and stop the worker threads"""
+        await self.run(self.vault.disconnect)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        self._slots = None
+        self._loop = None
+
+    async def execute_query(self, query, params=None):
+        return await self.run(self.vault.execute_query, query, params)
+
+    async def execute_update(self, query, params=None):
+        return await self.run(self.vault.execute_update, query, params)
+
+    async def execute_many(self, query, seq_params):
+        return await self.run(self.vault.execute_many, query, seq_params)
+
+    async def execute_insert(self, query, params=None):
+        return await self.run(self.vault.execute_insert, query, params)
+
+    async def iter_query(self, query, params=None, batch_size=None):
+        """
+        Async-iterate over result rows, fetching batch_size rows per thread
+        hop. The connection stays checked out of the sync pool until the
+        iteration ends, but a connection slot is only held while a batch is
+        fetched.
+        """
+        batch_size = batch_size or Config.STREAM_BATCH_SIZE
+        rows = self.vault.iter_query(query, params, batch_size)
+        try:
+            while True:
+                batch = await self.run(lambda: list(islice(rows, batch_size)))
+                if not batch:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            await self.run(rows.close)
+
+    async def run_in_transaction(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) inside vault.transaction() on one worker
+        thread. Every statement it makes, including CRUD calls, commits or
+        rolls back together.
+        """
+        def call():
+            with self.vault.transaction():
+                return fn(*args, **kwargs)
+        return await self.run(call)
+
+    def pool_stats(self):
+        return self.vault.pool_stats()
+
+
+# Shared async vault wrapping pantry_vault
+async_pantry_vault = AsyncPantryVault()
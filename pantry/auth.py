@@ -0,0 +1,181 @@
+"""
+In-process login layer in front of PantryVault.open_session.
+
+Every attempt first takes a token from two buckets: one per user name and,
+when the caller knows where the attempt came from (the HTTP server passes
+the client address), one per source. An empty bucket rejects the attempt
+with LoginThrottled before any query runs. A successful login gives its
+tokens back, so only failures wear a bucket down.
+
+Successful verifications are remembered for AUTH_CACHE_TTL seconds, keyed
+on an HMAC of the user name and password under a per-process random key
+(no password is kept), so a user logging in again shortly afterwards skips
+both the users query and the deliberately slow hash.
+
+Both structures are bounded: the cache holds AUTH_CACHE_ENTRIES
+verifications and each limiter tracks LOGIN_THROTTLE_KEYS keys, dropping
+the least recently used. stats() reports cache hits, throttled attempts and
+the logins that reached the database.
+"""
+
+import hashlib
+import hmac
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+try:
+    from cache import TTLCache
+    from db import pantry_vault, Session
+except ImportError:
+    from pantry.cache import TTLCache
+    from pantry.db import pantry_vault, Session
+
+
+# Longest wait reported to a throttled caller; a bucket with no refill rate never refills
+MAX_RETRY_AFTER = 24 * 60 * 60
+
+
+class LoginThrottled(Exception):
+    """Raised when a login is attempted too often; retry_after is in seconds"""
+
+    def __init__(self, retry_after):
+        self.retry_after = max(1, math.ceil(min(retry_after, MAX_RETRY_AFTER)))
+        super().__init__(f"Too many login attempts. Try again in {self.retry_after} seconds.")
+
+
+class RateLimiter:
+    """
+    Token bucket per key: up to ``burst`` attempts at once, refilled at
+    ``per_minute``. Only the ``max_keys`` most recently used keys are kept;
+    a forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, burst, per_minute, max_keys=10000):
+        self.burst = max(1.0, float(burst))
+        self.rate = max(per_minute, 0.0) / 60.0
+        self.max_keys = max(1, int(max_keys))
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def acquire(self, key):
+        """Take a token for key; returns 0 on success, else seconds until one is free"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+                return (1 - tokens) / self.rate if self.rate else float('inf')
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+    def refund(self, key):
+        """Give back the token taken for key"""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key] = (min(self.burst, self._tokens(key, now) + 1), now)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class Authenticator:
+    """Throttled, cached front end for PantryVault.open_session"""
+
+    def __init__(self, vault, cache=None, users=None, sources=None):
+        self.vault = vault
+        self.cache = cache or TTLCache(max_entries=Config.AUTH_CACHE_ENTRIES, ttl=Config.AUTH_CACHE_TTL)
+        # A limiter with no keys yet is empty, so test for None rather than truth
+        if users is None:
+            users = RateLimiter(Config.LOGIN_BURST, Config.LOGIN_PER_MINUTE, Config.LOGIN_THROTTLE_KEYS)
+        if sources is None:
+            sources = RateLimiter(Config.LOGIN_SOURCE_BURST, Config.LOGIN_SOURCE_PER_MINUTE,
+                                  Config.LOGIN_THROTTLE_KEYS)
+        self.users = users
+        self.sources = sources
+        self._key = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ('attempts', 'cache_hits', 'db_queries', 'succeeded', 'failed', 'throttled_user', 'throttled_source'), 0
+        )
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _cache_key(self, username, password):
+        message = username.encode('utf-8') + b'\0' + password.encode('utf-8')
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def _acquire(self, username, source):
+        """Take a token from every bucket the attempt uses; returns them for refund()"""
+        taken = []
+        for limiter, key, counter in ((self.users, username.lower(), 'throttled_user'),
+                                      (self.sources, source, 'throttled_source')):
+            if key is None:
+                continue
+            wait = limiter.acquire(key)
+            if wait:
+                for held, held_key in taken:
+                    held.refund(held_key)
+                self._count(counter)
+                raise LoginThrottled(wait)
+            taken.append((limiter, key))
+        return taken
+
+    def authenticate(self, username, password, source=None):
+        """
+        Return a Session for the credentials, or None if they are wrong.
+        Raises LoginThrottled when the user name or source has run out of
+        attempts.
+        """
+        self._count('attempts')
+        taken = self._acquire(username, source)
+        key = self._cache_key(username, password)
+        user = self.cache.get(key)
+        if user is not None:
+            self._count('cache_hits')
+            session = Session(self.vault, dict(user))
+        else:
+            self._count('db_queries')
+            session = self.vault.open_session(username, password)
+            if session:
+                self.cache.set(key, dict(session.user))
+
+        if not session:
+            self._count('failed')
+            return None
+        self._count('succeeded')
+        for limiter, limiter_key in taken:
+            limiter.refund(limiter_key)
+        return session
+
+    def forget(self):
+        """Drop every cached verification, e.g. after passwords were changed outside the app"""
+        self.cache.invalidate()
+
+    def stats(self):
+        """Snapshot of login counters, cache counters and tracked limiter keys"""
+        with self._lock:
+            snapshot = dict(self._counts)
+        snapshot['cache'] = self.cache.stats()
+        snapshot['tracked_users'] = len(self.users)
+        snapshot['tracked_sources'] = len(self.sources)
+        return snapshot
+
+
+authenticator = Authenticator(pantry_vault)
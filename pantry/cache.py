@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from config import Config
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Used for small, rarely changing reference data so repeated lookups skip
+    the database round trip. Writers are expected to call ``invalidate``.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return a fresh cached value, or default on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, cache_empty=True):
+        """Return the cached value for key, calling loader() to fill a miss"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value or cache_empty:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_WRITE_TARGET = re.compile(
+    r'^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)', re.IGNORECASE
+)
+_SCHEMA_CHANGE = re.compile(r'^\s*(?:CREATE|DROP|ALTER|TRUNCATE)\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _written_table(query):
+    """Table a statement writes to, '*' for schema changes, or None for reads"""
+    match = _WRITE_TARGET.match(query)
+    if match:
+        return match.group(1).lower()
+    if _SCHEMA_CHANGE.match(query):
+        return '*'
+    return None
+
+
+class DataVersions:
+    """
+    Per-table change counters for caches of derived data, such as rendered
+    tables. A cache keyed on version(tables) misses as soon as one of those
+    tables is written.
+
+    observer(vault) is a query hook that bumps the table of every write
+    statement, and bumps it again when the surrounding transaction commits,
+    so nothing rendered from uncommitted rows outlives the commit. Only
+    writes made by this process are seen, which is why such caches should
+    still expire.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        # Bumped by schema changes, which invalidate every table
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def bump(self, table):
+        with self._lock:
+            if table == '*':
+                self._generation += 1
+            else:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def version(self, *tables):
+        """Hashable snapshot of the counters for tables"""
+        with self._lock:
+            return (self._generation,) + tuple(self._versions.get(table, 0) for table in tables)
+
+    def observer(self, vault):
+        """Query hook for vault that bumps the tables its statements write"""
+        def observe(query, seconds, rows, error):
+            if error is not None:
+                return
+            table = _written_table(query)
+            if table is not None:
+                self.bump(table)
+                vault.on_commit(lambda: self.bump(table))
+        return observe
+
+
+# Shared cache for countries and the ingredient name -> id map
+reference_cache = TTLCache(Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL)
+
+# Change counters for every table written through the shared vault
+data_versions = DataVersions()
@@ -2,6 +2,7 @@ import sys
 import os
 import getpass
 from tabulate import tabulate
+from config import Config
 
 # Add current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,22 +10,52 @@ sys.path.insert(0, current_dir)
 
 # Try different import patterns
 try:
-    from crud import UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD
+    from crud import UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
 except ImportError:
     try:
-        from pantry.crud import UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD
+        from pantry.crud import UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
     except ImportError:
         print("Error: Cannot import CRUD classes from crud module")
         print("Please ensure crud.py is in the same directory as this file.")
         sys.exit(1)
 
+try:
+    import validation
+    from instrumentation import query_stats
+    from auth import authenticator, LoginThrottled
+except ImportError:
+    from pantry import validation
+    from pantry.instrumentation import query_stats
+    from pantry.auth import authenticator, LoginThrottled
+
 class PantryCLI:
     """Main CLI interface for the Pantry application"""
     
+    MAIN_MENU_OPTIONS = [
+        ["1", "Browse Foods by Country"],
+        ["2", "View All Foods"],
+        ["3", "View Food Details"],
+        ["4", "Add New Food"],
+        ["5", "Recipes Menu"],
+        ["6", "Ingredients Menu"],
+        ["7", "Search Recipes & Foods"],
+        ["8", "Diagnostics"],
+        ["9", "Logout"],
+        ["10", "Exit Program"]
+    ]
+    
     def __init__(self):
         self.running = True
         self.authenticated = False
-        self.current_user = None
+        # The logged-in user's Session, passed to the CRUD calls made for them
+        self.session = None
+        # Set by main.py when the database is being set up in the background
+        self.database_ready = None
+    
+    @property
+    def current_user(self):
+        """The logged-in user's row, or None"""
+        return UserCRUD.get_current_user(self.session)
     
     def display_welcome(self):
         """Display welcome message"""
@@ -48,10 +79,13 @@ class PantryCLI:
         print(tabulate(auth_options, headers=["Option", "Action"], tablefmt="simple"))
         print("-" * 30)
     
-    def handle_authentication(self):
-        """Handle user authentication"""
+    def handle_authentication(self, on_first_menu=None):
+        """Handle user authentication; on_first_menu() is called once the menu is first shown"""
         while not self.authenticated and self.running:
             self.display_auth_menu()
+            if on_first_menu:
+                on_first_menu()
+                on_first_menu = None
             choice = self.get_user_choice("Enter your choice: ", ["1", "2", "3"])
             
             if choice == "1":
@@ -62,6 +96,14 @@ class PantryCLI:
                 print("\nGoodbye!")
                 self.running = False
     
+    def wait_for_database(self):
+        """Block until the background database setup is done; stop the CLI if it failed"""
+        if self.database_ready is None or self.database_ready():
+            return True
+        print("\nThe database is not available. Exiting.")
+        self.running = False
+        return False
+    
     def login(self):
         """Handle user login"""
         print("\nUSER LOGIN")
@@ -78,10 +120,14 @@ class PantryCLI:
                 print("Password is required.")
                 return
             
+            # The database may still be connecting while the credentials are typed
+            if not self.wait_for_database():
+                return
+            
             print("Authenticating...")
-            if UserCRUD.authenticate_user(username, password):
+            self.session = UserCRUD.authenticate_user(username, password)
+            if self.session:
                 self.authenticated = True
-                self.current_user = UserCRUD.get_current_user()
                 if self.current_user:
                     print(f"Welcome back, {self.current_user['user_name']}!")
                 else:
@@ -89,6 +135,8 @@ class PantryCLI:
             else:
                 print("Invalid username or password.")
                 
+        except LoginThrottled as e:
+            print(e)
         except KeyboardInterrupt:
             print("\nLogin cancelled.")
         except Exception as e:
@@ -132,6 +180,9 @@ class PantryCLI:
                 print("Passwords do not match.")
                 return
             
+            if not self.wait_for_database():
+                return
+            
             # Optional: Select country
             print("\nSelect your country (optional):")
             countries = CountryCRUD.get_all_countries()
@@ -159,9 +210,9 @@ class PantryCLI:
             if success:
                 print(f"✓ {message}")
                 # Automatically log in the user after registration
-                if UserCRUD.authenticate_user(username, password):
+                self.session = UserCRUD.authenticate_user(username, password)
+                if self.session:
                     self.authenticated = True
-                    self.current_user = UserCRUD.get_current_user()
                     print(f"Welcome, {username}! You are now logged in.")
                 else:
                     print("Registration succeeded but automatic login failed. Please try logging in manually.")
@@ -177,22 +228,11 @@ class PantryCLI:
         """Display the main menu options"""
         user_info = f"Logged in as: {self.current_user['user_name']}" if self.current_user else ""
         
-        menu_options = [
-            ["1", "Browse Foods by Country"],
-            ["2", "View All Foods"],
-            ["3", "View Food Details"],
-            ["4", "Add New Food"],
-            ["5", "Recipes Menu"],
-            ["6", "Ingredients Menu"],
-            ["7", "Logout"],
-            ["8", "Exit Program"]
-        ]
-        
         print(f"\nMAIN MENU")
         if user_info:
             print(f"{user_info}")
         print("-" * 40)
-        print(tabulate(menu_options, headers=["Option", "Description"], tablefmt="simple"))
+        print(tabulate(self.MAIN_MENU_OPTIONS, headers=["Option", "Description"], tablefmt="simple"))
         print("-" * 40)
     
     def get_user_choice(self, prompt="Enter your choice: ", valid_choices=None, numeric_only=False):
@@ -217,22 +257,23 @@ class PantryCLI:
     def browse_foods_by_country(self):
         """Handle browsing foods by country"""
         try:
-            countries = CountryCRUD.get_all_countries()
+            # One read of the maintained per-country counts
+            countries = CountryCRUD.get_country_overview()
             
             if not countries:
                 print("No countries found in database.")
                 return
             
-            print("\nAVAILABLE COUNTRIES")
+            print("\nCOUNTRY OVERVIEW")
             print("-" * 30)
             
             country_options = []
             for i, country in enumerate(countries, 1):
-                country_options.append([str(i), country['name']])
+                country_options.append([str(i), country['name'], country['foods'], country['recipes'], country['ingredients']])
             
-            country_options.append([str(len(countries) + 1), "Back to Main Menu"])
+            country_options.append([str(len(countries) + 1), "Back to Main Menu", "", "", ""])
             
-            print(tabulate(country_options, headers=["Option", "Country"], tablefmt="simple"))
+            print(tabulate(country_options, headers=["Option", "Country", "Foods", "Recipes", "Ingredients"], tablefmt="simple"))
             
             valid_choices = [str(i) for i in range(1, len(countries) + 2)]
             choice = self.get_user_choice("Select a country: ", valid_choices)
@@ -251,40 +292,87 @@ class PantryCLI:
         except Exception as e:
             print(f"Error browsing foods by country: {e}")
     
+    def browse_pages(self, fetch_page, show_page, empty_message, select=None, item="item"):
+        """
+        Show a listing one keyset page at a time with next/previous navigation.
+
+        fetch_page is called with after_name/after_id/limit and only the
+        current page is ever held in memory. If select is given, typing an ID
+        calls it; a True result ends browsing.
+        """
+        page_size = Config.PAGE_SIZE
+        # Cursor (name, id) that each visited page starts after
+        cursors = [(None, None)]
+        loaded = None
+        while True:
+            if loaded != len(cursors):
+                after_name, after_id = cursors[-1]
+                rows = fetch_page(after_name=after_name, after_id=after_id, limit=page_size + 1)
+                has_next = len(rows) > page_size
+                rows = rows[:page_size]
+                loaded = len(cursors)
+                
+                if not rows and len(cursors) == 1:
+                    print(f"\n{empty_message}")
+                    return
+                
+                show_page(rows, len(cursors))
+            
+            actions = []
+            valid_choices = ["b"]
+            if has_next:
+                actions.append("[n] Next page")
+                valid_choices.append("n")
+            if len(cursors) > 1:
+                actions.append("[p] Previous page")
+                valid_choices.append("p")
+            actions.append("[b] Back")
+            print("  ".join(actions))
+            
+            prompt = f"Enter {item} ID to view details or choose an option: " if select else "Choose an option: "
+            choice = input(f"\n{prompt}").strip().lower()
+            
+            if choice == "n" and has_next:
+                cursors.append((rows[-1]['name'], rows[-1]['id']))
+            elif choice == "p" and len(cursors) > 1:
+                cursors.pop()
+            elif choice in ("b", "back"):
+                return
+            elif select and choice.isdigit():
+                if select(int(choice)):
+                    return
+            else:
+                print(f"Please enter a valid choice: {', '.join(valid_choices)}")
+    
     def view_all_foods(self):
         """Display all foods"""
         try:
-            foods = FoodCRUD.get_all_foods()
-            FoodCRUD.display_foods_table(foods, "All Foods")
+            self.browse_pages(
+                FoodCRUD.get_all_foods,
+                lambda foods, page: FoodCRUD.display_foods_table(foods, f"All Foods (page {page})"),
+                "No foods found."
+            )
         except Exception as e:
             print(f"Error viewing all foods: {e}")
     
     def view_food_details(self):
         """View detailed food information"""
+        def show_food(food_id):
+            food = FoodCRUD.get_food_with_ingredients(food_id)
+            if food:
+                FoodCRUD.display_food_details(food)
+                return True
+            print("Food not found.")
+            return False
+        
         try:
-            foods = FoodCRUD.get_all_foods()
-            
-            if not foods:
-                print("No foods found.")
-                return
-            
-            FoodCRUD.display_foods_table(foods)
-            
-            while True:
-                food_id_input = input("\nEnter food ID to view details (or 'back' to return): ").strip()
-                if food_id_input.lower() == 'back':
-                    return
-                if not food_id_input.isdigit():
-                    print("Please enter a valid numeric food ID.")
-                    continue
-                food_id = int(food_id_input)
-                food = FoodCRUD.get_food_with_ingredients(food_id)
-                if food:
-                    FoodCRUD.display_food_details(food)
-                    break
-                else:
-                    print("Food not found.")
-                
+            self.browse_pages(
+                FoodCRUD.get_all_foods,
+                lambda foods, page: FoodCRUD.display_foods_table(foods, f"Foods (page {page})"),
+                "No foods found.",
+                select=show_food,
+                item="food"
+            )
         except Exception as e:
             print(f"Error viewing food details: {e}")
     
@@ -327,11 +415,9 @@ class PantryCLI:
             if choice == str(len(countries) + 1):
                 # Add new country
                 new_country = input("Enter new country name: ").strip()
-                if not new_country:
-                    print("Country name is required.")
-                    return
-                if not all(c.isalpha() or c.isspace() for c in new_country):
-                    print("Country name must contain only letters and spaces.")
+                error = validation.validate_country_name(new_country)
+                if error:
+                    print(error)
                     return
                 
                 if CountryCRUD.add_country(new_country):
@@ -382,33 +468,30 @@ class PantryCLI:
                 print(tabulate(ingredient_options, headers=["Option", "Action"], tablefmt="simple"))
                 
                 choice = self.get_user_choice("Enter your choice: ", ["1", "2", "3"])
-                
-                if choice == "1":
-                    self.view_all_ingredients()
-                elif choice == "2":
-                    self.add_new_ingredient()
-                elif choice == "3":
+                if choice == "3":
                     break
+                
+                with query_stats.action(f"Ingredients > {dict(ingredient_options)[choice]}"):
+                    if choice == "1":
+                        self.view_all_ingredients()
+                    elif choice == "2":
+                        self.add_new_ingredient()
                     
             except Exception as e:
                 print(f"Error in ingredients menu: {e}")
     
     def view_all_ingredients(self):
         """Display all ingredients"""
-        try:
-            ingredients = IngredientCRUD.get_all_ingredients()
-            
-            if not ingredients:
-                print("\nNo ingredients found.")
-                return
-            
+        def show_page(ingredients, page):
             headers = ["ID", "Ingredient Name"]
             table_data = [[ing['id'], ing['name']] for ing in ingredients]
             
-            print("\nAll Ingredients")
+            print(f"\nAll Ingredients (page {page})")
             print("=" * 40)
             print(tabulate(table_data, headers=headers, tablefmt="grid"))
-            
+        
+        try:
+            self.browse_pages(IngredientCRUD.get_all_ingredients, show_page, "No ingredients found.")
         except Exception as e:
             print(f"Error viewing ingredients: {e}")
     
@@ -449,23 +532,27 @@ class PantryCLI:
                     ["2", "View Recipe Details"],
                     ["3", "Add New Recipe"],
                     ["4", "Delete My Recipe"],
-                    ["5", "Back to Main Menu"]
+                    ["5", "What Can I Cook?"],
+                    ["6", "Back to Main Menu"]
                 ]
                 
                 print(tabulate(recipe_options, headers=["Option", "Action"], tablefmt="simple"))
                 
-                choice = self.get_user_choice("Enter your choice: ", ["1", "2", "3", "4", "5"])
-                
-                if choice == "1":
-                    self.view_all_recipes()
-                elif choice == "2":
-                    self.view_recipe_details()
-                elif choice == "3":
-                    self.add_new_recipe()
-                elif choice == "4":
-                    self.delete_my_recipe()
-                elif choice == "5":
+                choice = self.get_user_choice("Enter your choice: ", ["1", "2", "3", "4", "5", "6"])
+                if choice == "6":
                     break
+                
+                with query_stats.action(f"Recipes > {dict(recipe_options)[choice]}"):
+                    if choice == "1":
+                        self.view_all_recipes()
+                    elif choice == "2":
+                        self.view_recipe_details()
+                    elif choice == "3":
+                        self.add_new_recipe()
+                    elif choice == "4":
+                        self.delete_my_recipe()
+                    elif choice == "5":
+                        self.what_can_i_cook()
                     
             except Exception as e:
                 print(f"Error in recipes menu: {e}")
@@ -473,37 +560,32 @@ class PantryCLI:
     def view_all_recipes(self):
         """Display all recipes"""
         try:
-            recipes = RecipeCRUD.get_all_recipes()
-            RecipeCRUD.display_recipes_table(recipes)
+            self.browse_pages(
+                RecipeCRUD.get_all_recipes,
+                lambda recipes, page: RecipeCRUD.display_recipes_table(recipes, f"Recipes (page {page})"),
+                "No recipes found."
+            )
         except Exception as e:
             print(f"Error viewing recipes: {e}")
     
     def view_recipe_details(self):
         """Display detailed recipe information"""
+        def show_recipe(recipe_id):
+            recipe = RecipeCRUD.get_recipe_details(recipe_id)
+            if recipe:
+                RecipeCRUD.display_recipe_details(recipe)
+                return True
+            print("Recipe not found.")
+            return False
+        
         try:
-            recipes = RecipeCRUD.get_all_recipes()
-            
-            if not recipes:
-                print("No recipes found.")
-                return
-            
-            RecipeCRUD.display_recipes_table(recipes)
-            
-            recipe_id_input = input("\nEnter recipe ID to view details (or 'back' to return): ").strip()
-            
-            if recipe_id_input.lower() == 'back':
-                return
-            
-            try:
-                recipe_id = int(recipe_id_input)
-                recipe = RecipeCRUD.get_recipe_details(recipe_id)
-                if recipe:
-                    RecipeCRUD.display_recipe_details(recipe)
-                else:
-                    print("Recipe not found.")
-            except ValueError:
-                print("Please enter a valid recipe ID.")
-                
+            self.browse_pages(
+                RecipeCRUD.get_all_recipes,
+                lambda recipes, page: RecipeCRUD.display_recipes_table(recipes, f"Recipes (page {page})"),
+                "No recipes found.",
+                select=show_recipe,
+                item="recipe"
+            )
         except Exception as e:
             print(f"Error viewing recipe details: {e}")
     
@@ -515,20 +597,9 @@ class PantryCLI:
             # Get recipe name with validation
             while True:
                 name = input("Enter recipe name: ").strip()
-                if not name:
-                    print("Recipe name is required.")
-                    continue
-                if len(name) < 4:
-                    print("Recipe name must be at least 4 characters long.")
-                    continue
-                if name.isdigit():
-                    print("Recipe name cannot be only numbers.")
-                    continue
-                if name[0].isdigit():
-                    print("Recipe name cannot start with a number.")
-                    continue
-                if not all(c.isalpha() or c.isspace() for c in name):
-                    print("Recipe name must contain only letters and spaces.")
+                error = validation.validate_recipe_name(name)
+                if error:
+                    print(error)
                     continue
                 break
             # Select country
@@ -572,124 +643,218 @@ class PantryCLI:
             # Description validation
             while True:
                 instructions = input("Instructions (required): ").strip()
-                if not instructions:
-                    print("Instructions are required.")
-                    continue
-                if instructions.isdigit():
-                    print("Instructions cannot be only numbers.")
-                    continue
-                if instructions[0].isdigit():
-                    print("Instructions cannot start with a number.")
+                error = validation.validate_instructions(instructions)
+                if error:
+                    print(error)
                     continue
                 break
             # Prep time validation
             while True:
                 prep_time = input("Preparation time (e.g., '30 minutes'): ").strip()
-                if not prep_time:
-                    break
-                if prep_time.isdigit():
-                    print("Preparation time cannot be only numbers.")
+                error = validation.validate_duration(prep_time, "Preparation time")
+                if error:
+                    print(error)
                     continue
                 break
             # Cook time validation
             while True:
                 cook_time = input("Cooking time (e.g., '45 minutes'): ").strip()
-                if not cook_time:
-                    break
-                if cook_time.isdigit():
-                    print("Cooking time cannot be only numbers.")
+                error = validation.validate_duration(cook_time, "Cooking time")
+                if error:
+                    print(error)
                     continue
-                break            # Servings validation
+                break
+            # Servings validation
             while True:
                 servings_input = input("Number of servings (optional): ").strip()
-                if not servings_input:
-                    servings = None
-                    break
-                if not servings_input.isdigit() or int(servings_input) <= 0:
-                    print("Please enter a valid positive integer for servings.")
+                error = validation.validate_servings(servings_input)
+                if error:
+                    print(error)
                     continue
-                servings = int(servings_input)
+                servings = int(servings_input) if servings_input else None
                 break
             family_notes = input("Family notes/story (optional): ").strip()
-            # Add recipe to database
-            user_id = self.current_user['id'] if self.current_user and 'id' in self.current_user else None
-            recipe_id = RecipeCRUD.add_recipe(name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id)
-            if recipe_id:
-                print(f"✓ Recipe '{name}' added successfully!")
-                print("\nNow, let's add ingredients to your recipe.")
+            print("\nNow, let's add ingredients to your recipe.")
+            ingredients = []
+            while True:
+                ing_name = input("Ingredient name (leave blank to finish): ").strip()
+                if not ing_name:
+                    break
+                error = validation.validate_ingredient_name(ing_name)
+                if error:
+                    print(error)
+                    continue
                 while True:
-                    ing_name = input("Ingredient name (leave blank to finish): ").strip()
-                    if not ing_name:
-                        break
-                    if len(ing_name) < 2:
-                        print("Ingredient name must be at least 2 characters long.")
-                        continue
-                    if ing_name.isdigit():
-                        print("Ingredient name cannot be only numbers.")
-                        continue
-                    if ing_name[0].isdigit():
-                        print("Ingredient name cannot start with a number.")
-                        continue
-                    if not all(c.isalpha() or c.isspace() for c in ing_name):
-                        print("Ingredient name must contain only letters and spaces.")
+                    quantity = input("Quantity (e.g., 2): ").strip()
+                    error = validation.validate_quantity(quantity)
+                    if error:
+                        print(error)
                         continue
-                    while True:
-                        quantity = input("Quantity (e.g., 2): ").strip()
-                        if not quantity:
-                            print("Quantity is required.")
-                            continue
-                        try:
-                            float(quantity)
-                            break
-                        except ValueError:
-                            print("Please enter a valid number for quantity.")
-                    unit = input("Unit (e.g., cups, tbsp): ").strip()
-                    ingredient_id = IngredientCRUD.add_ingredient(ing_name)
-                    if ingredient_id:
-                        if RecipeCRUD.add_ingredient_to_recipe(recipe_id, ingredient_id, quantity, unit):
-                            print(f"✓ Added {quantity} {unit} {ing_name} to recipe.")
-                        else:
-                            print(f"✗ Failed to link ingredient '{ing_name}' to recipe.")
-                    else:
-                        print(f"✗ Failed to add ingredient '{ing_name}'.")
+                    break
+                unit = input("Unit (e.g., cups, tbsp): ").strip()
+                ingredients.append({'name': ing_name, 'quantity': quantity, 'unit': unit})
+            # Add recipe and all its ingredients to database in one transaction
+            recipe = {
+                'name': name,
+                'country_id': country_id,
+                'instructions': instructions,
+                'prep_time': prep_time,
+                'cook_time': cook_time,
+                'servings': servings,
+                'family_notes': family_notes
+            }
+            recipe_id = RecipeCRUD.add_recipe_with_ingredients(recipe, ingredients, session=self.session)
+            if recipe_id:
+                print(f"✓ Recipe '{name}' added successfully!")
+                for ing in ingredients:
+                    print(f"✓ Added {ing['quantity']} {ing['unit']} {ing['name']} to recipe.")
                 print("All ingredients added!")
             else:
                 print(f"✗ Failed to add recipe '{name}'.")
         except Exception as e:
             print(f"Error adding recipe: {e}")
     
+    def what_can_i_cook(self):
+        """Rank recipes by how many of their ingredients the user has"""
+        try:
+            print("\nWHAT CAN I COOK?")
+            print("-" * 30)
+            entered = input("Enter the ingredients you have, separated by commas: ")
+            names = list(dict.fromkeys(name.strip() for name in entered.split(",") if name.strip()))
+            if not names:
+                print("Please enter at least one ingredient.")
+                return
+            
+            max_missing = input("Show recipes missing at most how many ingredients? (default 2): ").strip()
+            if max_missing and not max_missing.isdigit():
+                print("Please enter a whole number.")
+                return
+            max_missing = int(max_missing) if max_missing else 2
+            
+            matches, unknown = PantryMatchCRUD.what_can_i_cook(names, max_missing=max_missing, limit=Config.PAGE_SIZE)
+            if unknown:
+                print(f"Not used by any recipe: {', '.join(unknown)}")
+            PantryMatchCRUD.display_matches_table(matches)
+            if not matches:
+                return
+            
+            choice = input("\nEnter a recipe ID to view details (or press Enter to go back): ").strip()
+            if not choice:
+                return
+            if not choice.isdigit():
+                print("Invalid recipe ID.")
+                return
+            RecipeCRUD.display_recipe_details(RecipeCRUD.get_recipe_details(int(choice)))
+        except Exception as e:
+            print(f"Error matching recipes: {e}")
+    
     def delete_my_recipe(self):
-        """Allow the user to delete their own recipe by ID"""
+        """Allow the user to delete one or more of their own recipes by ID"""
         try:
-            user_id = self.current_user['id'] if self.current_user and 'id' in self.current_user else None
-            if not user_id:
+            if not self.session:
                 print("User ID not found. Cannot delete recipes.")
                 return
-            recipes = RecipeCRUD.get_all_recipes()
-            my_recipes = [r for r in recipes if r.get('user_id') == user_id]
+            my_recipes = RecipeCRUD.get_recipes_by_user(session=self.session)
             if not my_recipes:
                 print("You have no recipes to delete.")
                 return
             RecipeCRUD.display_recipes_table(my_recipes, title="Your Recipes")
-            recipe_ids = [str(r['id']) for r in my_recipes]
+            recipe_ids = {str(r['id']) for r in my_recipes}
             while True:
-                recipe_id = input("Enter the ID of the recipe to delete (or 'back' to cancel): ").strip()
-                if recipe_id.lower() == 'back':
+                selection = input("Enter the ID(s) of the recipe(s) to delete, separated by commas (or 'back' to cancel): ").strip()
+                if selection.lower() == 'back':
                     return
-                if not recipe_id.isdigit():
-                    print("Please enter a valid numeric recipe ID.")
+                chosen = [part.strip() for part in selection.split(",") if part.strip()]
+                if not chosen or not all(part.isdigit() for part in chosen):
+                    print("Please enter valid numeric recipe IDs.")
                     continue
-                if recipe_id not in recipe_ids:
-                    print("Invalid recipe ID.")
+                invalid = [part for part in chosen if part not in recipe_ids]
+                if invalid:
+                    print(f"Invalid recipe ID(s): {', '.join(invalid)}")
                     continue
-                if RecipeCRUD.delete_recipe(int(recipe_id), user_id):
+                deleted = RecipeCRUD.delete_recipes([int(part) for part in chosen], session=self.session)
+                if deleted == 1:
                     print("Recipe deleted successfully!")
+                elif deleted:
+                    print(f"{deleted} recipes deleted successfully!")
                 else:
                     print("Failed to delete recipe. Make sure you own this recipe.")
                 break
         except Exception as e:
             print(f"Error deleting recipe: {e}")
     
+    def search(self):
+        """Search recipes and foods by name, description, notes or ingredient"""
+        try:
+            query = input("\nSearch for (e.g. 'jollof' or 'tom rice'): ").strip()
+            if not query:
+                print("Please enter at least one word to search for.")
+                return
+            
+            results = SearchCRUD.search(query, limit=Config.PAGE_SIZE)
+            SearchCRUD.display_search_results(results, query)
+            if not results:
+                return
+            
+            choice = input("\nEnter a result # to view details (or press Enter to go back): ").strip()
+            if not choice:
+                return
+            if not choice.isdigit() or not 1 <= int(choice) <= len(results):
+                print("Invalid result number.")
+                return
+            
+            result = results[int(choice) - 1]
+            if result['type'] == 'recipe':
+                RecipeCRUD.display_recipe_details(RecipeCRUD.get_recipe_details(result['id']))
+            else:
+                FoodCRUD.display_food_details(FoodCRUD.get_food_with_ingredients(result['id']))
+        except Exception as e:
+            print(f"Error searching: {e}")
+    
+    def show_diagnostics(self):
+        """Display the busiest SQL statements and the cost of each menu action"""
+        try:
+            statements = query_stats.top_statements(limit=10)
+            print("\nDIAGNOSTICS - TOP STATEMENTS BY TOTAL TIME")
+            print("=" * 70)
+            if statements:
+                table_data = []
+                for stat in statements:
+                    statement = stat['fingerprint']
+                    if len(statement) > 60:
+                        statement = statement[:57] + "..."
+                    table_data.append([
+                        statement, stat['count'], f"{stat['total_ms']:.1f}", f"{stat['mean_ms']:.2f}",
+                        f"{stat['p95_ms']:g}",
+                        stat['rows'], stat['errors']
+                    ])
+                print(tabulate(table_data, headers=["Statement", "Calls", "Total ms", "Mean ms", "p95 ms", "Rows", "Errors"], tablefmt="grid"))
+            else:
+                print("No statements recorded yet.")
+            
+            actions = query_stats.actions()
+            if actions:
+                print("\nMENU ACTIONS")
+                print("=" * 70)
+                table_data = [
+                    [action['name'], action['runs'], action['statements'], f"{action['statements_per_run']:.1f}",
+                     action['max_statements'], f"{action['seconds'] * 1000:.1f}"]
+                    for action in actions
+                ]
+                print(tabulate(table_data, headers=["Action", "Runs", "Statements", "Per Run", "Max", "DB ms"], tablefmt="grid"))
+            
+            auth = authenticator.stats()
+            print("\nLOGINS")
+            print("=" * 70)
+            print(tabulate([[auth['attempts'], auth['cache_hits'], auth['db_queries'], auth['failed'],
+                             auth['throttled_user'] + auth['throttled_source']]],
+                           headers=["Attempts", "Cache Hits", "DB Queries", "Failed", "Throttled"], tablefmt="grid"))
+            
+            if query_stats.slow_log_path:
+                print(f"\nStatements slower than {query_stats.slow_ms:g} ms are logged to {query_stats.slow_log_path}")
+        except Exception as e:
+            print(f"Error showing diagnostics: {e}")
+    
     def logout(self):
         """Handle user logout"""
         try:
@@ -697,46 +862,53 @@ class PantryCLI:
                 print(f"\nGoodbye, {self.current_user['user_name']}!")
             else:
                 print("\nGoodbye!")
-            UserCRUD.logout_user()
+            UserCRUD.logout_user(self.session)
             self.authenticated = False
-            self.current_user = None
+            self.session = None
         except Exception as e:
             print(f"Error during logout: {e}")
             self.authenticated = False
-            self.current_user = None
+            self.session = None
     
-    def run(self):
-        """Main application loop"""
+    def run(self, on_first_menu=None):
+        """Main application loop; on_first_menu() is called right after the first menu is printed"""
         try:
             self.display_welcome()
             
             # Handle authentication first
-            self.handle_authentication()
+            self.handle_authentication(on_first_menu)
             
             # Main application loop (only if authenticated)
             while self.running and self.authenticated:
                 self.display_main_menu()
-                choice = self.get_user_choice("Enter your choice: ", ["1", "2", "3", "4", "5", "6", "7", "8"])
+                labels = dict(self.MAIN_MENU_OPTIONS)
+                choice = self.get_user_choice("Enter your choice: ", list(labels))
                 
-                if choice == "1":
-                    self.browse_foods_by_country()
-                elif choice == "2":
-                    self.view_all_foods()
-                elif choice == "3":
-                    self.view_food_details()
-                elif choice == "4":
-                    self.add_new_food()
-                elif choice == "5":
-                    self.recipes_menu()
-                elif choice == "6":
-                    self.ingredients_menu()
-                elif choice == "7":
-                    self.logout()
-                    if self.running:  # Only continue if user didn't exit
-                        self.handle_authentication()  # Go back to login
-                elif choice == "8":
-                    print("\nThank you for using Pantry! Goodbye!")
-                    self.running = False
+                # Attribute every statement this menu entry runs to it
+                with query_stats.action(labels[choice]):
+                    if choice == "1":
+                        self.browse_foods_by_country()
+                    elif choice == "2":
+                        self.view_all_foods()
+                    elif choice == "3":
+                        self.view_food_details()
+                    elif choice == "4":
+                        self.add_new_food()
+                    elif choice == "5":
+                        self.recipes_menu()
+                    elif choice == "6":
+                        self.ingredients_menu()
+                    elif choice == "7":
+                        self.search()
+                    elif choice == "8":
+                        self.show_diagnostics()
+                    elif choice == "9":
+                        self.logout()
+                        if self.running:  # Only continue if user didn't exit
+                            self.handle_authentication()  # Go back to login
+                    elif choice == "10":
+                        print("\nThank you for using Pantry! Goodbye!")
+                        self.running = False
                 
                 if self.running and self.authenticated:
                     input("\nPress Enter to continue...")
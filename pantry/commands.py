@@ -0,0 +1,290 @@
+"""
+Scripted command mode.
+
+Each command calls the same CRUD methods as the interactive menus, with no
+prompts, and writes its result to stdout as a grid table, JSON or JSON
+Lines. JSON listings are written as the rows arrive from the database;
+tables read their rows once to size the columns first. Status messages go
+to stderr, so the output can be piped::
+
+    python3 main.py recipes list --country Ghana --format json
+    python3 main.py recipe show 42
+    python3 main.py batch commands.txt
+
+A batch file holds one command per line (blank lines and # comments are
+skipped). Every line runs in the same process over one leased database
+connection, and a throughput summary is printed to stderr at the end.
+
+The CRUD layer is only imported when a command runs, so registering these
+commands with main.py's parser costs nothing at startup.
+"""
+
+import argparse
+import json
+import shlex
+import sys
+import time
+
+FORMATS = ('table', 'json', 'jsonl')
+
+# Columns written for each listing, in order
+COLUMNS = {
+    'countries': ['id', 'name'],
+    'foods': ['id', 'name', 'country', 'description'],
+    'recipes': ['id', 'name', 'country', 'prep_time', 'cook_time', 'servings'],
+    'ingredients': ['id', 'name'],
+    'search': ['type', 'id', 'name', 'score'],
+    'cook': ['id', 'name', 'have', 'total', 'missing'],
+}
+
+
+class CommandError(Exception):
+    """A command that cannot run as given, e.g. an unknown country"""
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """Raise CommandError instead of exiting, so one bad batch line does not end the batch"""
+
+    def error(self, message):
+        raise CommandError(f"{self.prog}: {message}")
+
+
+def _crud():
+    try:
+        import crud
+    except ImportError:
+        from pantry import crud
+    return crud
+
+
+def _format_option(parser):
+    parser.add_argument('--format', choices=FORMATS, default='table', help="Output format (default table)")
+
+
+def add_commands(subparsers):
+    """Register the scripted commands on an argparse subparsers object"""
+    countries = subparsers.add_parser('countries', help="List countries")
+    countries_actions = countries.add_subparsers(dest='action', required=True)
+    _format_option(countries_actions.add_parser('list', help="List every country"))
+
+    foods = subparsers.add_parser('foods', help="List foods")
+    foods_actions = foods.add_subparsers(dest='action', required=True)
+    foods_list = foods_actions.add_parser('list', help="List foods, optionally from one country")
+    foods_list.add_argument('--country', default=None, help="Only foods from this country")
+    _format_option(foods_list)
+
+    food = subparsers.add_parser('food', help="Show foods")
+    food_actions = food.add_subparsers(dest='action', required=True)
+    food_show = food_actions.add_parser('show', help="Show foods with their ingredients")
+    food_show.add_argument('ids', type=int, nargs='+', metavar='ID')
+    _format_option(food_show)
+
+    recipes = subparsers.add_parser('recipes', help="List recipes")
+    recipes_actions = recipes.add_subparsers(dest='action', required=True)
+    recipes_list = recipes_actions.add_parser('list', help="List recipes, optionally by country or owner")
+    owner = recipes_list.add_mutually_exclusive_group()
+    owner.add_argument('--country', default=None, help="Only recipes from this country")
+    owner.add_argument('--user-id', type=int, default=None, help="Only recipes owned by this user")
+    _format_option(recipes_list)
+
+    recipe = subparsers.add_parser('recipe', help="Show recipes")
+    recipe_actions = recipe.add_subparsers(dest='action', required=True)
+    recipe_show = recipe_actions.add_parser('show', help="Show recipes with ingredients and instructions")
+    recipe_show.add_argument('ids', type=int, nargs='+', metavar='ID')
+    _format_option(recipe_show)
+
+    ingredients = subparsers.add_parser('ingredients', help="List ingredients")
+    ingredients_actions = ingredients.add_subparsers(dest='action', required=True)
+    _format_option(ingredients_actions.add_parser('list', help="List every ingredient"))
+
+    search = subparsers.add_parser('search', help="Search recipes and foods")
+    search.add_argument('query', nargs='+', help="Words to search for")
+    search.add_argument('--kind', choices=['recipe', 'food'], default=None, help="Only this kind of result")
+    search.add_argument('--limit', type=int, default=20, help="Maximum results (default 20)")
+    _format_option(search)
+
+    cook = subparsers.add_parser('cook', help="Rank recipes by the ingredients you have")
+    cook.add_argument('ingredients', nargs='+', metavar='INGREDIENT')
+    cook.add_argument('--max-missing', type=int, default=None, help="Hide recipes missing more ingredients")
+    cook.add_argument('--limit', type=int, default=20, help="Maximum results (default 20)")
+    _format_option(cook)
+
+    batch = subparsers.add_parser('batch', help="Run the commands in a file, one per line")
+    batch.add_argument('file', help="Command file ('-' for stdin)")
+    batch.add_argument('--stop-on-error', action='store_true', help="Stop at the first failing command")
+
+
+# Top-level commands handled by run_command()
+COMMANDS = ('countries', 'foods', 'food', 'recipes', 'recipe', 'ingredients', 'search', 'cook', 'batch')
+
+
+def build_parser():
+    """Parser for a single batch line"""
+    parser = _ArgumentParser(prog='pantry', add_help=False)
+    subparsers = parser.add_subparsers(dest='command', required=True, parser_class=_ArgumentParser)
+    add_commands(subparsers)
+    return parser
+
+
+def write_records(records, columns, fmt, out=None):
+    """Write dict records in fmt as they are produced; returns the number written"""
+    out = out or sys.stdout
+    count = 0
+    if fmt == 'jsonl':
+        for record in records:
+            out.write(json.dumps({column: record.get(column) for column in columns}, default=str) + "\n")
+            count += 1
+    elif fmt == 'json':
+        # A JSON array written element by element, so nothing is buffered
+        out.write("[")
+        for record in records:
+            out.write(",\n " if count else "\n ")
+            out.write(json.dumps({column: record.get(column) for column in columns}, default=str))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    else:
+        try:
+            from render import write_grid
+        except ImportError:
+            from pantry.render import write_grid
+
+        def rows():
+            nonlocal count
+            for record in records:
+                count += 1
+                yield [', '.join(value) if isinstance(value, list) else value
+                       for value in (record.get(column) for column in columns)]
+        write_grid(columns, rows(), out)
+    return count
+
+
+def _country_id(crud, name):
+    country = crud.CountryCRUD.get_country_by_name(name)
+    if not country:
+        raise CommandError(f"Unknown country: {name}")
+    return country['id']
+
+
+def _list(args, crud):
+    listing = args.command
+    if listing == 'countries':
+        records = crud.CountryCRUD.get_all_countries()
+    elif listing == 'foods':
+        if args.country:
+            records = crud.FoodCRUD.get_foods_by_country(_country_id(crud, args.country))
+        else:
+            records = crud.FoodCRUD.iter_all_foods()
+    elif listing == 'recipes':
+        if args.country:
+            records = crud.RecipeCRUD.get_recipes_by_country(_country_id(crud, args.country))
+        elif args.user_id is not None:
+            records = crud.RecipeCRUD.get_recipes_by_user(args.user_id)
+        else:
+            records = crud.RecipeCRUD.iter_all_recipes()
+    else:
+        records = crud.IngredientCRUD.iter_all_ingredients()
+    write_records(records, COLUMNS[listing], args.format)
+    return True
+
+
+def _show(args, crud):
+    if args.command == 'food':
+        found = crud.FoodCRUD.get_foods_with_ingredients_many(args.ids)
+        display = crud.FoodCRUD.display_food_details
+    else:
+        found = crud.RecipeCRUD.get_recipe_details_many(args.ids)
+        display = crud.RecipeCRUD.display_recipe_details
+    missing = [record_id for record_id in args.ids if record_id not in found]
+    records = [found[record_id] for record_id in args.ids if record_id in found]
+
+    if args.format == 'table':
+        for record in records:
+            display(record)
+    elif args.format == 'jsonl':
+        for record in records:
+            sys.stdout.write(json.dumps(record, default=str) + "\n")
+    else:
+        value = records[0] if len(args.ids) == 1 and records else records
+        sys.stdout.write(json.dumps(value, default=str, indent=2) + "\n")
+
+    if missing:
+        print(f"Not found: {args.command} {', '.join(map(str, missing))}", file=sys.stderr)
+    return not missing
+
+
+def _search(args, crud):
+    results = crud.SearchCRUD.search(' '.join(args.query), limit=args.limit,
+                                     kinds=[args.kind] if args.kind else None)
+    write_records(results, COLUMNS['search'], args.format)
+    return True
+
+
+def _cook(args, crud):
+    results, unknown = crud.PantryMatchCRUD.what_can_i_cook(args.ingredients, args.max_missing, args.limit)
+    if unknown:
+        print(f"No recipe uses: {', '.join(unknown)}", file=sys.stderr)
+    write_records(results, COLUMNS['cook'], args.format)
+    return True
+
+
+def run_batch(args):
+    """Run every command in a batch file over one connection; returns True if all of them succeeded"""
+    parser = build_parser()
+    handle = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8')
+    started = time.perf_counter()
+    try:
+        with _crud().pantry_vault.lease():
+            ran, failed = _run_lines(parser, handle, args.stop_on_error)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+        sys.stdout.flush()
+
+    seconds = time.perf_counter() - started
+    rate = ran / seconds if seconds else 0.0
+    print(f"Ran {ran:,} commands ({failed:,} failed) in {seconds:.2f}s ({rate:,.0f} commands/s)", file=sys.stderr)
+    return not failed
+
+
+def _run_lines(parser, handle, stop_on_error):
+    """Run each command line in handle; returns (commands run, commands failed)"""
+    ran = failed = 0
+    for number, line in enumerate(handle, 1):
+        try:
+            argv = shlex.split(line, comments=True)
+            if not argv:
+                continue
+            if argv[0] == 'batch':
+                raise CommandError("batch files cannot run other batch files")
+            ok = _run(parser.parse_args(argv))
+        except (CommandError, ValueError) as e:
+            print(f"line {number}: {e}", file=sys.stderr)
+            ok = False
+        ran += 1
+        if not ok:
+            failed += 1
+            if stop_on_error:
+                break
+    return ran, failed
+
+
+_HANDLERS = {
+    'countries': _list, 'foods': _list, 'recipes': _list, 'ingredients': _list,
+    'food': _show, 'recipe': _show,
+    'search': _search, 'cook': _cook,
+}
+
+
+def _run(args):
+    return _HANDLERS[args.command](args, _crud())
+
+
+def run_command(args):
+    """Run one parsed command; returns True on success"""
+    if args.command == 'batch':
+        return run_batch(args)
+    try:
+        return _run(args)
+    except CommandError as e:
+        print(e, file=sys.stderr)
+        return False
@@ -0,0 +1,160 @@
+"""
+Per-country summary counts, maintained as the catalog changes.
+
+country_stats holds one row per country with its number of foods, recipes
+and distinct ingredients, so the country overview is a single read joined
+on the primary key instead of three counts per country. Distinct
+ingredients cannot be kept with a plain counter: removing a recipe only
+lowers the count if no other food or recipe from that country uses the
+ingredient. country_ingredients therefore records how many links
+(food_ingredients and recipe_ingredients rows) use each ingredient per
+country. A pair is added when its first link appears and dropped with its
+last, and country_stats.ingredients moves with it.
+
+Every function takes the vault and runs its statements on it, so called
+inside a transaction the counts commit or roll back with the rows they
+describe. Only the countries and ingredients being changed are touched;
+rebuild() recomputes everything with set-based statements after bulk loads
+that bypass the CRUD layer.
+"""
+
+from collections import Counter
+
+
+# Most IDs put in one IN (...) list, well under SQLite's bound variable limit
+ID_BATCH_SIZE = 500
+
+
+def _placeholders(count):
+    return ", ".join(["%s"] * count)
+
+
+def _chunks(items, size=ID_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def rebuild(vault):
+    """Recompute both tables from the catalog"""
+    vault.execute_update("DELETE FROM country_ingredients")
+    vault.execute_update("DELETE FROM country_stats")
+    vault.execute_update("""
+        INSERT INTO country_ingredients (country_id, ingredient_id, uses)
+        SELECT country_id, ingredient_id, COUNT(*)
+        FROM (
+            SELECT f.country_id, fi.ingredient_id
+            FROM food_ingredients fi JOIN foods f ON f.id = fi.food_id
+            UNION ALL
+            SELECT r.country_id, ri.ingredient_id
+            FROM recipe_ingredients ri JOIN recipes r ON r.id = ri.recipe_id
+        ) AS links
+        WHERE country_id IS NOT NULL
+        GROUP BY country_id, ingredient_id
+    """)
+    vault.execute_update("""
+        INSERT INTO country_stats (country_id, foods, recipes, ingredients)
+        SELECT c.id, COALESCE(f.n, 0), COALESCE(r.n, 0), COALESCE(i.n, 0)
+        FROM countries c
+        LEFT JOIN (SELECT country_id, COUNT(*) AS n FROM foods GROUP BY country_id) f ON f.country_id = c.id
+        LEFT JOIN (SELECT country_id, COUNT(*) AS n FROM recipes GROUP BY country_id) r ON r.country_id = c.id
+        LEFT JOIN (SELECT country_id, COUNT(*) AS n FROM country_ingredients GROUP BY country_id) i ON i.country_id = c.id
+    """)
+
+
+def add_country(vault, country_id):
+    """Start a country at zero"""
+    vault.execute_update(
+        "INSERT INTO country_stats (country_id, foods, recipes, ingredients) VALUES (%s, 0, 0, 0)", (country_id,)
+    )
+
+
+def _adjust(vault, country_id, foods=0, recipes=0, ingredients=0):
+    if min(foods, recipes, ingredients) < 0:
+        # Nothing to take away from a country that has no row yet
+        vault.execute_update(
+            "UPDATE country_stats SET foods = foods + %s, recipes = recipes + %s, ingredients = ingredients + %s "
+            "WHERE country_id = %s",
+            (foods, recipes, ingredients, country_id)
+        )
+        return
+    # One upsert, so a country added without the CRUD layer (e.g. by a bulk
+    # load) gets its row without racing another writer to create it
+    vault.execute_update("""
+        INSERT INTO country_stats (country_id, foods, recipes, ingredients) VALUES (%s, %s, %s, %s) AS new
+        ON DUPLICATE KEY UPDATE foods = foods + new.foods, recipes = recipes + new.recipes,
+            ingredients = ingredients + new.ingredients
+    """, (country_id, foods, recipes, ingredients))
+
+
+def count(vault, country_id, foods=0, recipes=0):
+    """Add (or with negative numbers remove) foods and recipes for a country"""
+    if country_id is not None and (foods or recipes):
+        _adjust(vault, country_id, foods=foods, recipes=recipes)
+
+
+def add_links(vault, country_id, ingredient_ids):
+    """Record new food or recipe ingredient links from country_id, one per ingredient ID given"""
+    uses = Counter(ingredient_ids)
+    if country_id is None or not uses:
+        return
+    # Creating the missing pairs first counts exactly the ones this call
+    # added, even when another writer links the same ingredients at once
+    added = vault.execute_many(
+        "INSERT IGNORE INTO country_ingredients (country_id, ingredient_id, uses) VALUES (%s, %s, 0)",
+        [(country_id, ingredient_id) for ingredient_id in uses]
+    )
+    vault.execute_many(
+        "UPDATE country_ingredients SET uses = uses + %s WHERE country_id = %s AND ingredient_id = %s",
+        [(count, country_id, ingredient_id) for ingredient_id, count in uses.items()]
+    )
+    if added:
+        _adjust(vault, country_id, ingredients=added)
+
+
+def recipe_links(vault, recipe_ids):
+    """
+    Return ({country_id: recipes}, {(country_id, ingredient_id): links}) for
+    recipe_ids, to pass to remove_recipes() once they are deleted
+    """
+    if not recipe_ids:
+        return {}, {}
+    marks = _placeholders(len(recipe_ids))
+    recipes = vault.execute_query(
+        f"SELECT country_id, COUNT(*) AS n FROM recipes WHERE id IN ({marks}) AND country_id IS NOT NULL "
+        f"GROUP BY country_id",
+        tuple(recipe_ids)
+    )
+    links = vault.execute_query(
+        f"""
+            SELECT r.country_id, ri.ingredient_id, COUNT(*) AS n
+            FROM recipe_ingredients ri JOIN recipes r ON r.id = ri.recipe_id
+            WHERE ri.recipe_id IN ({marks}) AND r.country_id IS NOT NULL
+            GROUP BY r.country_id, ri.ingredient_id
+        """,
+        tuple(recipe_ids)
+    )
+    return ({row['country_id']: row['n'] for row in recipes},
+            {(row['country_id'], row['ingredient_id']): row['n'] for row in links})
+
+
+def remove_recipes(vault, recipes, links):
+    """Take deleted recipes and their links, as returned by recipe_links(), out of the counts"""
+    for country_id, removed in recipes.items():
+        _adjust(vault, country_id, recipes=-removed)
+    if not links:
+        return
+    vault.execute_many(
+        "UPDATE country_ingredients SET uses = uses - %s WHERE country_id = %s AND ingredient_id = %s",
+        [(removed, country_id, ingredient_id) for (country_id, ingredient_id), removed in links.items()]
+    )
+    for country_id in {country_id for country_id, _ in links}:
+        ids = [ingredient_id for (owner, ingredient_id) in links if owner == country_id]
+        unused = 0
+        for batch in _chunks(ids):
+            unused += vault.execute_update(
+                f"DELETE FROM country_ingredients WHERE country_id = %s AND uses <= 0 "
+                f"AND ingredient_id IN ({_placeholders(len(batch))})",
+                (country_id, *batch)
+            )
+        if unused:
+            _adjust(vault, country_id, ingredients=-unused)
@@ -0,0 +1,93 @@
+"""
+Password hashing for the users table.
+
+Passwords are stored as ``pbkdf2_sha256$<iterations>$<salt>$<hash>``: a
+random salt per password, PBKDF2-HMAC-SHA256 at a tunable cost, and the
+salt and hash in base64. Checking a password is done here in Python with a
+constant-time comparison, never by the database, so the users table is
+only ever looked up by its indexed user_name.
+
+PASSWORD_ITERATIONS sets the cost of new hashes. Raising it invalidates
+nothing: verify_password() reads the cost from each stored hash, and
+needs_rehash() tells the caller to store a fresh hash after the next
+successful login. Rows written before hashing was introduced hold the plain
+password; they verify the same way and are upgraded on login too.
+benchmarks/bench_auth.py shows what each cost does to login latency.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+from functools import lru_cache
+
+from config import Config
+
+ALGORITHM = 'pbkdf2_sha256'
+SALT_BYTES = 16
+
+
+def _encode(raw):
+    return base64.b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4), validate=True)
+
+
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+def _parse(stored):
+    """Return (iterations, salt, digest) for a stored hash, or None for a plain password"""
+    parts = (stored or '').split('$')
+    if len(parts) != 4 or parts[0] != ALGORITHM:
+        return None
+    try:
+        return int(parts[1]), _decode(parts[2]), _decode(parts[3])
+    except ValueError:
+        return None
+
+
+def hash_password(password, iterations=None):
+    """Return a salted hash of password to store in users.password"""
+    iterations = iterations or Config.PASSWORD_ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"{ALGORITHM}${iterations}${_encode(salt)}${_encode(_derive(password, salt, iterations))}"
+
+
+def is_hashed(stored):
+    return _parse(stored) is not None
+
+
+def verify_password(password, stored):
+    """Return True if password matches the stored hash (or legacy plain password)"""
+    parsed = _parse(stored)
+    if parsed is None:
+        if not stored:
+            return False
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    iterations, salt, digest = parsed
+    return hmac.compare_digest(_derive(password, salt, iterations), digest)
+
+
+def needs_rehash(stored, iterations=None):
+    """True if stored is a plain password or was hashed at a different cost"""
+    parsed = _parse(stored)
+    return parsed is None or parsed[0] != (iterations or Config.PASSWORD_ITERATIONS)
+
+
+@lru_cache(maxsize=4)
+def _dummy_hash(iterations):
+    return hash_password(secrets.token_urlsafe(16), iterations)
+
+
+def verify_unknown_user(password):
+    """
+    Spend as long as one verification would for a user name that does not
+    exist, so response times do not reveal which names are registered.
+    Always returns False.
+    """
+    verify_password(password, _dummy_hash(Config.PASSWORD_ITERATIONS))
+    return False
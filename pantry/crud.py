@@ -1,6 +1,7 @@
 
 import sys
 import os
+import threading
 
 # Add current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,15 +17,108 @@ except ImportError:
         print("Error: Cannot import pantry_vault from db module")
         sys.exit(1)
 
+try:
+    from cache import reference_cache
+    from search import search_index
+    from matcher import pantry_matcher
+    from render import render_table
+    from auth import authenticator
+    import country_stats
+except ImportError:
+    from pantry.cache import reference_cache
+    from pantry.search import search_index
+    from pantry.matcher import pantry_matcher
+    from pantry.render import render_table
+    from pantry.auth import authenticator
+    from pantry import country_stats
+
 from tabulate import tabulate
 
+# Upper bound on IDs bound into a single IN (...) list
+ID_BATCH_SIZE = 500
+
+
+def _placeholders(count):
+    """Return a comma-separated list of %s placeholders"""
+    return ", ".join(["%s"] * count)
+
+
+def _dedupe(items):
+    """Deduplicate values while keeping their order"""
+    return list(dict.fromkeys(items))
+
+
+def _chunks(items, size=ID_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _attach_ingredients(records, ingredient_rows, owner_key):
+    """Append each ingredient row to the ``ingredients`` list of the record it belongs to"""
+    for ingredient in ingredient_rows:
+        record = records.get(ingredient.pop(owner_key))
+        if record is not None:
+            record['ingredients'].append(ingredient)
+    return records
+
+
+def _keyset_page(alias, after_name=None, after_id=None, limit=None):
+    """
+    Build the WHERE/ORDER BY/LIMIT tail for a (name, id) keyset page.
+
+    Rows are ordered by name then id, so the last row of one page is the
+    cursor for the next and the database never has to skip rows.
+    """
+    clauses = []
+    params = []
+    if after_name is not None:
+        clauses.append(f"WHERE ({alias}.name > %s OR ({alias}.name = %s AND {alias}.id > %s))")
+        params.extend([after_name, after_name, after_id or 0])
+    clauses.append(f"ORDER BY {alias}.name, {alias}.id")
+    if limit is not None:
+        clauses.append("LIMIT %s")
+        params.append(int(limit))
+    return "\n".join(clauses), tuple(params)
+
+
+def nest_ingredients(rows):
+    """
+    Fold consecutive joined rows that share an id into one record with an
+    ``ingredients`` list. Rows must arrive ordered by id; only the record
+    being built is held in memory.
+    """
+    current = None
+    for row in rows:
+        if current is None or row['id'] != current['id']:
+            if current is not None:
+                yield current
+            current = {key: value for key, value in row.items() if not key.startswith('ingredient_')}
+            current['ingredients'] = []
+        if row.get('ingredient_name') is not None:
+            current['ingredients'].append({
+                'name': row['ingredient_name'],
+                'quantity': row.get('ingredient_quantity'),
+                'unit': row.get('ingredient_unit'),
+            })
+    if current is not None:
+        yield current
+
+
+def _owner_id(session, user_id=None):
+    """The user a call acts for: the session's user if one is given, else user_id"""
+    return session.user_id if session is not None else user_id
+
 class UserCRUD:
     """CRUD operations for user authentication"""
     
     @staticmethod
-    def authenticate_user(username, password):
-        """Authenticate user login"""
-        return pantry_vault.validate_user(username, password)
+    def authenticate_user(username, password, source=None):
+        """
+        Authenticate user login; returns a Session for the user, or None.
+        source (e.g. a client address) is throttled alongside the user name;
+        raises auth.LoginThrottled when either has made too many attempts.
+        """
+        return authenticator.authenticate(username, password, source)
     
     @staticmethod
     def register_new_user(username, email, password, country_id=None):
@@ -32,14 +126,15 @@ class UserCRUD:
         return pantry_vault.register_user(username, email, password, country_id)
     
     @staticmethod
-    def get_current_user():
-        """Get current logged-in user"""
-        return pantry_vault.get_current_user()
+    def get_current_user(session):
+        """Get the user logged in to session, or None"""
+        return session.user if session else None
     
     @staticmethod
-    def logout_user():
-        """Logout current user"""
-        pantry_vault.logout()
+    def logout_user(session):
+        """Log session's user out"""
+        if session is not None:
+            session.close()
 
 
 class CountryCRUD:
@@ -47,38 +142,91 @@ class CountryCRUD:
     
     @staticmethod
     def get_all_countries():
-        """Get all countries"""
+        """Get all countries (served from the reference cache)"""
         query = "SELECT id, name FROM countries ORDER BY name"
-        return pantry_vault.execute_query(query)
+        return reference_cache.get_or_load(
+            'countries', lambda: pantry_vault.execute_query(query), cache_empty=False
+        )
     
     @staticmethod
     def add_country(name):
         """Add a new country"""
-        query = "INSERT INTO countries (name) VALUES (%s)"
-        result = pantry_vault.execute_update(query, (name,))
-        return result > 0
+        try:
+            with pantry_vault.transaction():
+                country_id = pantry_vault.execute_insert("INSERT INTO countries (name) VALUES (%s)", (name,))
+                if not country_id:
+                    return False
+                country_stats.add_country(pantry_vault, country_id)
+        except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
+            print(f"Error adding country: {e}")
+            return False
+        
+        def forget():
+            reference_cache.invalidate('countries')
+            reference_cache.invalidate(('country', name))
+        # Drop stale entries now and again once an enclosing transaction commits
+        forget()
+        pantry_vault.on_commit(forget)
+        return True
     
     @staticmethod
     def get_country_by_name(name):
-        """Get country by name"""
-        query = "SELECT id, name FROM countries WHERE name = %s"
-        result = pantry_vault.execute_query(query, (name,))
-        return result[0] if result else None
+        """Get country by name (served from the reference cache)"""
+        def load():
+            query = "SELECT id, name FROM countries WHERE name = %s"
+            result = pantry_vault.execute_query(query, (name,))
+            return result[0] if result else None
+        
+        return reference_cache.get_or_load(('country', name), load, cache_empty=False)
+    
+    @staticmethod
+    def get_country_overview():
+        """Every country with its food, recipe and distinct ingredient counts, in one read of country_stats"""
+        query = """
+            SELECT c.id, c.name, COALESCE(s.foods, 0) AS foods, COALESCE(s.recipes, 0) AS recipes,
+                   COALESCE(s.ingredients, 0) AS ingredients
+            FROM countries c
+            LEFT JOIN country_stats s ON s.country_id = c.id
+            ORDER BY c.name
+        """
+        return pantry_vault.execute_query(query)
+    
+    @staticmethod
+    def rebuild_stats():
+        """Recompute country_stats from the catalog, e.g. after a bulk load outside the CRUD layer"""
+        try:
+            with pantry_vault.transaction():
+                country_stats.rebuild(pantry_vault)
+            return True
+        except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
+            print(f"Error rebuilding country stats: {e}")
+            return False
 
 
 class FoodCRUD:
     """CRUD operations for foods"""
     
+    LIST_QUERY = """
+        SELECT f.id, f.name, c.name as country, f.description
+        FROM foods f
+        LEFT JOIN countries c ON f.country_id = c.id
+    """
+    
     @staticmethod
-    def get_all_foods():
-        """Get all foods with country information"""
-        query = """
-            SELECT f.id, f.name, c.name as country, f.description
-            FROM foods f
-            LEFT JOIN countries c ON f.country_id = c.id
-            ORDER BY f.name
-        """
-        return pantry_vault.execute_query(query)
+    def get_all_foods(after_name=None, after_id=None, limit=None):
+        """Get all foods with country information, optionally one keyset page at a time"""
+        page_sql, params = _keyset_page('f', after_name, after_id, limit)
+        return pantry_vault.execute_query(FoodCRUD.LIST_QUERY + page_sql, params)
+    
+    @staticmethod
+    def iter_all_foods(batch_size=None):
+        """Stream all foods with country information without materializing the table"""
+        page_sql, params = _keyset_page('f')
+        return pantry_vault.iter_query(FoodCRUD.LIST_QUERY + page_sql, params, batch_size)
     
     @staticmethod
     def get_foods_by_country(country_id):
@@ -96,41 +244,55 @@ class FoodCRUD:
     def add_food(name, country_id, description=""):
         """Add a new food"""
         query = "INSERT INTO foods (name, country_id, description) VALUES (%s, %s, %s)"
-        result = pantry_vault.execute_update(query, (name, country_id, description))
-        return result > 0
+        try:
+            with pantry_vault.transaction():
+                food_id = pantry_vault.execute_insert(query, (name, country_id, description))
+                if food_id:
+                    country_stats.count(pantry_vault, country_id, foods=1)
+        except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
+            print(f"Error adding food: {e}")
+            return False
+        if food_id:
+            SearchCRUD.index_food(food_id, name, description)
+        return bool(food_id)
+    
+    DETAILS_QUERY = """
+        SELECT f.id, f.name, f.description, c.name as country
+        FROM foods f
+        LEFT JOIN countries c ON f.country_id = c.id
+        WHERE f.id IN ({ids})
+    """
+    INGREDIENTS_QUERY = """
+        SELECT fi.food_id, i.name, fi.quantity, fi.unit
+        FROM ingredients i
+        JOIN food_ingredients fi ON i.id = fi.ingredient_id
+        WHERE fi.food_id IN ({ids})
+    """
     
     @staticmethod
     def get_food_with_ingredients(food_id):
         """Get food details with ingredients"""
-        # Get food details
-        food_query = """
-            SELECT f.id, f.name, f.description, c.name as country
-            FROM foods f
-            LEFT JOIN countries c ON f.country_id = c.id
-            WHERE f.id = %s
-        """
-        food_result = pantry_vault.execute_query(food_query, (food_id,))
-        
-        if not food_result:
-            return None
-        
-        food = food_result[0]
-        
-        # Get ingredients for this food
-        ingredients_query = """
-            SELECT i.name, fi.quantity, fi.unit
-            FROM ingredients i
-            JOIN food_ingredients fi ON i.id = fi.ingredient_id
-            WHERE fi.food_id = %s
-        """
-        ingredients = pantry_vault.execute_query(ingredients_query, (food_id,))
-        
-        return FoodCRUD.new_method(food, ingredients)
+        return FoodCRUD.get_foods_with_ingredients_many([food_id]).get(food_id)
 
     @staticmethod
-    def new_method(food, ingredients):
-        food['ingredients'] = ingredients or []
-        return food
+    def get_foods_with_ingredients_many(food_ids):
+        """Get details with ingredients for many foods, keyed by food ID"""
+        food_ids = _dedupe(food_ids)
+        foods = {}
+        for batch in _chunks(food_ids):
+            ids = _placeholders(len(batch))
+            # Get food details for the whole batch
+            for food in pantry_vault.execute_query(FoodCRUD.DETAILS_QUERY.format(ids=ids), tuple(batch)):
+                food['ingredients'] = []
+                foods[food['id']] = food
+            
+            # Get ingredients for every food in the batch and group them in Python
+            ingredients = pantry_vault.execute_query(FoodCRUD.INGREDIENTS_QUERY.format(ids=ids), tuple(batch))
+            _attach_ingredients(foods, ingredients, 'food_id')
+        
+        return {food_id: foods[food_id] for food_id in food_ids if food_id in foods}
     
     @staticmethod
     def display_foods_table(foods, title="Foods"):
@@ -140,23 +302,17 @@ class FoodCRUD:
             return
         
         headers = ["ID", "Name", "Country", "Description"]
-        table_data = []
         
-        for food in foods:
+        def to_row(food):
             description = food.get('description', '')
             if len(description) > 50:
                 description = description[:47] + "..."
-            
-            table_data.append([
-                food['id'],
-                food['name'],
-                food.get('country', 'Unknown'),
-                description
-            ])
+            return [food['id'], food['name'], food.get('country', 'Unknown'), description]
         
         print(f"\n{title}")
         print("=" * 60)
-        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        # Re-rendered only when the foods shown or the foods/countries tables change
+        print(render_table('foods', ('foods', 'countries'), foods, headers, to_row))
     
     @staticmethod
     def display_food_details(food):
@@ -189,74 +345,141 @@ class FoodCRUD:
 class RecipeCRUD:
     """CRUD operations for recipes"""
     
+    LIST_QUERY = """
+        SELECT r.id, r.name, c.name as country, r.prep_time, r.cook_time, r.servings
+        FROM recipes r
+        LEFT JOIN countries c ON r.country_id = c.id
+    """
+    DETAILS_QUERY = """
+        SELECT r.*, c.name as country
+        FROM recipes r
+        LEFT JOIN countries c ON r.country_id = c.id
+        WHERE r.id IN ({ids})
+    """
+    INGREDIENTS_QUERY = """
+        SELECT ri.recipe_id, i.name, ri.quantity, ri.unit
+        FROM ingredients i
+        JOIN recipe_ingredients ri ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id IN ({ids})
+    """
+    
     @staticmethod
-    def get_all_recipes():
-        """Get all recipes with country information"""
-        query = """
-            SELECT r.id, r.name, c.name as country, r.prep_time, r.cook_time, r.servings
-            FROM recipes r
-            LEFT JOIN countries c ON r.country_id = c.id
-            ORDER BY r.name
-        """
-        return pantry_vault.execute_query(query)
+    def get_all_recipes(after_name=None, after_id=None, limit=None):
+        """Get all recipes with country information, optionally one keyset page at a time"""
+        page_sql, params = _keyset_page('r', after_name, after_id, limit)
+        return pantry_vault.execute_query(RecipeCRUD.LIST_QUERY + page_sql, params)
+    
+    @staticmethod
+    def iter_all_recipes(batch_size=None):
+        """Stream all recipes with country information without materializing the table"""
+        page_sql, params = _keyset_page('r')
+        return pantry_vault.iter_query(RecipeCRUD.LIST_QUERY + page_sql, params, batch_size)
     
     @staticmethod
     def get_recipe_details(recipe_id):
         """Get detailed recipe information with ingredients"""
-        # Get recipe details
-        recipe_query = """
-            SELECT r.*, c.name as country
-            FROM recipes r
-            LEFT JOIN countries c ON r.country_id = c.id
-            WHERE r.id = %s
-        """
-        recipe_result = pantry_vault.execute_query(recipe_query, (recipe_id,))
-        
-        if not recipe_result:
-            return None
-        
-        recipe = recipe_result[0]
-        
-        # Get ingredients for this recipe
-        ingredients_query = """
-            SELECT i.name, ri.quantity, ri.unit
-            FROM ingredients i
-            JOIN recipe_ingredients ri ON i.id = ri.ingredient_id
-            WHERE ri.recipe_id = %s
-        """
-        ingredients = pantry_vault.execute_query(ingredients_query, (recipe_id,))
+        return RecipeCRUD.get_recipe_details_many([recipe_id]).get(recipe_id)
+
+    @staticmethod
+    def get_recipe_details_many(recipe_ids):
+        """Get detailed information with ingredients for many recipes, keyed by recipe ID"""
+        recipe_ids = _dedupe(recipe_ids)
+        recipes = {}
+        for batch in _chunks(recipe_ids):
+            ids = _placeholders(len(batch))
+            # Get recipe details for the whole batch
+            for recipe in pantry_vault.execute_query(RecipeCRUD.DETAILS_QUERY.format(ids=ids), tuple(batch)):
+                recipe['ingredients'] = []
+                recipes[recipe['id']] = recipe
+            
+            # Get ingredients for every recipe in the batch and group them in Python
+            ingredients = pantry_vault.execute_query(RecipeCRUD.INGREDIENTS_QUERY.format(ids=ids), tuple(batch))
+            _attach_ingredients(recipes, ingredients, 'recipe_id')
         
-        recipe['ingredients'] = ingredients or []
-        return recipe
+        return {recipe_id: recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes}
     
     @staticmethod
-    def add_recipe(name, country_id, instructions, prep_time="", cook_time="", servings=None, family_notes="", user_id=None):
-        """Add a new recipe and return its ID"""
+    def add_recipe(name, country_id, instructions, prep_time="", cook_time="", servings=None, family_notes="", user_id=None,
+                   session=None):
+        """Add a new recipe owned by session's user (or user_id) and return its ID"""
+        user_id = _owner_id(session, user_id)
         try:
             query = """
                 INSERT INTO recipes (name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """
-            result = pantry_vault.execute_update(query, (name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id))
-            if result > 0:
-                get_id_query = "SELECT LAST_INSERT_ID() as id"
-                id_result = pantry_vault.execute_query(get_id_query)
-                return id_result[0]['id'] if id_result else None
-            return None
+            with pantry_vault.transaction():
+                recipe_id = pantry_vault.execute_insert(query, (name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id))
+                if recipe_id:
+                    country_stats.count(pantry_vault, country_id, recipes=1)
+            if recipe_id:
+                SearchCRUD.index_recipe(recipe_id, name, instructions, family_notes)
+                PantryMatchCRUD.index_recipe(recipe_id, name, {})
+            return recipe_id
         except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
             print(f"Error adding recipe: {e}")
             return None
 
     @staticmethod
-    def delete_recipe(recipe_id, user_id):
-        """Delete a recipe only if it belongs to the given user_id"""
+    def get_recipes_by_user(user_id=None, session=None):
+        """Get the recipes owned by session's user (or user_id)"""
+        user_id = _owner_id(session, user_id)
+        query = """
+            SELECT r.id, r.name, c.name as country, r.prep_time, r.cook_time, r.servings, r.user_id
+            FROM recipes r
+            LEFT JOIN countries c ON r.country_id = c.id
+            WHERE r.user_id = %s
+            ORDER BY r.name
+        """
+        return pantry_vault.execute_query(query, (user_id,))
+
+    @staticmethod
+    def get_recipes_by_country(country_id):
+        """Get recipes by country"""
+        query = RecipeCRUD.LIST_QUERY + """
+            WHERE r.country_id = %s
+            ORDER BY r.name
+        """
+        return pantry_vault.execute_query(query, (country_id,))
+
+    @staticmethod
+    def delete_recipe(recipe_id, user_id=None, session=None):
+        """Delete a recipe only if it belongs to session's user (or user_id)"""
+        return RecipeCRUD.delete_recipes([recipe_id], user_id, session) > 0
+
+    @staticmethod
+    def delete_recipes(recipe_ids, user_id=None, session=None):
+        """Delete the given recipes owned by session's user (or user_id) in one statement; returns the number deleted"""
+        user_id = _owner_id(session, user_id)
+        recipe_ids = _dedupe(recipe_ids)
+        if not recipe_ids:
+            return 0
         try:
-            query = "DELETE FROM recipes WHERE id = %s AND user_id = %s"
-            result = pantry_vault.execute_update(query, (recipe_id, user_id))
-            return result > 0
+            gone = []
+            with pantry_vault.transaction():
+                for batch in _chunks(recipe_ids):
+                    query = f"SELECT id FROM recipes WHERE user_id = %s AND id IN ({_placeholders(len(batch))})"
+                    owned = [row['id'] for row in pantry_vault.execute_query(query, (user_id, *batch))]
+                    if not owned:
+                        continue
+                    # Read what the country counts lose before the links cascade away
+                    countries, links = country_stats.recipe_links(pantry_vault, owned)
+                    query = f"DELETE FROM recipes WHERE user_id = %s AND id IN ({_placeholders(len(owned))})"
+                    if pantry_vault.execute_update(query, (user_id, *owned)) != len(owned):
+                        raise RuntimeError("recipes changed while they were being deleted")
+                    country_stats.remove_recipes(pantry_vault, countries, links)
+                    gone.extend(owned)
+                if gone and (SearchCRUD.is_active() or PantryMatchCRUD.is_active()):
+                    SearchCRUD.unindex_recipes(gone)
+                    PantryMatchCRUD.unindex_recipes(gone)
+            return len(gone)
         except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
             print(f"Error deleting recipe: {e}")
-            return False
+            return 0
     
     @staticmethod
     def display_recipes_table(recipes, title="Recipes"):
@@ -266,21 +489,20 @@ class RecipeCRUD:
             return
         
         headers = ["ID", "Recipe Name", "Country", "Prep Time", "Cook Time", "Servings"]
-        table_data = []
         
-        for recipe in recipes:
-            table_data.append([
+        def to_row(recipe):
+            return [
                 recipe['id'],
                 recipe['name'],
                 recipe.get('country', 'Unknown'),
                 recipe.get('prep_time', 'N/A'),
                 recipe.get('cook_time', 'N/A'),
                 recipe.get('servings', 'N/A')
-            ])
+            ]
         
         print(f"\n{title}")
         print("=" * 70)
-        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        print(render_table('recipes', ('recipes', 'countries'), recipes, headers, to_row))
     
     @staticmethod
     def display_recipe_details(recipe):
@@ -319,40 +541,437 @@ class RecipeCRUD:
         print("-" * 50)
 
     @staticmethod
-    def add_ingredient_to_recipe(recipe_id, ingredient_id, quantity, unit):
-        """Link an ingredient to a recipe with quantity and unit"""
+    def add_recipe_with_ingredients(recipe, ingredients, session=None):
+        """
+        Add a recipe and all of its ingredients in a single transaction.
+
+        recipe is a dict of add_recipe arguments; ingredients is a list of
+        dicts with name, quantity and unit. With a session the recipe is
+        owned by its user, otherwise by recipe['user_id']. Every ingredient
+        name is resolved or created with set-based statements, every
+        recipe_ingredients link is written with one executemany, and nothing
+        is kept on failure. Returns the new recipe ID or None.
+        """
+        user_id = _owner_id(session, recipe.get('user_id'))
+        try:
+            with pantry_vault.transaction():
+                query = """
+                    INSERT INTO recipes (name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                recipe_id = pantry_vault.execute_insert(query, (
+                    recipe['name'], recipe['country_id'], recipe['instructions'],
+                    recipe.get('prep_time', ""), recipe.get('cook_time', ""), recipe.get('servings'),
+                    recipe.get('family_notes', ""), user_id
+                ))
+                if not recipe_id:
+                    raise RuntimeError("recipe insert did not return an ID")
+                
+                ingredient_ids = IngredientCRUD.resolve_ingredient_ids([ing['name'] for ing in ingredients])
+                link_query = "INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit) VALUES (%s, %s, %s, %s)"
+                pantry_vault.execute_many(link_query, [
+                    (recipe_id, ingredient_ids[ing['name']], ing.get('quantity'), ing.get('unit'))
+                    for ing in ingredients
+                ])
+                country_stats.count(pantry_vault, recipe['country_id'], recipes=1)
+                country_stats.add_links(pantry_vault, recipe['country_id'],
+                                        [ingredient_ids[ing['name']] for ing in ingredients])
+                SearchCRUD.index_recipe(
+                    recipe_id, recipe['name'], recipe['instructions'], recipe.get('family_notes', ""),
+                    [ing['name'] for ing in ingredients]
+                )
+                PantryMatchCRUD.index_recipe(
+                    recipe_id, recipe['name'], {ingredient_ids[ing['name']]: ing['name'] for ing in ingredients}
+                )
+            return recipe_id
+        except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
+            print(f"Error adding recipe: {e}")
+            return None
+
+    @staticmethod
+    def add_ingredient_to_recipe(recipe_id, ingredient_id, quantity, unit, session=None):
+        """Link an ingredient to a recipe with quantity and unit; with a session, only to the user's own recipe"""
+        if session is not None:
+            owned = pantry_vault.execute_query(
+                "SELECT id FROM recipes WHERE id = %s AND user_id = %s", (recipe_id, session.user_id)
+            )
+            if not owned:
+                return False
         query = "INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit) VALUES (%s, %s, %s, %s)"
-        result = pantry_vault.execute_update(query, (recipe_id, ingredient_id, quantity, unit))
+        try:
+            with pantry_vault.transaction():
+                result = pantry_vault.execute_update(query, (recipe_id, ingredient_id, quantity, unit))
+                if result > 0:
+                    recipe = pantry_vault.execute_query("SELECT country_id FROM recipes WHERE id = %s", (recipe_id,))
+                    if recipe:
+                        country_stats.add_links(pantry_vault, recipe[0]['country_id'], [ingredient_id])
+        except Exception as e:
+            if pantry_vault.in_transaction():
+                raise
+            print(f"Error adding ingredient to recipe: {e}")
+            return False
+        if result > 0 and (SearchCRUD.is_active() or PantryMatchCRUD.is_active()):
+            rows = pantry_vault.execute_query("SELECT name FROM ingredients WHERE id = %s", (ingredient_id,))
+            if rows:
+                SearchCRUD.add_recipe_text(recipe_id, rows[0]['name'])
+                PantryMatchCRUD.add_recipe_ingredients(recipe_id, {ingredient_id: rows[0]['name']})
         return result > 0
 
 
 class IngredientCRUD:
     """CRUD operations for ingredients"""
     
+    LIST_QUERY = "SELECT i.id, i.name FROM ingredients i "
+    
     @staticmethod
-    def get_all_ingredients():
-        """Get all ingredients"""
-        query = "SELECT id, name FROM ingredients ORDER BY name"
-        return pantry_vault.execute_query(query)
+    def get_all_ingredients(after_name=None, after_id=None, limit=None):
+        """Get all ingredients, optionally one keyset page at a time"""
+        page_sql, params = _keyset_page('i', after_name, after_id, limit)
+        return pantry_vault.execute_query(IngredientCRUD.LIST_QUERY + page_sql, params)
+    
+    @staticmethod
+    def iter_all_ingredients(batch_size=None):
+        """Stream all ingredients without materializing the table"""
+        page_sql, params = _keyset_page('i')
+        return pantry_vault.iter_query(IngredientCRUD.LIST_QUERY + page_sql, params, batch_size)
+    
+    @staticmethod
+    def resolve_ingredient_ids(names):
+        """
+        Map ingredient names to IDs, creating any that do not exist yet.
+
+        Cached names cost nothing; the rest take one IN (...) lookup plus, if
+        some are new, one multi-row INSERT IGNORE and a second lookup for
+        their IDs. A name another writer adds at the same moment, or that
+        differs only in case from one under MySQL's case-insensitive
+        collation, is skipped by the insert and found by the second lookup
+        instead of failing the enclosing transaction.
+        """
+        names = _dedupe(names)
+        resolved = {}
+        pending = []
+        for name in names:
+            ingredient_id = reference_cache.get(('ingredient', name))
+            if ingredient_id:
+                resolved[name] = ingredient_id
+            else:
+                pending.append(name)
+        
+        def lookup(batch):
+            query = f"SELECT id, name FROM ingredients WHERE name IN ({_placeholders(len(batch))})"
+            rows = pantry_vault.execute_query(query, tuple(batch))
+            exact = {row['name']: row['id'] for row in rows}
+            # Case-insensitive collations may hand back a differently cased name
+            folded = {row['name'].casefold(): row['id'] for row in rows}
+            for name in batch:
+                ingredient_id = exact.get(name) or folded.get(name.casefold())
+                if ingredient_id:
+                    resolved[name] = ingredient_id
+        
+        for batch in _chunks(pending):
+            lookup(batch)
+            missing = [name for name in batch if name not in resolved]
+            if missing:
+                values = ", ".join(["(%s)"] * len(missing))
+                pantry_vault.execute_update(f"INSERT IGNORE INTO ingredients (name) VALUES {values}", tuple(missing))
+                lookup(missing)
+        
+        unresolved = [name for name in names if name not in resolved]
+        if unresolved:
+            raise LookupError(f"Could not resolve ingredient(s): {', '.join(unresolved)}")
+        
+        def remember():
+            for name in pending:
+                reference_cache.set(('ingredient', name), resolved[name])
+        
+        # New IDs only become real once an enclosing transaction commits
+        pantry_vault.on_commit(remember)
+        return resolved
     
     @staticmethod
     def add_ingredient(name):
-        """Add a new ingredient"""
+        """Add a new ingredient, or return the ID of the existing one"""
+        # Check the cached name -> id map first
+        cache_key = ('ingredient', name)
+        ingredient_id = reference_cache.get(cache_key)
+        if ingredient_id:
+            return ingredient_id
+        
         # Check if ingredient already exists
         check_query = "SELECT id FROM ingredients WHERE name = %s"
         existing = pantry_vault.execute_query(check_query, (name,))
         
         if existing:
-            return existing[0]['id']  # Return existing ingredient ID
+            ingredient_id = existing[0]['id']  # Return existing ingredient ID
+        else:
+            # Insert new ingredient
+            query = "INSERT INTO ingredients (name) VALUES (%s)"
+            ingredient_id = pantry_vault.execute_insert(query, (name,))
         
-        # Insert new ingredient
-        query = "INSERT INTO ingredients (name) VALUES (%s)"
-        result = pantry_vault.execute_update(query, (name,))
+        if ingredient_id:
+            # A newly inserted ID only becomes real once an enclosing transaction commits
+            pantry_vault.on_commit(lambda: reference_cache.set(cache_key, ingredient_id))
+        return ingredient_id
+
+
+class SearchCRUD:
+    """
+    Full-text search over recipes and foods.
+
+    The inverted index is built from the database on first use and then kept
+    current by the CRUD write paths, so searches never run LIKE scans.
+    Index updates made inside a transaction are applied once it commits.
+    """
+    
+    RECIPE_QUERY = """
+        SELECT r.id, r.name, r.instructions, r.family_notes, i.name AS ingredient_name
+        FROM recipes r
+        LEFT JOIN recipe_ingredients ri ON ri.recipe_id = r.id
+        LEFT JOIN ingredients i ON i.id = ri.ingredient_id
+        ORDER BY r.id
+    """
+    FOOD_QUERY = """
+        SELECT f.id, f.name, f.description, i.name AS ingredient_name
+        FROM foods f
+        LEFT JOIN food_ingredients fi ON fi.food_id = f.id
+        LEFT JOIN ingredients i ON i.id = fi.ingredient_id
+        ORDER BY f.id
+    """
+    
+    _state = {'built': False, 'building': False}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def is_active():
+        """Whether the index is built (or being built) and needs incremental updates"""
+        state = SearchCRUD._state
+        return state['built'] or state['building']
+    
+    @staticmethod
+    def rebuild_index(batch_size=None):
+        """Rebuild the search index from the database and return its stats"""
+        with SearchCRUD._lock:
+            SearchCRUD._state['building'] = True
+            try:
+                search_index.clear()
+                for recipe in nest_ingredients(pantry_vault.iter_query(SearchCRUD.RECIPE_QUERY, batch_size=batch_size)):
+                    search_index.add(
+                        ('recipe', recipe['id']), recipe['name'], recipe['instructions'], recipe['family_notes'],
+                        *[ing['name'] for ing in recipe['ingredients']]
+                    )
+                for food in nest_ingredients(pantry_vault.iter_query(SearchCRUD.FOOD_QUERY, batch_size=batch_size)):
+                    search_index.add(
+                        ('food', food['id']), food['name'], food['description'],
+                        *[ing['name'] for ing in food['ingredients']]
+                    )
+                SearchCRUD._state['built'] = True
+            finally:
+                SearchCRUD._state['building'] = False
+        return search_index.stats()
+    
+    @staticmethod
+    def ensure_index():
+        """Build the index on first use"""
+        if not SearchCRUD._state['built']:
+            SearchCRUD.rebuild_index()
+    
+    @staticmethod
+    def _after_commit(update):
+        # Before the first search there is nothing to keep current
+        if SearchCRUD.is_active():
+            pantry_vault.on_commit(update)
+    
+    @staticmethod
+    def index_recipe(recipe_id, name, instructions="", family_notes="", ingredient_names=()):
+        """Add or refresh a recipe in the index"""
+        SearchCRUD._after_commit(
+            lambda: search_index.add(('recipe', recipe_id), name, instructions, family_notes, *ingredient_names)
+        )
+    
+    @staticmethod
+    def add_recipe_text(recipe_id, *texts):
+        """Add extra searchable text, such as a new ingredient, to a recipe"""
+        SearchCRUD._after_commit(lambda: search_index.extend(('recipe', recipe_id), *texts))
+    
+    @staticmethod
+    def index_food(food_id, name, description="", ingredient_names=()):
+        """Add or refresh a food in the index"""
+        SearchCRUD._after_commit(
+            lambda: search_index.add(('food', food_id), name, description, *ingredient_names)
+        )
+    
+    @staticmethod
+    def unindex_recipes(recipe_ids):
+        """Drop deleted recipes from the index"""
+        def drop():
+            for recipe_id in recipe_ids:
+                search_index.remove(('recipe', recipe_id))
+        
+        SearchCRUD._after_commit(drop)
+    
+    @staticmethod
+    def search(query, limit=20, kinds=None):
+        """
+        Search recipes and foods. Every word must match, and a word also
+        matches longer words it starts with. Returns a list of dicts with
+        type, id, name and score, best match first.
+        """
+        SearchCRUD.ensure_index()
+        return [
+            {'type': kind, 'id': item_id, 'name': name, 'score': score}
+            for (kind, item_id), name, score in search_index.search(query, limit=limit, kinds=kinds)
+        ]
+    
+    @staticmethod
+    def display_search_results(results, query):
+        """Display search results in a numbered table"""
+        if not results:
+            print(f"\nNo matches for '{query}'.")
+            return
+        
+        headers = ["#", "Type", "Name", "ID"]
+        table_data = [
+            [number, result['type'].title(), result['name'], result['id']]
+            for number, result in enumerate(results, 1)
+        ]
+        
+        print(f"\nSearch results for '{query}'")
+        print("=" * 60)
+        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+
+
+
+class PantryMatchCRUD:
+    """
+    "What can I cook?" matching against recipe_ingredients.
+
+    Each recipe's ingredients are held in memory as a bitset, built from the
+    database on first use and kept current by the CRUD write paths, so
+    ranking the whole catalog never queries the database.
+    """
+    
+    RECIPE_QUERY = """
+        SELECT r.id, r.name, ri.ingredient_id, i.name AS ingredient_name
+        FROM recipes r
+        LEFT JOIN recipe_ingredients ri ON ri.recipe_id = r.id
+        LEFT JOIN ingredients i ON i.id = ri.ingredient_id
+        ORDER BY r.id
+    """
+    
+    _state = {'built': False, 'building': False}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def is_active():
+        """Whether the matcher is built (or being built) and needs incremental updates"""
+        state = PantryMatchCRUD._state
+        return state['built'] or state['building']
+    
+    @staticmethod
+    def rebuild_index(batch_size=None):
+        """Rebuild every recipe's ingredient bitset from the database and return matcher stats"""
+        with PantryMatchCRUD._lock:
+            PantryMatchCRUD._state['building'] = True
+            try:
+                pantry_matcher.clear()
+                recipe_id = name = None
+                ingredients = {}
+                for row in pantry_vault.iter_query(PantryMatchCRUD.RECIPE_QUERY, batch_size=batch_size):
+                    if row['id'] != recipe_id:
+                        if recipe_id is not None:
+                            PantryMatchCRUD._store(recipe_id, name, ingredients)
+                        recipe_id, name, ingredients = row['id'], row['name'], {}
+                    if row['ingredient_id'] is not None:
+                        ingredients[row['ingredient_id']] = row['ingredient_name']
+                if recipe_id is not None:
+                    PantryMatchCRUD._store(recipe_id, name, ingredients)
+                PantryMatchCRUD._state['built'] = True
+            finally:
+                PantryMatchCRUD._state['building'] = False
+        return pantry_matcher.stats()
+    
+    @staticmethod
+    def ensure_index():
+        """Build the matcher on first use"""
+        if not PantryMatchCRUD._state['built']:
+            PantryMatchCRUD.rebuild_index()
+    
+    @staticmethod
+    def _store(recipe_id, name, ingredients):
+        pantry_matcher.set_ingredient_names({key: value for key, value in ingredients.items() if value})
+        pantry_matcher.add_recipe(recipe_id, name, ingredients)
+    
+    @staticmethod
+    def _after_commit(update):
+        # Before the first match there is nothing to keep current
+        if PantryMatchCRUD.is_active():
+            pantry_vault.on_commit(update)
+    
+    @staticmethod
+    def index_recipe(recipe_id, name, ingredients):
+        """Add or replace a recipe; ingredients maps ingredient ID to name"""
+        PantryMatchCRUD._after_commit(lambda: PantryMatchCRUD._store(recipe_id, name, ingredients))
+    
+    @staticmethod
+    def add_recipe_ingredients(recipe_id, ingredients):
+        """Add ingredients ({id: name}) to an indexed recipe"""
+        def update():
+            pantry_matcher.set_ingredient_names(ingredients)
+            pantry_matcher.add_ingredients(recipe_id, ingredients)
         
-        if result > 0:
-            # Get the ID of the newly inserted ingredient
-            get_id_query = "SELECT LAST_INSERT_ID() as id"
-            id_result = pantry_vault.execute_query(get_id_query)
-            return id_result[0]['id'] if id_result else None
+        PantryMatchCRUD._after_commit(update)
+    
+    @staticmethod
+    def unindex_recipes(recipe_ids):
+        """Drop deleted recipes from the matcher"""
+        def drop():
+            for recipe_id in recipe_ids:
+                pantry_matcher.remove(recipe_id)
         
-        return None
\ No newline at end of file
+        PantryMatchCRUD._after_commit(drop)
+    
+    @staticmethod
+    def what_can_i_cook(ingredient_names, max_missing=None, limit=None):
+        """
+        Rank recipes by how many of their ingredients are in ingredient_names.
+
+        Returns (results, unknown_names). Each result is a dict with id,
+        name, have, total and the names of the missing ingredients; recipes
+        with nothing missing come first. Names that no recipe uses are
+        returned in unknown_names.
+        """
+        PantryMatchCRUD.ensure_index()
+        ingredient_ids, unknown = pantry_matcher.ingredient_ids(ingredient_names)
+        results = [
+            {
+                'id': recipe_id,
+                'name': name,
+                'have': have,
+                'total': total,
+                'missing': [pantry_matcher.ingredient_name(ingredient_id) for ingredient_id in missing],
+            }
+            for recipe_id, name, have, total, missing in pantry_matcher.match(ingredient_ids, max_missing, limit)
+        ]
+        return results, unknown
+    
+    @staticmethod
+    def display_matches_table(matches, title="What You Can Cook"):
+        """Display pantry matches in a formatted table"""
+        if not matches:
+            print("\nNo recipes use any of those ingredients.")
+            return
+        
+        headers = ["ID", "Recipe Name", "Have", "Missing"]
+        table_data = []
+        
+        for match in matches:
+            missing = ", ".join(match['missing']) if match['missing'] else "Nothing - ready to cook!"
+            if len(missing) > 50:
+                missing = missing[:47] + "..."
+            table_data.append([match['id'], match['name'], f"{match['have']}/{match['total']}", missing])
+        
+        print(f"\n{title}")
+        print("=" * 70)
+        print(tabulate(table_data, headers=headers, tablefmt="grid"))
@@ -1,154 +1,924 @@
-import mysql.connector
+
+import itertools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
 from config import Config
-from mysql.connector import Error as MySQLError
+
+try:
+    from migrations import migrate, TABLES as SCHEMA_TABLES
+    from instrumentation import query_stats
+    from cache import data_versions
+    import credentials
+except ImportError:
+    from pantry.migrations import migrate, TABLES as SCHEMA_TABLES
+    from pantry.instrumentation import query_stats
+    from pantry.cache import data_versions
+    from pantry import credentials
+
+
+class MySQLBackend:
+    """Storage backend for a MySQL server via mysql-connector-python"""
+
+    name = 'mysql'
+
+    def __init__(self, params=None):
+        self.params = params or Config.get_connection_params()
+
+    def connect(self):
+        """
+        Returns a live MySQL connection in autocommit mode.
+
+        Raises
+        ------
+        ConnectionError
+            If the underlying connector cannot establish a connection.
+        """
+        import mysql.connector
+        try:
+            return mysql.connector.connect(autocommit=True, **self.params)
+        except mysql.connector.Error as exc:
+            # Optionally add structured logging here
+            raise ConnectionError("Could not establish MySQL connection") from exc
+
+    def is_alive(self, conn):
+        return conn.is_connected()
+
+    def cursor(self, conn):
+        # Buffered so a partial fetchone() never leaves unread rows on the connection
+        return conn.cursor(dictionary=True, buffered=True)
+
+    def stream_cursor(self, conn):
+        # Unbuffered: rows stay on the server until fetched
+        return conn.cursor(dictionary=True)
+
+    def close_stream(self, conn, cursor):
+        """Drain anything left unread so the connection can go back to the pool"""
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+        finally:
+            cursor.close()
+
+    def identity(self):
+        """Stable name for the database this backend points at"""
+        return f"mysql://{self.params.get('user')}@{self.params.get('host')}:{self.params.get('port')}/{self.params.get('database')}"
+
+    def translate(self, query):
+        return query
+
+    def begin(self, conn):
+        conn.start_transaction()
+
+    def is_connection_lost(self, exc):
+        """Return True if the error means the server dropped the connection"""
+        return (
+            getattr(exc, 'errno', None) in (2006, 2013, 2055)
+            or 'SSL' in str(exc)
+            or 'connection was forcibly closed' in str(exc)
+        )
+
+    def table_exists_query(self, table):
+        return "SHOW TABLES LIKE %s", (table,)
+
+    def index_columns_query(self, table):
+        """Query yielding (index_name, column_name) rows in index column order"""
+        return (
+            "SELECT index_name AS index_name, column_name AS column_name "
+            "FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s "
+            "ORDER BY index_name, seq_in_index",
+            (table,)
+        )
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+@lru_cache(maxsize=512)
+def _mysql_to_sqlite(query):
+    """Rewrite the MySQL constructs used in this codebase into SQLite syntax"""
+    query = query.replace('%s', '?')
+    query = re.sub(r'LAST_INSERT_ID\(\)', 'last_insert_rowid()', query, flags=re.IGNORECASE)
+    query = re.sub(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY AUTOINCREMENT',
+                   query, flags=re.IGNORECASE)
+    # INSERT IGNORE skips rows that would break a unique key, as ON CONFLICT DO NOTHING does
+    query, ignored = re.subn(r'\bINSERT\s+IGNORE\s+INTO\b', 'INSERT INTO', query, flags=re.IGNORECASE)
+    if ignored:
+        query = query.rstrip().rstrip(';') + " ON CONFLICT DO NOTHING"
+    upsert = re.search(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', query, flags=re.IGNORECASE)
+    if upsert:
+        query = _on_conflict(query[:upsert.start()], query[upsert.end():])
+    return query
+
+
+def _on_conflict(insert, assignments):
+    """
+    Rewrite an INSERT ... ON DUPLICATE KEY UPDATE as INSERT ... ON CONFLICT.
+    The inserted columns the assignments leave alone are the conflict
+    target, so an upsert must assign every column outside the key. New
+    values may be named through a row alias (VALUES (...) AS new, then
+    new.col) or the older VALUES(col); both become excluded.col.
+    """
+    columns = re.search(r'\(([^)]*)\)', insert).group(1)
+    assigned = {match.lower() for match in re.findall(r'(?<!\.)\b(\w+)\s*=', assignments)}
+    target = [column.strip() for column in columns.split(',') if column.strip().lower() not in assigned]
+    alias = re.search(r'\s+AS\s+(\w+)\s*$', insert, flags=re.IGNORECASE)
+    if alias:
+        assignments = re.sub(rf'\b{alias.group(1)}\.(\w+)', r'excluded.\1', assignments)
+        insert = insert[:alias.start()]
+    assignments = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', assignments, flags=re.IGNORECASE)
+    return f"{insert.rstrip()} ON CONFLICT ({', '.join(target)}) DO UPDATE SET{assignments}"
+
+
+class SQLiteBackend:
+    """Storage backend for a local SQLite file or an in-memory database"""
+
+    name = 'sqlite'
+    _memory_ids = itertools.count(1)
+
+    def __init__(self, path=None):
+        self.path = path or Config.DB_PATH
+        self._keepalive = None
+        if self.path == ':memory:':
+            # Pooled connections must all see the same in-memory database,
+            # which only lives as long as one connection to it stays open.
+            self.target = f"file:pantry-memory-{next(self._memory_ids)}?mode=memory&cache=shared"
+            self._keepalive = self.connect()
+        else:
+            self.target = self.path
+
+    def connect(self):
+        import sqlite3
+        try:
+            conn = sqlite3.connect(
+                self.target,
+                uri=self.path == ':memory:',
+                check_same_thread=False,
+                isolation_level=None,
+                timeout=30
+            )
+        except sqlite3.Error as exc:
+            raise ConnectionError(f"Could not open SQLite database '{self.path}'") from exc
+        conn.row_factory = _dict_row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def is_alive(self, conn):
+        conn.execute("SELECT 1")
+        return True
+
+    def cursor(self, conn):
+        return conn.cursor()
+
+    def stream_cursor(self, conn):
+        # SQLite steps through results lazily already
+        return conn.cursor()
+
+    def close_stream(self, conn, cursor):
+        cursor.close()
+
+    def identity(self):
+        # An in-memory database starts empty every run, so it has no stable identity
+        if self.path == ':memory:':
+            return None
+        path = os.path.abspath(self.path)
+        # The inode changes when the file is deleted and created afresh
+        inode = os.stat(path).st_ino if os.path.exists(path) else 0
+        return f"sqlite:{path}#{inode}"
+
+    def translate(self, query):
+        return _mysql_to_sqlite(query)
+
+    def begin(self, conn):
+        conn.execute("BEGIN")
+
+    def is_connection_lost(self, exc):
+        return False
+
+    def table_exists_query(self, table):
+        return "SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", (table,)
+
+    def index_columns_query(self, table):
+        return (
+            "SELECT il.name AS index_name, ii.name AS column_name "
+            "FROM pragma_index_list(%s) il JOIN pragma_index_info(il.name) ii "
+            "ORDER BY il.name, ii.seqno",
+            (table,)
+        )
+
+
+BACKENDS = {
+    MySQLBackend.name: MySQLBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def create_backend(name=None):
+    """Build the storage backend selected by DB_BACKEND"""
+    name = (name or Config.DB_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
 
 def get_connection():
     """
-    Returns a live MySQL connection.
+    Returns a live connection from the configured backend.
 
     Raises
     ------
     ConnectionError
         If the underlying connector cannot establish a connection.
     """
-    try:
-        return mysql.connector.connect(**Config)
-    except mysql.connector.Error as exc: 
-        # Optionally add structured logging here
-        raise ConnectionError("Could not establish MySQL connection") from exc
+    return create_backend().connect()
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free in time"""
+
+
+class ConnectionPool:
+    """
+    Fixed-size, thread-safe pool of database connections.
+
+    Connections are created lazily up to ``size``, health-checked on every
+    checkout and replaced transparently when the check fails.
+    """
+
+    def __init__(self, connect_fn, size=5, timeout=10.0, check_fn=None):
+        self._connect = connect_fn
+        self._check = check_fn or (lambda conn: conn.is_connected())
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        # Idle connections, most recently returned last
+        self._idle = []
+        self._lock = threading.Lock()
+        # Signalled whenever a connection is returned or a slot is freed
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._stats = {
+            'checkouts': 0,
+            'reconnects': 0,
+            'timeouts': 0,
+            'wait_time': 0.0,
+            'max_wait': 0.0,
+        }
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _open(self):
+        try:
+            return self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def is_healthy(self, conn):
+        """Run the configured liveness check against a connection"""
+        try:
+            return bool(self._check(conn))
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Borrow a healthy connection, waiting up to ``timeout`` seconds"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        with self._available:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._available.wait(remaining)
+        if conn is None:
+            conn = self._open()
+
+        if not self.is_healthy(conn):
+            self._close_quietly(conn)
+            conn = self._connect_replacement()
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_time'] += waited
+            self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+        return conn
+
+    def _connect_replacement(self):
+        with self._lock:
+            self._stats['reconnects'] += 1
+        return self._open()
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection; discarded ones free their slot"""
+        if discard:
+            self._close_quietly(conn)
+            self._free_slot()
+            return
+        with self._available:
+            self._idle.append(conn)
+            self._available.notify()
+
+    def replace(self, conn):
+        """Swap a broken connection for a fresh one without giving up the slot"""
+        self._close_quietly(conn)
+        return self._connect_replacement()
+
+    @contextmanager
+    def lease(self):
+        """Borrow a connection for the duration of a ``with`` block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Snapshot of pool counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['size'] = self.size
+            snapshot['open'] = self._created
+            snapshot['idle'] = len(self._idle)
+        snapshot['in_use'] = snapshot['open'] - snapshot['idle']
+        checkouts = snapshot['checkouts']
+        snapshot['avg_wait'] = snapshot['wait_time'] / checkouts if checkouts else 0.0
+        return snapshot
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class Transaction:
+    """Handle for an open PantryVault.transaction() block"""
+
+    def __init__(self, vault, conn):
+        self.vault = vault
+        self.conn = conn
+        self.after_commit = []
+        self.commits = 0
+        self._savepoints = 0
+
+    def _statement(self, sql):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
+    def commit(self, reopen=True):
+        """Commit the work done so far; with reopen the block carries on in a new transaction"""
+        if self._savepoints:
+            raise RuntimeError("Cannot commit inside a nested transaction block")
+        self.conn.commit()
+        self.commits += 1
+        callbacks, self.after_commit = self.after_commit, []
+        if reopen:
+            self.vault.backend.begin(self.conn)
+        for callback in callbacks:
+            callback()
+
+    @contextmanager
+    def savepoint(self):
+        """Nested block that rolls back only its own statements on error"""
+        self._savepoints += 1
+        name = f"pantry_sp_{self._savepoints}"
+        pending = len(self.after_commit)
+        self._statement(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except BaseException:
+            self._statement(f"ROLLBACK TO SAVEPOINT {name}")
+            del self.after_commit[pending:]
+            raise
+        else:
+            self._statement(f"RELEASE SAVEPOINT {name}")
+        finally:
+            self._savepoints -= 1
+
+
+class Session:
+    """
+    A logged-in user. CRUD methods that act for a user take the session
+    explicitly (``session=``) rather than reading it from the vault, so any
+    number of users can be signed in over one vault from different threads.
+    """
+
+    def __init__(self, vault, user):
+        self.vault = vault
+        self.user = user
+
+    @property
+    def user_id(self):
+        return self.user['id'] if self.user else None
+
+    @property
+    def user_name(self):
+        return self.user['user_name'] if self.user else None
+
+    def lease(self):
+        """Run this thread's statements in a ``with`` block on one pooled connection"""
+        return self.vault.lease()
+
+    def close(self):
+        """Log out; the session no longer acts for anyone"""
+        self.user = None
+
+    def __bool__(self):
+        return self.user is not None
+
 
 class PantryVault:
-    def __init__(self):
-        self.conn = None
-        self.cursor = None
-        self.current_user = None
-    
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.pool = None
+        # Per-thread open Transaction, see transaction()
+        self._local = threading.local()
+        # Callables notified after every statement, see add_query_hook()
+        self._query_hooks = []
+        if Config.QUERY_STATS:
+            self.add_query_hook(query_stats)
+        # Lets caches of rendered listings notice writes, see cache.DataVersions
+        self.add_query_hook(data_versions.observer(self))
+        # See start_background_setup()
+        self._setup_thread = None
+        self._setup_done = None
+        self._setup_result = None
+
     def connect(self):
         try:
-            self.conn = mysql.connector.connect(**Config.get_connection_params())
-            self.cursor = self.conn.cursor(dictionary=True)
+            if self.backend is None:
+                self.backend = create_backend()
+            if self.pool is None:
+                pool_params = Config.get_pool_params()
+                self.pool = ConnectionPool(self.backend.connect, pool_params['size'],
+                                           pool_params['timeout'], self.backend.is_alive)
+            # Check out once so configuration problems surface immediately
+            with self.pool.lease():
+                pass
             return True
-        except mysql.connector.Error as exc:
+        except (ConnectionError, PoolTimeout, ValueError) as exc:
             print(f"Database connection error: {exc}")
             return False
-    
+
     def disconnect(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
-        self.cursor = None
-        self.conn = None
+        if self.pool:
+            self.pool.close_all()
+        self.pool = None
 
     def ensure_connection(self):
-        if not self.conn or not self.cursor:
+        # Statements from other threads wait for a background setup to finish
+        if self._setup_thread is not None and threading.current_thread() is not self._setup_thread:
+            self.wait_for_setup()
+        if not self.pool:
             self.connect()
 
-    def create_tables(self):
+    def start_background_setup(self, setup):
+        """
+        Run setup(vault) (connect, migrate, ...) on a daemon thread so the
+        caller can carry on, e.g. render the first menus. Statements made on
+        any other thread block until it finishes; wait_for_setup() returns
+        its result.
+        """
+        done = threading.Event()
+
+        def run():
+            try:
+                self._setup_result = setup(self)
+            except Exception as e:
+                print(f"Database setup error: {e}")
+                self._setup_result = False
+            finally:
+                done.set()
+
+        self._setup_result = None
+        self._setup_done = done
+        self._setup_thread = threading.Thread(target=run, name='pantry-setup', daemon=True)
+        self._setup_thread.start()
+
+    def wait_for_setup(self, timeout=None):
+        """Block until the background setup finishes and return its result (True if none was started)"""
+        if self._setup_done is None:
+            return True
+        if not self._setup_done.wait(timeout):
+            return False
+        return bool(self._setup_result)
+
+    def pool_stats(self):
+        return self.pool.stats() if self.pool else {}
+
+    def add_query_hook(self, hook):
+        """
+        Register hook(query, seconds, rows, error) to be called after every
+        statement. query is the statement as written (before backend
+        translation) and error is the exception raised, or None.
+        """
+        if hook not in self._query_hooks:
+            self._query_hooks.append(hook)
+
+    def remove_query_hook(self, hook):
+        if hook in self._query_hooks:
+            self._query_hooks.remove(hook)
+
+    def _notify(self, query, seconds, rows, error):
+        for hook in list(self._query_hooks):
+            try:
+                hook(query, seconds, rows, error)
+            except Exception:
+                # Instrumentation must never break the statement it observes
+                pass
+
+    def _run(self, cursor, query, params, many):
+        if many:
+            cursor.executemany(query, params)
+        else:
+            cursor.execute(query, params or ())
+
+    def _run_and_handle(self, cursor, raw_query, query, params, many, handler):
+        """Run a statement and its result handler, timing both for the query hooks"""
+        if not self._query_hooks:
+            self._run(cursor, query, params, many)
+            return handler(cursor)
+        started = time.perf_counter()
+        try:
+            self._run(cursor, query, params, many)
+            result = handler(cursor)
+        except Exception as e:
+            self._notify(raw_query, time.perf_counter() - started, 0, e)
+            raise
+        if isinstance(result, list):
+            rows = len(result)
+        elif isinstance(result, dict):
+            rows = 1
+        else:
+            rows = max(cursor.rowcount or 0, 0)
+        self._notify(raw_query, time.perf_counter() - started, rows, None)
+        return result
+
+    def _execute(self, query, params, handler, many=False):
+        """Run one statement on a pooled connection and pass the cursor to handler.
+
+        Queries are written in MySQL syntax and translated by the backend.
+        Inside a transaction or lease() the statement runs on that connection.
+        Otherwise a connection that was dropped by the server is replaced and
+        the statement retried once; any other error propagates.
+        """
+        self.ensure_connection()
+        if not self.pool:
+            raise ConnectionError("Database is not connected")
+        raw_query = query
+        query = self.backend.translate(query)
+
+        bound = self._bound_connection()
+        if bound is not None:
+            cursor = self.backend.cursor(bound)
+            try:
+                return self._run_and_handle(cursor, raw_query, query, params, many, handler)
+            finally:
+                cursor.close()
+
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            for attempt in (1, 2):
+                cursor = self.backend.cursor(conn)
+                try:
+                    return self._run_and_handle(cursor, raw_query, query, params, many, handler)
+                except Exception as e:
+                    if attempt == 1 and self.backend.is_connection_lost(e):
+                        print("Lost connection to database server. Attempting to reconnect...")
+                        try:
+                            conn = self.pool.replace(conn)
+                        except Exception:
+                            conn = None
+                            raise
+                        continue
+                    broken = not self.pool.is_healthy(conn)
+                    raise
+                finally:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        pass
+        finally:
+            if conn is not None:
+                self.pool.release(conn, discard=broken)
+
+    def _bound_connection(self):
+        txn = self.current_transaction()
+        if txn is not None:
+            return txn.conn
+        return getattr(self._local, 'lease', None)
+
+    @contextmanager
+    def lease(self):
+        """
+        Hold one pooled connection for this thread until the block ends, so
+        a run of statements (e.g. everything one request does) checks out a
+        connection once. Transactions opened inside the block use it too.
+        """
+        bound = self._bound_connection()
+        if bound is not None:
+            yield bound
+            return
+
         self.ensure_connection()
-        # Placeholder: Implement actual table creation logic
-        try:
-            # Example: create a countries table if not exists
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS countries (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL UNIQUE
-                )
-            ''')
-            self.conn.commit()
+        if not self.pool:
+            raise ConnectionError("Database is not connected")
+        conn = self.pool.acquire()
+        self._local.lease = conn
+        try:
+            yield conn
+        finally:
+            self._local.lease = None
+            self.pool.release(conn, discard=not self.pool.is_healthy(conn))
+
+    def current_transaction(self):
+        """Return this thread's open Transaction, or None"""
+        return getattr(self._local, 'transaction', None)
+
+    def in_transaction(self):
+        return self.current_transaction() is not None
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group statements into one transaction::
+
+            with pantry_vault.transaction() as txn:
+                ...
+
+        Every execute_* call made by this thread inside the block, including
+        the ones inside CRUD methods, runs on the same connection and commits
+        once at the end. If the block raises, everything rolls back and the
+        error propagates. A nested block becomes a savepoint, so its failure
+        only undoes its own work. Call txn.commit() to commit in batches
+        during long imports.
+        """
+        txn = self.current_transaction()
+        if txn is not None:
+            with txn.savepoint():
+                yield txn
+            return
+
+        leased = getattr(self._local, 'lease', None)
+        if leased is None:
+            self.ensure_connection()
+            if not self.pool:
+                raise ConnectionError("Database is not connected")
+        conn = leased or self.pool.acquire()
+        txn = Transaction(self, conn)
+        self._local.transaction = txn
+        broken = False
+        try:
+            self.backend.begin(conn)
+            yield txn
+            txn.commit(reopen=False)
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._local.transaction = None
+            # A leased connection goes back when its lease() block ends
+            if leased is None:
+                self.pool.release(conn, discard=broken and not self.pool.is_healthy(conn))
+
+    def on_commit(self, callback):
+        """Run callback after the current transaction commits, or now if there is none"""
+        txn = self.current_transaction()
+        if txn is None:
+            callback()
+        else:
+            txn.after_commit.append(callback)
+
+    def create_tables(self, progress=print):
+        """Bring the schema up to date by applying any pending migrations"""
+        try:
+            applied = migrate(self, progress=progress)
+            if applied:
+                progress(f"Schema is now at version {applied[-1]}.")
             return True
         except Exception as e:
             print(f"Error creating tables: {e}")
             return False
 
+    def execute_ddl(self, statement):
+        """Run a schema statement; errors are raised, never printed"""
+        self._execute(statement, None, lambda cursor: None)
+
+    def table_exists(self, table):
+        query, params = self.backend.table_exists_query(table)
+        return bool(self._execute(query, params, lambda cursor: cursor.fetchone()))
+
+    def index_columns(self, table):
+        """Return {index_name: [column, ...]} for every index on table"""
+        query, params = self.backend.index_columns_query(table)
+        indexes = {}
+        for row in self._execute(query, params, lambda cursor: cursor.fetchall()):
+            indexes.setdefault(row['index_name'], []).append(row['column_name'])
+        return indexes
+
+    def ensure_index(self, table, index, columns):
+        """
+        Create an index unless its table is missing or an index with the same
+        name or the same leading columns already exists; returns True if created.
+        """
+        self.ensure_connection()
+        if not self.table_exists(table):
+            return False
+        wanted = [column.strip().lower() for column in columns.split(',')]
+        for name, indexed in self.index_columns(table).items():
+            if name == index or [column.lower() for column in indexed[:len(wanted)]] == wanted:
+                return False
+        self.execute_ddl(f"CREATE INDEX {index} ON {table} ({columns})")
+        return True
+
     def check_tables_exist(self):
         self.ensure_connection()
-        # Placeholder: Check if required tables exist
         try:
-            self.cursor.execute("SHOW TABLES LIKE 'countries'")
-            result = self.cursor.fetchone()
-            return bool(result)
+            missing = [table for table in SCHEMA_TABLES if not self.table_exists(table)]
+            if missing:
+                print(f"Missing tables: {', '.join(missing)}")
+            return not missing
         except Exception as e:
             print(f"Error checking tables: {e}")
             return False
-    
+
     def execute_query(self, query, params=None):
-        self.ensure_connection()
         try:
-            self.cursor.execute(query, params or ())
-            return [dict(row) for row in self.cursor.fetchall()]
-        except MySQLError as e:
-            if getattr(e, 'errno', None) == 2055 or 'SSL' in str(e) or 'connection was forcibly closed' in str(e):
-                print("Lost connection to MySQL server. Attempting to reconnect...")
-                self.connect()
-                try:
-                    self.cursor.execute(query, params or ())
-                    return [dict(row) for row in self.cursor.fetchall()]
-                except Exception as e2:
-                    print(f"Query error after reconnect: {e2}")
-                    return []
-            print(f"Query error: {e}")
-            return []
+            # Both backends already produce one dict per row
+            return self._execute(query, params, lambda cursor: cursor.fetchall())
         except Exception as e:
+            if self.in_transaction():
+                raise
             print(f"Query error: {e}")
             return []
-    
-    def execute_update(self, query, params=None):
+
+    def iter_query(self, query, params=None, batch_size=None):
+        """Yield result rows as they arrive, fetching batch_size rows at a time.
+
+        The pooled connection stays checked out until the generator is
+        exhausted or closed. Inside a transaction or lease() the stream runs
+        on that connection instead, so it sees uncommitted rows; there the
+        rows are read with a buffered cursor, because other statements may
+        run on the connection while the stream is open. Unlike execute_query,
+        errors are raised rather than printed, so a failed export or scan
+        cannot look like a short one.
+        """
         self.ensure_connection()
+        if not self.pool:
+            raise ConnectionError("Database is not connected")
+        batch_size = batch_size or Config.STREAM_BATCH_SIZE
+        raw_query = query
+        query = self.backend.translate(query)
+        bound = self._bound_connection()
+        conn = bound if bound is not None else self.pool.acquire()
+        cursor = None
+        failed = False
+        error = None
+        count = 0
+        started = time.perf_counter()
         try:
-            self.cursor.execute(query, params or ())
-            self.conn.commit()
-            return self.cursor.rowcount
-        except MySQLError as e:
-            if getattr(e, 'errno', None) == 2055 or 'SSL' in str(e) or 'connection was forcibly closed' in str(e):
-                print("Lost connection to MySQL server. Attempting to reconnect...")
-                self.connect()
-                try:
-                    self.cursor.execute(query, params or ())
-                    self.conn.commit()
-                    return self.cursor.rowcount
-                except Exception as e2:
-                    print(f"Update error after reconnect: {e2}")
-                    return 0
+            cursor = self.backend.cursor(conn) if bound is not None else self.backend.stream_cursor(conn)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+        except Exception as e:
+            failed = True
+            error = e
+            raise
+        finally:
+            if self._query_hooks:
+                # Includes the time the consumer spent between batches
+                self._notify(raw_query, time.perf_counter() - started, count, error)
+            try:
+                if cursor is not None:
+                    self.backend.close_stream(conn, cursor)
+            except Exception:
+                failed = True
+            # A bound connection goes back when its transaction or lease ends
+            if bound is None:
+                self.pool.release(conn, discard=failed and not self.pool.is_healthy(conn))
+
+    def execute_update(self, query, params=None):
+        try:
+            return self._execute(query, params, lambda cursor: cursor.rowcount)
+        except Exception as e:
+            if self.in_transaction():
+                raise
             print(f"Update error: {e}")
             return 0
+
+    def execute_many(self, query, seq_params):
+        """Run one statement for every parameter tuple in a single executemany call"""
+        seq_params = list(seq_params)
+        if not seq_params:
+            return 0
+        try:
+            return self._execute(query, seq_params, lambda cursor: cursor.rowcount, many=True)
         except Exception as e:
+            if self.in_transaction():
+                raise
             print(f"Update error: {e}")
             return 0
-    
-    def validate_user(self, username, password):
-        self.ensure_connection()
-        # Placeholder: Implement actual user validation
-        # Example: check if user exists in users table
+
+    def execute_insert(self, query, params=None):
+        """Run an INSERT and return the new row ID (None on failure).
+
+        The ID is read from the cursor that ran the insert, so it stays
+        correct even when the next statement is served by another connection.
+        """
         try:
-            self.cursor.execute("SELECT * FROM users WHERE user_name=%s AND password=%s", (username, password))
-            user = self.cursor.fetchone()
-            if user:
-                self.current_user = user
-            return True
-            return False
+            return self._execute(query, params, lambda cursor: cursor.lastrowid if cursor.rowcount > 0 else None)
+        except Exception as e:
+            if self.in_transaction():
+                raise
+            print(f"Insert error: {e}")
+            return None
+
+    def find_user(self, username):
+        """Return the users row for username (an indexed lookup), or None"""
+        return self._execute(
+            "SELECT * FROM users WHERE user_name=%s",
+            (username,),
+            lambda cursor: cursor.fetchone()
+        )
+
+    def _rehash_password(self, user, password):
+        """Store a hash at the current cost, unless the password changed meanwhile"""
+        try:
+            self._execute(
+                "UPDATE users SET password=%s WHERE id=%s AND password=%s",
+                (credentials.hash_password(password), user['id'], user['password']),
+                lambda cursor: cursor.rowcount
+            )
+        except Exception as e:
+            # The login itself succeeded; the upgrade is retried next time
+            print(f"Password rehash error: {e}")
+
+    def open_session(self, username, password):
+        """Return a Session for the user with these credentials, or None"""
+        try:
+            user = self.find_user(username)
+            if user is None:
+                credentials.verify_unknown_user(password)
+                return None
+            if not credentials.verify_password(password, user['password']):
+                return None
+            if credentials.needs_rehash(user['password']):
+                self._rehash_password(user, password)
+            return Session(self, {key: value for key, value in user.items() if key != 'password'})
         except Exception as e:
             print(f"User validation error: {e}")
-        return False
-    
+        return None
+
     def register_user(self, username, email, password, country_id=None):
-        self.ensure_connection()
         try:
-            self.cursor.execute(
+            self._execute(
                 "INSERT INTO users (user_name, email, password, country_id) VALUES (%s, %s, %s, %s)",
-                (username, email, password, country_id)
+                (username, email, credentials.hash_password(password), country_id),
+                lambda cursor: cursor.rowcount
             )
-            self.conn.commit()
             return True, "Registration successful."
         except Exception as e:
             print(f"User registration error: {e}")
             return False, f"Registration failed: {e}"
-    
-    def get_current_user(self):
-        return self.current_user
-    
-    def logout(self):
-        self.current_user = None
-    
+
 # Instantiate pantry_vault for import
-pantry_vault = PantryVault()
\ No newline at end of file
+pantry_vault = PantryVault()
@@ -0,0 +1,220 @@
+"""
+Streaming export of the vault to JSON Lines, CSV or a compact columnar file.
+
+Every entity is read through PantryVault.iter_query (a server-side cursor on
+MySQL) and written row by row, so memory use stays flat however large the
+catalog is. Recipes and foods are exported with their ingredients nested,
+in the same shape the importer reads back.
+"""
+
+import csv
+import json
+import os
+import time
+
+from config import Config
+
+try:
+    from db import pantry_vault
+    from crud import nest_ingredients
+except ImportError:
+    from pantry.db import pantry_vault
+    from pantry.crud import nest_ingredients
+
+FORMATS = ('jsonl', 'csv', 'columnar')
+ENTITIES = ('countries', 'foods', 'recipes')
+
+COLUMNAR_MAGIC = 'pantry-columnar'
+COLUMNAR_VERSION = 1
+
+EXPORT_QUERIES = {
+    'countries': (
+        ['id', 'name'],
+        "SELECT id, name FROM countries ORDER BY id",
+    ),
+    'foods': (
+        ['id', 'name', 'country', 'description', 'ingredients'],
+        """
+        SELECT f.id, f.name, c.name AS country, f.description,
+               i.name AS ingredient_name, fi.quantity AS ingredient_quantity, fi.unit AS ingredient_unit
+        FROM foods f
+        LEFT JOIN countries c ON f.country_id = c.id
+        LEFT JOIN food_ingredients fi ON fi.food_id = f.id
+        LEFT JOIN ingredients i ON i.id = fi.ingredient_id
+        ORDER BY f.id
+        """,
+    ),
+    'recipes': (
+        ['id', 'name', 'country', 'instructions', 'prep_time', 'cook_time',
+         'servings', 'family_notes', 'user_id', 'ingredients'],
+        """
+        SELECT r.id, r.name, c.name AS country, r.instructions, r.prep_time, r.cook_time,
+               r.servings, r.family_notes, r.user_id,
+               i.name AS ingredient_name, ri.quantity AS ingredient_quantity, ri.unit AS ingredient_unit
+        FROM recipes r
+        LEFT JOIN countries c ON r.country_id = c.id
+        LEFT JOIN recipe_ingredients ri ON ri.recipe_id = r.id
+        LEFT JOIN ingredients i ON i.id = ri.ingredient_id
+        ORDER BY r.id
+        """,
+    ),
+}
+
+
+def iter_entity(entity, batch_size=None):
+    """Stream the records of one entity"""
+    _, query = EXPORT_QUERIES[entity]
+    rows = pantry_vault.iter_query(query, batch_size=batch_size)
+    if entity == 'countries':
+        return rows
+    return nest_ingredients(rows)
+
+
+def _json_default(value):
+    # Decimal, date and similar driver types
+    return str(value)
+
+
+def format_ingredients(ingredients):
+    """Flatten ingredients into the importer's 'name:quantity:unit; ...' form"""
+    return "; ".join(
+        f"{ing['name']}:{'' if ing['quantity'] is None else ing['quantity']}:{ing['unit'] or ''}"
+        for ing in ingredients
+    )
+
+
+class JsonLinesWriter:
+    """One JSON object per line, ingredients nested as a list"""
+
+    extension = 'jsonl'
+
+    def __init__(self, path, columns):
+        self.handle = open(path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.handle.write(json.dumps(record, ensure_ascii=False, default=_json_default))
+        self.handle.write("\n")
+
+    def close(self):
+        self.handle.close()
+
+
+class CsvWriter:
+    """Flat CSV with ingredients folded into a single cell"""
+
+    extension = 'csv'
+
+    def __init__(self, path, columns):
+        self.handle = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.handle, fieldnames=columns, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        if 'ingredients' in record:
+            record = dict(record, ingredients=format_ingredients(record['ingredients']))
+        self.writer.writerow(record)
+
+    def close(self):
+        self.handle.close()
+
+
+class ColumnarWriter:
+    """
+    Row-grouped columnar JSON: a header line naming the columns, then one
+    line per row group holding a list of values per column. Loading a
+    group is a single json.loads per column set rather than one per row.
+    """
+
+    extension = 'columnar.jsonl'
+
+    def __init__(self, path, columns, row_group_size=None):
+        self.handle = open(path, 'w', encoding='utf-8')
+        self.columns = columns
+        self.row_group_size = row_group_size or Config.STREAM_BATCH_SIZE
+        self._buffer = {column: [] for column in columns}
+        self._buffered = 0
+        header = {'format': COLUMNAR_MAGIC, 'version': COLUMNAR_VERSION, 'columns': columns}
+        self.handle.write(json.dumps(header) + "\n")
+
+    def write(self, record):
+        for column in self.columns:
+            self._buffer[column].append(record.get(column))
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        group = {'rows': self._buffered, 'columns': self._buffer}
+        self.handle.write(json.dumps(group, ensure_ascii=False, default=_json_default) + "\n")
+        self._buffer = {column: [] for column in self.columns}
+        self._buffered = 0
+
+    def close(self):
+        self._flush()
+        self.handle.close()
+
+
+WRITERS = {
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+    'columnar': ColumnarWriter,
+}
+
+
+def read_columnar(path):
+    """Yield records back out of a file written by ColumnarWriter"""
+    with open(path, encoding='utf-8') as handle:
+        header = json.loads(handle.readline())
+        if header.get('format') != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a Pantry columnar export")
+        columns = header['columns']
+        for line in handle:
+            group = json.loads(line)
+            values = [group['columns'][column] for column in columns]
+            for row in zip(*values):
+                yield dict(zip(columns, row))
+
+
+def export_vault(output_dir, fmt='jsonl', entities=ENTITIES, batch_size=None, progress=print):
+    """
+    Export each entity to <output_dir>/<entity>.<ext> and return per-entity
+    stats with row counts, elapsed seconds and rows per second.
+
+    Each file is written under a temporary name and moved into place once
+    its stream finishes, so a failed or killed export never leaves a
+    truncated file where a snapshot reader would pick it up.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose one of: {', '.join(FORMATS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    writer_class = WRITERS[fmt]
+    report = {}
+
+    for entity in entities:
+        columns, _ = EXPORT_QUERIES[entity]
+        path = os.path.join(output_dir, f"{entity}.{writer_class.extension}")
+        started = time.perf_counter()
+        count = 0
+        temp_path = f"{path}.tmp"
+        writer = writer_class(temp_path, columns)
+        try:
+            try:
+                for record in iter_entity(entity, batch_size):
+                    writer.write(record)
+                    count += 1
+            finally:
+                writer.close()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed else 0.0
+        report[entity] = {'path': path, 'rows': count, 'seconds': elapsed, 'rows_per_second': rate}
+        if progress:
+            progress(f"{entity}: {count:,} rows -> {path} ({rate:,.0f} rows/s)")
+
+    return report
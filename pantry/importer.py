@@ -0,0 +1,282 @@
+"""
+Bulk recipe import from CSV or JSON Lines files.
+
+Records are streamed from disk, validated with the same rules as the
+interactive CLI and written in chunks, one transaction per chunk. Each
+chunk's transaction also records how far the import got in the
+import_progress table, so an interrupted run picks up exactly after the
+last committed chunk and never writes a chunk twice.
+
+CSV files need a header row with the columns ``name``, ``country`` and
+``instructions`` and may add ``prep_time``, ``cook_time``, ``servings``,
+``family_notes`` and ``ingredients``. The ingredients cell uses
+``name:quantity:unit`` entries separated by semicolons, e.g.
+``rice:2:cups; tomato:3:``.
+
+JSON Lines files hold one object per line with the same keys; there
+``ingredients`` is a list of ``{"name", "quantity", "unit"}`` objects.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from config import Config
+
+try:
+    from db import pantry_vault
+    from crud import CountryCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
+    import country_stats
+    import validation
+except ImportError:
+    from pantry.db import pantry_vault
+    from pantry.crud import CountryCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
+    from pantry import country_stats
+    from pantry import validation
+
+# Print at most this many rejected rows before only counting them
+MAX_REPORTED_ERRORS = 20
+
+
+class UnreadableRecord:
+    """Stands in for a line that could not be parsed, so it is rejected like an invalid row"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_records(path):
+    """Yield raw records from a CSV or JSON Lines file, one at a time"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as handle:
+        if extension == '.csv':
+            yield from csv.DictReader(handle)
+        elif extension in ('.jsonl', '.ndjson', '.json'):
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield UnreadableRecord(f"Not valid JSON ({e}).")
+        else:
+            raise ValueError(f"Unsupported import format '{extension}'. Use .csv or .jsonl")
+
+
+def parse_ingredients(value):
+    """Normalize the ingredients field of a record into a list of dicts"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        ingredients = []
+        for entry in value.split(';'):
+            if not entry.strip():
+                continue
+            parts = [part.strip() for part in entry.split(':')]
+            parts += [''] * (3 - len(parts))
+            ingredients.append({'name': parts[0], 'quantity': parts[1], 'unit': parts[2]})
+        return ingredients
+    return [
+        {
+            'name': str(item.get('name', '')).strip(),
+            'quantity': str(item.get('quantity', '')).strip(),
+            'unit': str(item.get('unit') or '').strip()
+        }
+        for item in value
+    ]
+
+
+def _text(record, key):
+    value = record.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def validate_record(record):
+    """Return (recipe, ingredients, error) for one raw record"""
+    if isinstance(record, UnreadableRecord):
+        return None, None, record.error
+    if not isinstance(record, dict):
+        return None, None, "Each record must be an object with name, country and instructions."
+    recipe = {
+        'name': _text(record, 'name'),
+        'country': _text(record, 'country'),
+        'instructions': _text(record, 'instructions'),
+        'prep_time': _text(record, 'prep_time'),
+        'cook_time': _text(record, 'cook_time'),
+        'family_notes': _text(record, 'family_notes'),
+    }
+    servings = _text(record, 'servings')
+    error = (
+        validation.validate_recipe_name(recipe['name'])
+        or validation.validate_country_name(recipe['country'])
+        or validation.validate_instructions(recipe['instructions'])
+        or validation.validate_duration(recipe['prep_time'], "Preparation time")
+        or validation.validate_duration(recipe['cook_time'], "Cooking time")
+        or validation.validate_servings(servings)
+    )
+    if error:
+        return None, None, error
+    recipe['servings'] = int(servings) if servings else None
+
+    try:
+        ingredients = parse_ingredients(record.get('ingredients'))
+    except (AttributeError, TypeError):
+        return None, None, "Ingredients must be a list or a 'name:quantity:unit; ...' string."
+    for ingredient in ingredients:
+        error = (
+            validation.validate_ingredient_name(ingredient['name'])
+            or validation.validate_quantity(ingredient['quantity'])
+        )
+        if error:
+            return None, None, f"{ingredient['name'] or 'Ingredient'}: {error}"
+    return recipe, ingredients, None
+
+
+class RecipeImporter:
+    """Streams recipe records into the database in checkpointed chunks"""
+
+    def __init__(self, chunk_size=None, checkpoint=None, resume=True, user_id=None, out=sys.stdout):
+        self.chunk_size = max(1, chunk_size or Config.IMPORT_CHUNK_SIZE)
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.user_id = user_id
+        self.out = out
+        self._country_ids = {}
+
+    def _log(self, message):
+        print(message, file=self.out)
+
+    def _load_checkpoint(self, source):
+        """Return the saved progress for this import, starting a fresh record if there is none to resume"""
+        rows = pantry_vault.execute_query(
+            "SELECT source, rows_done, imported, rejected FROM import_progress WHERE name = %s", (self.checkpoint,)
+        )
+        if rows and self.resume and rows[0]['source'] == source:
+            return {key: rows[0][key] for key in ('rows_done', 'imported', 'rejected')}
+        with pantry_vault.transaction():
+            pantry_vault.execute_update("DELETE FROM import_progress WHERE name = %s", (self.checkpoint,))
+            pantry_vault.execute_update(
+                "INSERT INTO import_progress (name, source) VALUES (%s, %s)", (self.checkpoint, source)
+            )
+        return None
+
+    def _save_checkpoint(self, state):
+        """Record progress; runs inside the chunk's transaction so both commit together"""
+        pantry_vault.execute_update(
+            "UPDATE import_progress SET rows_done = %s, imported = %s, rejected = %s WHERE name = %s",
+            (state['rows_done'], state['imported'], state['rejected'], self.checkpoint)
+        )
+
+    def _country_id(self, name):
+        """Resolve a country name to an ID, creating the country if needed"""
+        key = name.casefold()
+        if key not in self._country_ids:
+            country = CountryCRUD.get_country_by_name(name)
+            if not country:
+                CountryCRUD.add_country(name)
+                country = CountryCRUD.get_country_by_name(name)
+            if not country:
+                raise LookupError(f"Could not create country '{name}'")
+            self._country_ids[key] = country['id']
+        return self._country_ids[key]
+
+    def _write_chunk(self, rows):
+        """Insert one validated chunk; must run inside a transaction"""
+        ingredient_ids = IngredientCRUD.resolve_ingredient_ids(
+            [ing['name'] for _, ingredients in rows for ing in ingredients]
+        )
+        recipe_query = """
+            INSERT INTO recipes (name, country_id, instructions, prep_time, cook_time, servings, family_notes, user_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        links = []
+        # Country summary changes for the whole chunk: recipes added and ingredient IDs linked
+        recipes_by_country = {}
+        links_by_country = {}
+        for recipe, ingredients in rows:
+            country_id = self._country_id(recipe['country'])
+            recipe_id = pantry_vault.execute_insert(recipe_query, (
+                recipe['name'], country_id, recipe['instructions'],
+                recipe['prep_time'], recipe['cook_time'], recipe['servings'],
+                recipe['family_notes'], self.user_id
+            ))
+            SearchCRUD.index_recipe(
+                recipe_id, recipe['name'], recipe['instructions'], recipe['family_notes'],
+                [ing['name'] for ing in ingredients]
+            )
+            PantryMatchCRUD.index_recipe(
+                recipe_id, recipe['name'], {ingredient_ids[ing['name']]: ing['name'] for ing in ingredients}
+            )
+            links.extend(
+                (recipe_id, ingredient_ids[ing['name']], ing['quantity'], ing['unit'])
+                for ing in ingredients
+            )
+            recipes_by_country[country_id] = recipes_by_country.get(country_id, 0) + 1
+            links_by_country.setdefault(country_id, []).extend(ingredient_ids[ing['name']] for ing in ingredients)
+        pantry_vault.execute_many(
+            "INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit) VALUES (%s, %s, %s, %s)",
+            links
+        )
+        for country_id, added in recipes_by_country.items():
+            country_stats.count(pantry_vault, country_id, recipes=added)
+            country_stats.add_links(pantry_vault, country_id, links_by_country[country_id])
+
+    def run(self, path):
+        """Import every record in path and return a summary dict"""
+        source = os.path.abspath(path)
+        if self.checkpoint is None:
+            self.checkpoint = source
+
+        state = {'source': source, 'rows_done': 0, 'imported': 0, 'rejected': 0}
+        checkpoint = self._load_checkpoint(source)
+        if checkpoint:
+            state.update(checkpoint)
+            self._log(f"Resuming import after row {state['rows_done']} ({state['imported']} already imported).")
+
+        records = islice(iter_records(path), state['rows_done'], None)
+        row_number = state['rows_done']
+        started = time.perf_counter()
+        processed = 0
+        rejected = 0
+
+        with pantry_vault.transaction() as txn:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                valid = []
+                for record in chunk:
+                    row_number += 1
+                    recipe, ingredients, error = validate_record(record)
+                    if error:
+                        state['rejected'] += 1
+                        rejected += 1
+                        if rejected <= MAX_REPORTED_ERRORS:
+                            self._log(f"Row {row_number} skipped: {error}")
+                        continue
+                    valid.append((recipe, ingredients))
+
+                if valid:
+                    self._write_chunk(valid)
+                state['rows_done'] = row_number
+                state['imported'] += len(valid)
+                self._save_checkpoint(state)
+                txn.commit()
+
+                processed += len(chunk)
+                elapsed = time.perf_counter() - started
+                rate = processed / elapsed if elapsed else 0.0
+                self._log(f"{state['rows_done']:,} rows processed, {state['imported']:,} imported ({rate:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - started
+        if rejected > MAX_REPORTED_ERRORS:
+            self._log(f"... {rejected - MAX_REPORTED_ERRORS} more rejected rows not shown.")
+        pantry_vault.execute_update("DELETE FROM import_progress WHERE name = %s", (self.checkpoint,))
+
+        state['seconds'] = elapsed
+        state['rows_per_second'] = processed / elapsed if elapsed else 0.0
+        return state
@@ -0,0 +1,204 @@
+"""
+Query instrumentation for PantryVault.
+
+A hook is any callable taking (query, seconds, rows, error) that is
+registered with PantryVault.add_query_hook. It is called once per executed
+statement. QueryStats is the built-in hook:
+
+* it groups statements by a normalized SQL fingerprint, so the same
+  query with different parameters or IN-list lengths counts as one;
+* it keeps a latency histogram per fingerprint;
+* it counts statements and time per user action, such as a CLI menu entry;
+* it appends statements slower than a threshold to a JSON Lines log file.
+"""
+
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+
+from config import Config
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_RE = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalize a statement: literals and placeholders become ?, IN lists and
+    multi-row VALUES collapse to a single entry, whitespace is squeezed.
+    """
+    text = _STRING_RE.sub('?', query)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _SPACE_RE.sub(' ', text).strip()
+    text = _IN_LIST_RE.sub('IN (?+)', text)
+    text = _VALUES_RE.sub(r'\1, ...', text)
+    return text
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count, total and max"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def record(self, seconds, rows=0, error=False):
+        ms = seconds * 1000
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        if ms > self.max:
+            self.max = ms
+        if error:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        """Upper bound, in ms, of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for position, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKET_BOUNDS_MS[position] if position < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total * 1000 / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max,
+            'rows': self.rows,
+            'errors': self.errors,
+        }
+
+
+class QueryStats:
+    """Per-fingerprint and per-action statement statistics plus a slow-query log"""
+
+    def __init__(self, slow_ms=None, slow_log_path=None):
+        self.slow_ms = Config.SLOW_QUERY_MS if slow_ms is None else slow_ms
+        self.slow_log_path = Config.SLOW_QUERY_LOG if slow_log_path is None else slow_log_path
+        self._statements = {}
+        self._actions = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self.started = time.time()
+
+    def __call__(self, query, seconds, rows=0, error=None):
+        key = fingerprint(query)
+        action = getattr(self._local, 'action', None)
+        with self._lock:
+            histogram = self._statements.get(key)
+            if histogram is None:
+                histogram = self._statements[key] = LatencyHistogram()
+            histogram.record(seconds, rows, error is not None)
+        if action is not None:
+            action['statements'] += 1
+            action['seconds'] += seconds
+        if self.slow_log_path and seconds * 1000 >= self.slow_ms:
+            self._log_slow(key, query, seconds, rows, error, action)
+
+    def _log_slow(self, key, query, seconds, rows, error, action):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ms': round(seconds * 1000, 3),
+            'rows': rows,
+            'fingerprint': key,
+            'sql': _SPACE_RE.sub(' ', query).strip(),
+            'action': action['name'] if action else None,
+        }
+        if error is not None:
+            entry['error'] = str(error)
+        try:
+            with self._log_lock, open(self.slow_log_path, 'a', encoding='utf-8') as handle:
+                handle.write(json.dumps(entry) + "\n")
+        except OSError:
+            # A full disk or unwritable log must never break a query
+            pass
+
+    @contextmanager
+    def action(self, name):
+        """Attribute the statements run by this thread inside the block to name"""
+        previous = getattr(self._local, 'action', None)
+        current = self._local.action = {'name': name, 'statements': 0, 'seconds': 0.0}
+        try:
+            yield current
+        finally:
+            self._local.action = previous
+            with self._lock:
+                totals = self._actions.setdefault(name, {'runs': 0, 'statements': 0, 'seconds': 0.0, 'max_statements': 0})
+                totals['runs'] += 1
+                totals['statements'] += current['statements']
+                totals['seconds'] += current['seconds']
+                totals['max_statements'] = max(totals['max_statements'], current['statements'])
+            if previous is not None:
+                previous['statements'] += current['statements']
+                previous['seconds'] += current['seconds']
+
+    def top_statements(self, limit=10, order_by='total_ms'):
+        """Return the busiest fingerprints as summary dicts, largest first"""
+        with self._lock:
+            summaries = [dict(histogram.summary(), fingerprint=key) for key, histogram in self._statements.items()]
+        summaries.sort(key=lambda summary: summary[order_by], reverse=True)
+        return summaries[:limit]
+
+    def actions(self):
+        """Return per-action totals, the slowest action first"""
+        with self._lock:
+            rows = [dict(totals, name=name) for name, totals in self._actions.items()]
+        for row in rows:
+            row['statements_per_run'] = row['statements'] / row['runs'] if row['runs'] else 0.0
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._actions.clear()
+            self.started = time.time()
+
+
+def summarize_slow_log(path, limit=10):
+    """Aggregate a slow-query log by fingerprint, the largest total time first"""
+    totals = {}
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            row = totals.setdefault(entry['fingerprint'], {'fingerprint': entry['fingerprint'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            row['count'] += 1
+            row['total_ms'] += entry['ms']
+            row['max_ms'] = max(row['max_ms'], entry['ms'])
+    rows = sorted(totals.values(), key=lambda row: row['total_ms'], reverse=True)
+    return rows[:limit]
+
+
+# Shared statistics hook installed on pantry_vault
+query_stats = QueryStats()
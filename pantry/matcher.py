@@ -0,0 +1,165 @@
+"""
+In-process "what can I cook?" matching over recipe ingredients.
+
+Every ingredient ID gets a bit position, and every recipe is stored as an
+integer bitset of its ingredients. For a pantry bitset P, the ingredients a
+recipe R still needs are R & ~P, so counting them is a single popcount. A
+per-ingredient recipe list limits that work to recipes that use at least one
+pantry ingredient.
+"""
+
+import heapq
+import threading
+
+
+def _bits(mask):
+    """Yield the positions of the set bits in mask"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _count(mask):
+    """Number of set bits in mask (int.bit_count() needs Python 3.10)"""
+    return bin(mask).count('1')
+
+
+class PantryMatcher:
+    """
+    Thread-safe recipe -> ingredient bitset store.
+
+    Recipes are keyed by ID and keep their name so results can be shown
+    without a database round trip.
+    """
+
+    def __init__(self):
+        self._bit_of = {}
+        self._ingredient_of = []
+        self._names = {}
+        self._ids_by_name = {}
+        self._recipes = {}
+        self._recipes_using = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._recipes)
+
+    def _bit(self, ingredient_id):
+        bit = self._bit_of.get(ingredient_id)
+        if bit is None:
+            bit = self._bit_of[ingredient_id] = len(self._ingredient_of)
+            self._ingredient_of.append(ingredient_id)
+            self._recipes_using.append(set())
+        return bit
+
+    def _mask(self, ingredient_ids, create=False):
+        mask = 0
+        for ingredient_id in ingredient_ids:
+            bit = self._bit(ingredient_id) if create else self._bit_of.get(ingredient_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def set_ingredient_names(self, names):
+        """Record display names for ingredient IDs ({id: name})"""
+        with self._lock:
+            for ingredient_id, name in names.items():
+                self._names[ingredient_id] = name
+                self._ids_by_name.setdefault(name.casefold(), set()).add(ingredient_id)
+
+    def ingredient_ids(self, names):
+        """
+        Resolve ingredient names case-insensitively, without touching the
+        database. Returns (ids, unknown_names); names used by no recipe are
+        unknown.
+        """
+        ids = set()
+        unknown = []
+        with self._lock:
+            for name in names:
+                matched = self._ids_by_name.get(name.strip().casefold())
+                if matched:
+                    ids.update(matched)
+                else:
+                    unknown.append(name)
+        return ids, unknown
+
+    def add_recipe(self, recipe_id, name, ingredient_ids):
+        """Store (or replace) a recipe's ingredient set"""
+        with self._lock:
+            self.remove(recipe_id)
+            mask = self._mask(ingredient_ids, create=True)
+            self._recipes[recipe_id] = (mask, name)
+            for bit in _bits(mask):
+                self._recipes_using[bit].add(recipe_id)
+
+    def add_ingredients(self, recipe_id, ingredient_ids):
+        """Add ingredients to a stored recipe"""
+        with self._lock:
+            stored = self._recipes.get(recipe_id)
+            if stored is None:
+                return
+            mask, name = stored
+            extra = self._mask(ingredient_ids, create=True) & ~mask
+            self._recipes[recipe_id] = (mask | extra, name)
+            for bit in _bits(extra):
+                self._recipes_using[bit].add(recipe_id)
+
+    def remove(self, recipe_id):
+        """Forget a recipe"""
+        with self._lock:
+            stored = self._recipes.pop(recipe_id, None)
+            if stored is not None:
+                for bit in _bits(stored[0]):
+                    self._recipes_using[bit].discard(recipe_id)
+
+    def clear(self):
+        with self._lock:
+            self._bit_of.clear()
+            self._ingredient_of.clear()
+            self._names.clear()
+            self._ids_by_name.clear()
+            self._recipes.clear()
+            self._recipes_using.clear()
+
+    def match(self, ingredient_ids, max_missing=None, limit=None):
+        """
+        Rank recipes by how well the given ingredients cover them.
+
+        Returns (recipe_id, name, have, total, missing_ingredient_ids)
+        tuples ordered by fewest missing ingredients, then most ingredients
+        used, then name. Recipes sharing no ingredient with the pantry are
+        never returned.
+        """
+        with self._lock:
+            pantry = self._mask(ingredient_ids)
+            candidates = set()
+            for bit in _bits(pantry):
+                candidates |= self._recipes_using[bit]
+
+            ranked = []
+            for recipe_id in candidates:
+                mask, name = self._recipes[recipe_id]
+                missing = _count(mask & ~pantry)
+                if max_missing is not None and missing > max_missing:
+                    continue
+                ranked.append((missing, -_count(mask & pantry), name or '', recipe_id, mask))
+
+            ranked = heapq.nsmallest(limit, ranked) if limit else sorted(ranked)
+            return [
+                (recipe_id, name, -negative_have, missing + -negative_have,
+                 [self._ingredient_of[bit] for bit in _bits(mask & ~pantry)])
+                for missing, negative_have, name, recipe_id, mask in ranked
+            ]
+
+    def ingredient_name(self, ingredient_id):
+        return self._names.get(ingredient_id, str(ingredient_id))
+
+    def stats(self):
+        with self._lock:
+            return {'recipes': len(self._recipes), 'ingredients': len(self._ingredient_of)}
+
+
+# Shared matcher used by PantryMatchCRUD
+pantry_matcher = PantryMatcher()
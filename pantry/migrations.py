@@ -0,0 +1,290 @@
+"""
+Versioned schema migrations.
+
+Each migration has a version number, a description and a function that
+applies it to a PantryVault. Applied versions are recorded in the
+schema_migrations table, so every migration runs once per database and new
+ones are appended to MIGRATIONS. Statements are written in MySQL syntax; the
+SQLite backend translates them.
+
+Every step is idempotent (CREATE TABLE IF NOT EXISTS, ensure_index), so a
+migration interrupted part way on MySQL, where DDL commits implicitly, is
+simply re-run. Tables that predate the migrations keep their existing
+definitions, and only the missing indexes are added to them.
+
+After a successful start the application writes a small schema marker file
+naming the database and the latest migration version. While the marker
+still matches, later starts skip the migration and table checks entirely.
+"""
+
+import json
+import os
+
+try:
+    import country_stats
+except ImportError:
+    from pantry import country_stats
+
+VERSION_TABLE = 'schema_migrations'
+
+TABLES = ('countries', 'users', 'foods', 'ingredients', 'recipes', 'food_ingredients', 'recipe_ingredients',
+          'country_stats', 'country_ingredients', 'import_progress')
+
+
+def _create_base_schema(vault):
+    """Every table the CRUD layer reads or writes, with foreign keys"""
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS countries (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_name VARCHAR(100) NOT NULL UNIQUE,
+            email VARCHAR(255),
+            password VARCHAR(255) NOT NULL,
+            country_id INT NULL,
+            FOREIGN KEY (country_id) REFERENCES countries (id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS foods (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            country_id INT NULL,
+            description TEXT,
+            FOREIGN KEY (country_id) REFERENCES countries (id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ingredients (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS recipes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            country_id INT NULL,
+            instructions TEXT,
+            prep_time VARCHAR(50),
+            cook_time VARCHAR(50),
+            servings INT NULL,
+            family_notes TEXT,
+            user_id INT NULL,
+            FOREIGN KEY (country_id) REFERENCES countries (id) ON DELETE SET NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS food_ingredients (
+            food_id INT NOT NULL,
+            ingredient_id INT NOT NULL,
+            quantity VARCHAR(50),
+            unit VARCHAR(50),
+            FOREIGN KEY (food_id) REFERENCES foods (id) ON DELETE CASCADE,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INT NOT NULL,
+            ingredient_id INT NOT NULL,
+            quantity VARCHAR(50),
+            unit VARCHAR(50),
+            FOREIGN KEY (recipe_id) REFERENCES recipes (id) ON DELETE CASCADE,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients (id)
+        )
+        """,
+    ]
+    for statement in statements:
+        vault.execute_ddl(statement)
+
+
+# (table, index name, columns, the CRUD queries that rely on it)
+INDEXES = [
+    ('foods', 'idx_foods_country_id', ('country_id',),
+     "FoodCRUD.get_foods_by_country filters on country_id"),
+    ('foods', 'idx_foods_name_id', ('name', 'id'),
+     "FoodCRUD.get_all_foods keyset pages walk (name, id)"),
+    ('recipes', 'idx_recipes_country_id', ('country_id',),
+     "recipe joins and country lookups filter on country_id"),
+    ('recipes', 'idx_recipes_user_id', ('user_id',),
+     "RecipeCRUD.get_recipes_by_user and delete_recipes filter on user_id"),
+    ('recipes', 'idx_recipes_name_id', ('name', 'id'),
+     "RecipeCRUD.get_all_recipes keyset pages walk (name, id)"),
+    ('ingredients', 'idx_ingredients_name_id', ('name', 'id'),
+     "IngredientCRUD name lookups and keyset pages walk (name, id)"),
+    ('recipe_ingredients', 'idx_recipe_ingredients_recipe_id', ('recipe_id', 'ingredient_id'),
+     "RecipeCRUD.get_recipe_details_many joins on recipe_id"),
+    ('recipe_ingredients', 'idx_recipe_ingredients_ingredient_id', ('ingredient_id',),
+     "ingredient joins and foreign key checks on ingredient_id"),
+    ('food_ingredients', 'idx_food_ingredients_food_id', ('food_id', 'ingredient_id'),
+     "FoodCRUD.get_foods_with_ingredients_many joins on food_id"),
+    ('food_ingredients', 'idx_food_ingredients_ingredient_id', ('ingredient_id',),
+     "ingredient joins and foreign key checks on ingredient_id"),
+    ('users', 'idx_users_user_name', ('user_name',),
+     "PantryVault.find_user looks users up by user_name"),
+]
+
+
+def _create_indexes(vault):
+    """Indexes for every join, filter and keyset page the CRUD layer runs"""
+    for table, index, columns, _ in INDEXES:
+        vault.ensure_index(table, index, ", ".join(columns))
+
+
+def _create_country_stats(vault):
+    """Per-country summary counts, see country_stats.py, filled from the existing catalog"""
+    vault.execute_ddl("""
+        CREATE TABLE IF NOT EXISTS country_stats (
+            country_id INT PRIMARY KEY,
+            foods INT NOT NULL DEFAULT 0,
+            recipes INT NOT NULL DEFAULT 0,
+            ingredients INT NOT NULL DEFAULT 0,
+            FOREIGN KEY (country_id) REFERENCES countries (id) ON DELETE CASCADE
+        )
+    """)
+    vault.execute_ddl("""
+        CREATE TABLE IF NOT EXISTS country_ingredients (
+            country_id INT NOT NULL,
+            ingredient_id INT NOT NULL,
+            uses INT NOT NULL,
+            PRIMARY KEY (country_id, ingredient_id),
+            FOREIGN KEY (country_id) REFERENCES countries (id) ON DELETE CASCADE,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients (id) ON DELETE CASCADE
+        )
+    """)
+    country_stats.rebuild(vault)
+
+
+def _create_import_progress(vault):
+    """Import checkpoints, committed in the same transaction as the rows they count"""
+    vault.execute_ddl("""
+        CREATE TABLE IF NOT EXISTS import_progress (
+            name VARCHAR(512) PRIMARY KEY,
+            source TEXT NOT NULL,
+            rows_done INT NOT NULL DEFAULT 0,
+            imported INT NOT NULL DEFAULT 0,
+            rejected INT NOT NULL DEFAULT 0
+        )
+    """)
+
+
+# (version, description, apply function); append new migrations at the end
+MIGRATIONS = [
+    (1, "Create the base schema with foreign keys", _create_base_schema),
+    (2, "Add the indexes the CRUD queries need", _create_indexes),
+    (3, "Add per-country summary counts", _create_country_stats),
+    (4, "Record import progress in the database", _create_import_progress),
+]
+
+
+LATEST_VERSION = max(version for version, _, _ in MIGRATIONS)
+
+
+def _ensure_version_table(vault):
+    vault.execute_ddl(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(vault):
+    """Return the set of migration versions already applied"""
+    if not vault.table_exists(VERSION_TABLE):
+        return set()
+    rows = vault.execute_query(f"SELECT version FROM {VERSION_TABLE}")
+    return {row['version'] for row in rows}
+
+
+def current_version(vault):
+    """Return the highest applied migration version, or 0"""
+    return max(applied_versions(vault), default=0)
+
+
+def pending_migrations(vault):
+    """Return the (version, description) of every migration not yet applied"""
+    applied = applied_versions(vault)
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+
+def migrate(vault, target=None, progress=None):
+    """
+    Apply every pending migration up to target (default: all) in order and
+    return the list of versions applied.
+    """
+    _ensure_version_table(vault)
+    applied = applied_versions(vault)
+    done = []
+    for version, description, apply in MIGRATIONS:
+        if version in applied or (target is not None and version > target):
+            continue
+        if progress:
+            progress(f"Applying migration {version}: {description}")
+        with vault.transaction():
+            apply(vault)
+            vault.execute_update(
+                f"INSERT INTO {VERSION_TABLE} (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+        done.append(version)
+    return done
+
+
+def check_indexes(vault):
+    """
+    Compare the indexes the CRUD queries need with the ones the database
+    has. Returns a list of (table, index, columns, reason) for each missing
+    one; a missing table is reported once per index it should carry.
+    """
+    missing = []
+    for table, index, columns, reason in INDEXES:
+        if not vault.table_exists(table):
+            missing.append((table, index, columns, f"table '{table}' does not exist; {reason}"))
+            continue
+        wanted = [column.lower() for column in columns]
+        existing = vault.index_columns(table).values()
+        if not any([column.lower() for column in indexed[:len(wanted)]] == wanted for indexed in existing):
+            missing.append((table, index, columns, reason))
+    return missing
+
+
+def _marker_identity(vault):
+    identity = getattr(vault.backend, 'identity', None)
+    return identity() if identity else None
+
+
+def schema_marker_matches(vault, path):
+    """
+    Return True if the marker at path was written for this database at the
+    latest migration version. In-memory databases never match.
+    """
+    identity = _marker_identity(vault)
+    if not path or identity is None:
+        return False
+    try:
+        with open(path, encoding='utf-8') as handle:
+            marker = json.load(handle)
+    except (OSError, ValueError):
+        return False
+    return marker.get('database') == identity and marker.get('version') == LATEST_VERSION
+
+
+def write_schema_marker(vault, path):
+    """Record that this database is at the latest migration version"""
+    identity = _marker_identity(vault)
+    if not path or identity is None:
+        return
+    try:
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump({'database': identity, 'version': LATEST_VERSION}, handle)
+    except OSError as e:
+        print(f"Could not write schema marker {path}: {e}")
@@ -0,0 +1,222 @@
+"""
+Grid table rendering for the CLI listings.
+
+grid_lines() produces the same layout as tabulate's "grid" format without
+its repeated per-column passes: cells are formatted to text once, column
+widths and alignment are worked out in that single pass, and lines are
+yielded one at a time. Given fixed widths it skips the sizing pass and
+streams each row as it arrives, so an unbounded iterator never has to be
+held in memory.
+
+render_table() memoizes whole tables in render_cache, keyed on a digest
+of the displayed rows and the data_versions of the tables they came from,
+so paging back and forth over an unchanged catalog does no rendering work,
+and rows edited by another process are re-rendered as soon as they are
+read again.
+"""
+
+import hashlib
+import sys
+import unicodedata
+
+from config import Config
+
+try:
+    from cache import TTLCache, data_versions
+except ImportError:
+    from pantry.cache import TTLCache, data_versions
+
+# Same minimum padding around a header as tabulate
+_HEADER_PADDING = 2
+
+
+def _parse_number(value):
+    """Return value as an int or float if it is (or spells) a number, else None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    return None
+
+
+def _cell_text(value, number):
+    if value is None:
+        return ''
+    if number is not None:
+        return format(number, 'g') if isinstance(number, float) else str(number)
+    return str(value).strip()
+
+
+def _format_rows(rows, columns):
+    """
+    Format every cell once. Returns (cells, numeric) where numeric[i] says
+    whether column i has numbers and every other value in it is empty.
+    """
+    parsed = []
+    numeric = [None] * columns
+    for row in rows:
+        values = []
+        for index, value in enumerate(row):
+            number = _parse_number(value)
+            if number is not None:
+                if numeric[index] is None:
+                    numeric[index] = True
+            elif value not in (None, ''):
+                numeric[index] = False
+            values.append((value, number))
+        parsed.append(values)
+    numeric = [bool(flag) for flag in numeric]
+    # Numbers in a text column are shown as written
+    cells = [
+        [_cell_text(value, number if numeric[index] else None) for index, (value, number) in enumerate(values)]
+        for values in parsed
+    ]
+    return cells, numeric
+
+
+def _decimal_align(column_cells):
+    """Pad numbers on the right so their decimal points line up"""
+    fractions = [len(text) - text.index('.') if '.' in text else 0 for text in column_cells]
+    widest = max(fractions, default=0)
+    return [text + ' ' * (widest - fraction) if text else text
+            for text, fraction in zip(column_cells, fractions)]
+
+
+def _char_width(char):
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def _width(text):
+    """Columns text takes up on a terminal: wide CJK characters count twice"""
+    if text.isascii():
+        return len(text)
+    return sum(_char_width(char) for char in text)
+
+
+def _clip(text, width):
+    """Cut text to at most width terminal columns"""
+    if _width(text) <= width:
+        return text
+    used = 0
+    for index, char in enumerate(text):
+        used += _char_width(char)
+        if used > width:
+            return text[:index]
+    return text
+
+
+def _clip_lines(text, width):
+    return '\n'.join(_clip(line, width) for line in text.split('\n'))
+
+
+def _cell_width(text):
+    return max(_width(line) for line in text.split('\n'))
+
+
+def _border(widths, fill):
+    return '+' + '+'.join(fill * (width + 2) for width in widths) + '+'
+
+
+def _line(texts, widths, numeric):
+    """Lines for one row; a cell with newlines spreads over several lines"""
+    cells = [text.split('\n') for text in texts]
+    height = max((len(lines) for lines in cells), default=1)
+    for number in range(height):
+        padded = []
+        for lines, width, is_number in zip(cells, widths, numeric):
+            text = lines[number] if number < len(lines) else ''
+            fill = ' ' * (width - _width(text))
+            padded.append(fill + text if is_number else text + fill)
+        yield '| ' + ' | '.join(padded) + ' |'
+
+
+def grid_lines(headers, rows, widths=None):
+    """
+    Yield the lines of a grid table for headers and an iterable of row
+    sequences.
+
+    Without widths the rows are read once to size and align the columns.
+    With widths (one per column) nothing is buffered: alignment is taken
+    from the first row, each row is yielded as soon as it is read, and
+    longer cells are cut to fit.
+    """
+    headers = [str(header) for header in headers]
+    columns = len(headers)
+
+    if widths is None:
+        cells, numeric = _format_rows(list(rows), columns)
+        for index in range(columns):
+            if numeric[index]:
+                aligned = _decimal_align([texts[index] for texts in cells])
+                for texts, text in zip(cells, aligned):
+                    texts[index] = text
+        widths = [
+            max([_cell_width(header) + _HEADER_PADDING] + [_cell_width(texts[index]) for texts in cells])
+            for index, header in enumerate(headers)
+        ]
+        yield _border(widths, '-')
+        yield from _line(headers, widths, numeric)
+        yield _border(widths, '=')
+        separator = _border(widths, '-')
+        for texts in cells:
+            yield from _line(texts, widths, numeric)
+            yield separator
+        if not cells:
+            yield separator
+        return
+
+    widths = list(widths)
+    separator = _border(widths, '-')
+    numeric = None
+    for row in rows:
+        if numeric is None:
+            numeric = [_parse_number(value) is not None for value in row]
+            yield separator
+            yield from _line([_clip_lines(header, width) for header, width in zip(headers, widths)],
+                             widths, numeric)
+            yield _border(widths, '=')
+        texts = [_clip_lines(_cell_text(value, _parse_number(value) if is_number else None), width)
+                 for value, width, is_number in zip(row, widths, numeric)]
+        yield from _line(texts, widths, numeric)
+        yield separator
+
+
+def write_grid(headers, rows, out=None, widths=None):
+    """Write a grid table line by line as the rows are read"""
+    out = out or sys.stdout
+    for line in grid_lines(headers, rows, widths):
+        out.write(line + "\n")
+
+
+def render_grid(headers, rows):
+    """Return a grid table as one string"""
+    return "\n".join(grid_lines(headers, rows))
+
+
+# Rendered tables, keyed on their rows and the data versions they depend on
+render_cache = TTLCache(max_entries=Config.RENDER_CACHE_ENTRIES, ttl=Config.CACHE_TTL)
+
+
+def render_table(kind, tables, records, headers, to_row):
+    """
+    Return the grid for records, re-rendering only when the rows shown or a
+    table in tables has changed since the last call. kind names the listing
+    and to_row turns one record into its row. The rows themselves are part
+    of the key, since data_versions only sees writes made by this process.
+    """
+    rows = [to_row(record) for record in records]
+    digest = hashlib.sha256(repr(rows).encode('utf-8')).hexdigest()
+    key = (kind, data_versions.version(*tables), digest)
+    return render_cache.get_or_load(key, lambda: render_grid(headers, rows))
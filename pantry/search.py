@@ -0,0 +1,206 @@
+"""
+In-process inverted index for full-text recipe and food search.
+
+Text is lower-cased and split into word tokens. Each token maps to the set
+of documents containing it, and a sorted token list answers prefix queries
+with a binary search. Lookups never touch the database.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Very common words that would bloat postings without helping ranking
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into',
+    'is', 'it', 'of', 'on', 'or', 'the', 'then', 'to', 'until', 'with',
+})
+
+
+def tokenize(text):
+    """Split text into lower-case search tokens"""
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(str(text).casefold()) if token not in STOPWORDS]
+
+
+class InvertedIndex:
+    """
+    Thread-safe token -> document index with exact and prefix matching.
+
+    Documents are identified by hashable keys such as ('recipe', 42). Each
+    document has a title, which ranks higher than body text, and any number
+    of body texts.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._title_postings = {}
+        self._tokens = []
+        self._documents = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _link(self, key, tokens):
+        for token in tokens:
+            documents = self._postings.get(token)
+            if documents is None:
+                documents = self._postings[token] = set()
+                insort(self._tokens, token)
+            documents.add(key)
+
+    def _unlink(self, key, tokens):
+        for token in tokens:
+            documents = self._postings.get(token)
+            if documents is None:
+                continue
+            documents.discard(key)
+            if not documents:
+                del self._postings[token]
+                position = bisect_left(self._tokens, token)
+                if position < len(self._tokens) and self._tokens[position] == token:
+                    del self._tokens[position]
+
+    def _link_title(self, key, tokens):
+        for token in tokens:
+            self._title_postings.setdefault(token, set()).add(key)
+
+    def _unlink_title(self, key, tokens):
+        for token in tokens:
+            documents = self._title_postings.get(token)
+            if documents is not None:
+                documents.discard(key)
+                if not documents:
+                    del self._title_postings[token]
+
+    def add(self, key, title, *texts):
+        """Index (or re-index) a document"""
+        title_tokens = frozenset(tokenize(title))
+        tokens = set(title_tokens)
+        for text in texts:
+            tokens.update(tokenize(text))
+        with self._lock:
+            previous = self._documents.get(key)
+            if previous is not None:
+                self._unlink(key, previous[2] - tokens)
+                self._unlink_title(key, previous[1])
+            self._documents[key] = (title, title_tokens, frozenset(tokens))
+            self._link(key, tokens)
+            self._link_title(key, title_tokens)
+
+    def extend(self, key, *texts):
+        """Add more body text to an indexed document"""
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                return
+            title, title_tokens, tokens = document
+            extra = set()
+            for text in texts:
+                extra.update(tokenize(text))
+            extra -= tokens
+            if extra:
+                self._documents[key] = (title, title_tokens, tokens | extra)
+                self._link(key, extra)
+
+    def remove(self, key):
+        """Drop a document from the index"""
+        with self._lock:
+            document = self._documents.pop(key, None)
+            if document is not None:
+                self._unlink(key, document[2])
+                self._unlink_title(key, document[1])
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._title_postings.clear()
+            self._tokens.clear()
+            self._documents.clear()
+
+    def _expand(self, term, prefix):
+        """Return the tokens a query term matches"""
+        if not prefix:
+            return [term] if term in self._postings else []
+        start = bisect_left(self._tokens, term)
+        matches = []
+        for position in range(start, len(self._tokens)):
+            token = self._tokens[position]
+            if not token.startswith(term):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query, limit=20, prefix=True, kinds=None):
+        """
+        Return up to ``limit`` (key, title, score) tuples matching every
+        query term, best first. With ``prefix`` each term also matches
+        longer tokens ("tom" finds "tomato"); exact and title matches score
+        higher.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            expansions = []
+            for term in terms:
+                tokens = self._expand(term, prefix)
+                if not tokens:
+                    return []
+                expansions.append((term, tokens))
+
+            # Intersect starting from the rarest term to keep sets small
+            candidates = None
+            for term, tokens in sorted(expansions, key=lambda item: sum(len(self._postings[t]) for t in item[1])):
+                matched = set()
+                for token in tokens:
+                    postings = self._postings[token]
+                    # Once candidates exist, only intersect; never copy a large posting list
+                    matched |= postings if candidates is None else candidates & postings
+                candidates = matched
+                if not candidates:
+                    return []
+
+            if kinds:
+                candidates = {key for key in candidates if key[0] in kinds}
+
+            # Score with set operations rather than per-document token scans:
+            # every match counts 1, an exact word match 1 more, a title match 3
+            scores = Counter()
+            for term, tokens in expansions:
+                exact = self._postings.get(term)
+                if exact:
+                    scores.update(candidates & exact)
+                in_title = set()
+                for token in tokens:
+                    titled = self._title_postings.get(token)
+                    if titled:
+                        in_title |= candidates & titled
+                scores.update(dict.fromkeys(in_title, 3))
+            base = len(expansions)
+            documents = self._documents
+            results = [(key, documents[key][0], base + scores[key]) for key in candidates]
+
+        # Partial sort: only the top ``limit`` results are ordered
+        return heapq.nsmallest(
+            limit, results,
+            key=lambda result: (-result[2], result[1].casefold() if result[1] else '', result[0])
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'tokens': len(self._postings),
+                'postings': sum(len(documents) for documents in self._postings.values()),
+            }
+
+
+# Shared index used by SearchCRUD
+search_index = InvertedIndex()
@@ -0,0 +1,570 @@
+"""
+HTTP/JSON server over the CRUD layer, for many cooks sharing one vault.
+
+    python3 main.py serve --port 8080 --workers 8
+
+Connections are handled by a fixed pool of worker threads. Every statement
+goes through the shared PantryVault connection pool, so a request that
+cannot get a connection within DB_POOL_TIMEOUT gets a 503.
+
+Nothing about the caller is global. POST /sessions trades a user name and
+password for a token, and each request carries it as
+``Authorization: Bearer <token>``. The token is resolved to the user's
+Session for that request only and passed to the CRUD calls it makes, so any
+number of users can be logged in at once. Requests that need a login run on
+one connection leased for the whole request. Logins are throttled per user
+name and per client address (see auth.py); a throttled one gets a 429 with
+Retry-After.
+
+Routes (JSON in, JSON out)::
+
+    GET    /health                       pool and session counters
+    POST   /sessions                     {"username", "password"} -> {"token", "user"}
+    DELETE /sessions                     log out
+    POST   /users                        register {"username", "email", "password", "country"}
+    GET    /countries                    POST /countries {"name"}
+    GET    /foods                        ?country=NAME or keyset ?after_name=&after_id=&limit=
+    GET    /foods/<id>                   POST /foods {"name", "country", "description"}
+    GET    /recipes                      ?country=NAME, ?user_id=N, ?mine=1 or keyset paging
+    GET    /recipes/<id>                 DELETE /recipes/<id> (owner only)
+    POST   /recipes                      same fields as a JSON Lines import record
+    POST   /recipes/<id>/ingredients     {"name", "quantity", "unit"} (owner only)
+    GET    /ingredients                  POST /ingredients {"name"}
+    GET    /search?q=...&kind=&limit=    GET /cook?have=rice,tomato&max_missing=&limit=
+
+Writes need a session; reads do not.
+"""
+
+import json
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from config import Config
+
+try:
+    from db import pantry_vault, PoolTimeout
+    from auth import authenticator, LoginThrottled
+    from crud import UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
+    from importer import validate_record
+    from instrumentation import query_stats
+    import validation
+except ImportError:
+    from pantry.db import pantry_vault, PoolTimeout
+    from pantry.auth import authenticator, LoginThrottled
+    from pantry.crud import UserCRUD, CountryCRUD, FoodCRUD, RecipeCRUD, IngredientCRUD, SearchCRUD, PantryMatchCRUD
+    from pantry.importer import validate_record
+    from pantry.instrumentation import query_stats
+    from pantry import validation
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 1 << 20
+# Largest page a listing returns
+MAX_PAGE_SIZE = 500
+# User fields that are safe to return
+PUBLIC_USER_FIELDS = ('id', 'user_name', 'email', 'country_id')
+
+
+class HTTPError(Exception):
+    """Ends a request with status and a JSON {"error": message} body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SessionStore:
+    """Login tokens mapped to their Session, dropped after ttl seconds without use"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else Config.SESSION_TTL
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, session):
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._sessions[token] = (time.monotonic() + self.ttl, session)
+        return token
+
+    def get(self, token):
+        """Return the Session for token and extend its lifetime, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            expires_at, session = entry
+            if expires_at <= now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (now + self.ttl, session)
+            return session
+
+    def delete(self, token):
+        with self._lock:
+            entry = self._sessions.pop(token, None)
+        if entry is None:
+            return False
+        UserCRUD.logout_user(entry[1])
+        return True
+
+    def purge(self):
+        """Drop expired sessions"""
+        now = time.monotonic()
+        with self._lock:
+            for token in [token for token, (expires_at, _) in self._sessions.items() if expires_at <= now]:
+                del self._sessions[token]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class Request:
+    """One parsed request: query string, JSON body, the caller's session and address"""
+
+    def __init__(self, server, method, path, query, body, token, session, source=None):
+        self.server = server
+        self.method = method
+        self.path = path
+        self.query = query
+        self.body = body
+        self.token = token
+        self.session = session
+        self.source = source
+
+    def arg(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def int_arg(self, name, default=None):
+        value = self.arg(name)
+        if value is None or value == '':
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise HTTPError(400, f"'{name}' must be an integer")
+
+    def field(self, name, required=True):
+        """A stripped string field from the JSON body"""
+        value = self.body.get(name)
+        value = '' if value is None else str(value).strip()
+        if required and not value:
+            raise HTTPError(400, f"'{name}' is required")
+        return value
+
+
+_ROUTES = []
+
+
+def route(method, pattern, login=False):
+    """Register a handler for method and a path pattern with {name} integer segments"""
+    regex = re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>\\d+)', pattern) + '$')
+
+    def register(handler):
+        _ROUTES.append((method, regex, handler, login, f"{method} {pattern}"))
+        return handler
+    return register
+
+
+def _public_user(user):
+    return {field: user.get(field) for field in PUBLIC_USER_FIELDS}
+
+
+def _country_id(request, required=True):
+    """Resolve the body's country (a name) or country_id to an ID"""
+    if request.body.get('country_id') is not None:
+        try:
+            return int(request.body['country_id'])
+        except (TypeError, ValueError):
+            raise HTTPError(400, "'country_id' must be an integer")
+    name = request.field('country', required)
+    if not name:
+        return None
+    country = CountryCRUD.get_country_by_name(name)
+    if not country:
+        raise HTTPError(400, f"Unknown country: {name}")
+    return country['id']
+
+
+def _page(request, fetch):
+    """One keyset page of a listing plus the cursor for the next one"""
+    limit = max(1, min(request.int_arg('limit', Config.PAGE_SIZE), MAX_PAGE_SIZE))
+    after_name = request.arg('after_name')
+    rows = fetch(after_name=after_name, after_id=request.int_arg('after_id', 0) if after_name is not None else None,
+                 limit=limit + 1)
+    following = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        following = {'after_name': rows[-1]['name'], 'after_id': rows[-1]['id']}
+    return {'items': rows, 'next': following}
+
+
+@route('GET', '/health')
+def health(request):
+    return {'status': 'ok', 'pool': pantry_vault.pool_stats(), 'sessions': len(request.server.sessions),
+            'auth': authenticator.stats()}
+
+
+@route('POST', '/sessions')
+def login(request):
+    session = UserCRUD.authenticate_user(request.field('username'), request.field('password'), request.source)
+    if not session:
+        raise HTTPError(401, "Invalid username or password")
+    # Only the public fields stay in memory for the life of the token
+    session.user = _public_user(session.user)
+    return 201, {'token': request.server.sessions.create(session), 'user': session.user}
+
+
+@route('DELETE', '/sessions', login=True)
+def logout(request):
+    request.server.sessions.delete(request.token)
+    return 204, None
+
+
+@route('POST', '/users')
+def register(request):
+    username = request.field('username')
+    email = request.field('email')
+    password = request.field('password')
+    if len(username) < 3:
+        raise HTTPError(400, "Username must be at least 3 characters long.")
+    if "@" not in email or "." not in email:
+        raise HTTPError(400, "Please enter a valid email address.")
+    if len(password) < 6:
+        raise HTTPError(400, "Password must be at least 6 characters long.")
+    success, message = UserCRUD.register_new_user(username, email, password, _country_id(request, required=False))
+    if not success:
+        raise HTTPError(409, message)
+    return 201, {'message': message}
+
+
+@route('GET', '/countries')
+def list_countries(request):
+    return {'items': CountryCRUD.get_all_countries()}
+
+
+@route('POST', '/countries', login=True)
+def add_country(request):
+    name = request.field('name')
+    error = validation.validate_country_name(name)
+    if error:
+        raise HTTPError(400, error)
+    if CountryCRUD.get_country_by_name(name):
+        raise HTTPError(409, f"Country '{name}' already exists")
+    if not CountryCRUD.add_country(name):
+        raise HTTPError(500, "Failed to add country")
+    return 201, CountryCRUD.get_country_by_name(name)
+
+
+@route('GET', '/foods')
+def list_foods(request):
+    country = request.arg('country')
+    if country:
+        found = CountryCRUD.get_country_by_name(country)
+        if not found:
+            raise HTTPError(404, f"Unknown country: {country}")
+        return {'items': FoodCRUD.get_foods_by_country(found['id']), 'next': None}
+    return _page(request, FoodCRUD.get_all_foods)
+
+
+@route('GET', '/foods/{food_id}')
+def show_food(request, food_id):
+    food = FoodCRUD.get_food_with_ingredients(food_id)
+    if not food:
+        raise HTTPError(404, "Food not found")
+    return food
+
+
+@route('POST', '/foods', login=True)
+def add_food(request):
+    name = request.field('name')
+    if len(name) < 4 or not all(c.isalpha() or c.isspace() for c in name):
+        raise HTTPError(400, "Food name must be at least 4 characters long and contain only letters and spaces.")
+    if not FoodCRUD.add_food(name, _country_id(request), request.field('description', required=False)):
+        raise HTTPError(500, "Failed to add food")
+    return 201, {'message': f"Food '{name}' added"}
+
+
+@route('GET', '/recipes')
+def list_recipes(request):
+    country = request.arg('country')
+    if country:
+        found = CountryCRUD.get_country_by_name(country)
+        if not found:
+            raise HTTPError(404, f"Unknown country: {country}")
+        return {'items': RecipeCRUD.get_recipes_by_country(found['id']), 'next': None}
+    if request.arg('mine'):
+        if request.session is None:
+            raise HTTPError(401, "Log in to list your recipes")
+        return {'items': RecipeCRUD.get_recipes_by_user(session=request.session), 'next': None}
+    user_id = request.int_arg('user_id')
+    if user_id is not None:
+        return {'items': RecipeCRUD.get_recipes_by_user(user_id), 'next': None}
+    return _page(request, RecipeCRUD.get_all_recipes)
+
+
+@route('GET', '/recipes/{recipe_id}')
+def show_recipe(request, recipe_id):
+    recipe = RecipeCRUD.get_recipe_details(recipe_id)
+    if not recipe:
+        raise HTTPError(404, "Recipe not found")
+    return recipe
+
+
+@route('POST', '/recipes', login=True)
+def add_recipe(request):
+    recipe, ingredients, error = validate_record(request.body)
+    if error:
+        raise HTTPError(400, error)
+    country = CountryCRUD.get_country_by_name(recipe.pop('country'))
+    if not country:
+        raise HTTPError(400, "Unknown country")
+    recipe['country_id'] = country['id']
+    recipe_id = RecipeCRUD.add_recipe_with_ingredients(recipe, ingredients, session=request.session)
+    if not recipe_id:
+        raise HTTPError(500, "Failed to add recipe")
+    return 201, {'id': recipe_id}
+
+
+@route('DELETE', '/recipes/{recipe_id}', login=True)
+def delete_recipe(request, recipe_id):
+    if not RecipeCRUD.delete_recipe(recipe_id, session=request.session):
+        raise HTTPError(404, "Recipe not found or not yours")
+    return 204, None
+
+
+@route('POST', '/recipes/{recipe_id}/ingredients', login=True)
+def add_recipe_ingredient(request, recipe_id):
+    recipe = RecipeCRUD.get_recipe_details(recipe_id)
+    if not recipe or recipe.get('user_id') != request.session.user_id:
+        raise HTTPError(404, "Recipe not found or not yours")
+    name = request.field('name')
+    quantity = request.field('quantity')
+    error = validation.validate_ingredient_name(name) or validation.validate_quantity(quantity)
+    if error:
+        raise HTTPError(400, error)
+    ingredient_id = IngredientCRUD.add_ingredient(name)
+    if not ingredient_id or not RecipeCRUD.add_ingredient_to_recipe(
+            recipe_id, ingredient_id, quantity, request.field('unit', required=False), session=request.session):
+        raise HTTPError(500, "Failed to add ingredient")
+    return 201, {'ingredient_id': ingredient_id}
+
+
+@route('GET', '/ingredients')
+def list_ingredients(request):
+    return _page(request, IngredientCRUD.get_all_ingredients)
+
+
+@route('POST', '/ingredients', login=True)
+def add_ingredient(request):
+    name = request.field('name')
+    error = validation.validate_ingredient_name(name)
+    if error:
+        raise HTTPError(400, error)
+    ingredient_id = IngredientCRUD.add_ingredient(name)
+    if not ingredient_id:
+        raise HTTPError(500, "Failed to add ingredient")
+    return 201, {'id': ingredient_id}
+
+
+@route('GET', '/search')
+def search(request):
+    text = request.arg('q', '').strip()
+    if not text:
+        raise HTTPError(400, "'q' is required")
+    kind = request.arg('kind')
+    if kind not in (None, 'recipe', 'food'):
+        raise HTTPError(400, "'kind' must be recipe or food")
+    limit = max(1, min(request.int_arg('limit', 20), MAX_PAGE_SIZE))
+    return {'items': SearchCRUD.search(text, limit=limit, kinds=[kind] if kind else None)}
+
+
+@route('GET', '/cook')
+def what_can_i_cook(request):
+    have = [name.strip() for name in request.arg('have', '').split(',') if name.strip()]
+    if not have:
+        raise HTTPError(400, "'have' is required, e.g. ?have=rice,tomato")
+    limit = max(1, min(request.int_arg('limit', 20), MAX_PAGE_SIZE))
+    matches, unknown = PantryMatchCRUD.what_can_i_cook(have, request.int_arg('max_missing'), limit)
+    return {'items': matches, 'unknown': unknown}
+
+
+class PantryRequestHandler(BaseHTTPRequestHandler):
+    """Routes one connection's requests to the handlers above"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PantryVault'
+    # Idle keep-alive connections give their worker back after this many seconds
+    timeout = Config.SERVER_IDLE_TIMEOUT
+    # Headers and body are written separately; without this each small
+    # response waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    # Answered with a JSON 405 rather than the default HTML 501
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot carry another request
+            self.close_connection = True
+            if length < 0:
+                raise HTTPError(400, "Content-Length must be a non-negative integer")
+            raise HTTPError(413, "Request body too large")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return body
+
+    def _token(self):
+        header = self.headers.get('Authorization', '')
+        scheme, _, token = header.partition(' ')
+        return token.strip() if scheme.lower() == 'bearer' else None
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        headers = {}
+        try:
+            # Read the body first so the connection stays usable after an error
+            body = self._read_body()
+            path = url.path.rstrip('/') or '/'
+            allowed = []
+            for route_method, regex, handler, needs_login, name in _ROUTES:
+                match = regex.match(path)
+                if match:
+                    if route_method == method:
+                        break
+                    allowed.append(route_method)
+            else:
+                if allowed:
+                    raise HTTPError(405, f"{method} not allowed on {url.path}; use {', '.join(allowed)}")
+                raise HTTPError(404, f"No route for {method} {url.path}")
+
+            token = self._token()
+            session = self.server.sessions.get(token) if token else None
+            if needs_login and session is None:
+                raise HTTPError(401, "Log in first: POST /sessions, then send 'Authorization: Bearer <token>'")
+
+            request = Request(self.server, method, url.path, parse_qs(url.query), body, token, session,
+                              self.client_address[0])
+            params = {key: int(value) for key, value in match.groupdict().items()}
+            # Writes run every statement on one connection instead of a checkout each
+            with query_stats.action(name), (session.lease() if needs_login else nullcontext()):
+                result = handler(request, **params)
+            status, payload = result if isinstance(result, tuple) else (200, result)
+        except HTTPError as e:
+            status, payload = e.status, {'error': e.message}
+        except LoginThrottled as e:
+            status, payload = 429, {'error': str(e)}
+            headers['Retry-After'] = str(e.retry_after)
+        except PoolTimeout as e:
+            status, payload = 503, {'error': str(e)}
+        except Exception as e:
+            self.log_error("Unhandled error for %s %s: %r", method, self.path, e)
+            status, payload = 500, {'error': "Internal server error"}
+        self._send(status, payload, headers)
+
+    def _send(self, status, payload, headers=None):
+        data = b'' if payload is None else json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        # Hand the worker to a waiting connection instead of idling on this one
+        if self.close_connection or self.server.has_waiting_connections():
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+
+class PantryHTTPServer(HTTPServer):
+    """HTTPServer that hands each accepted connection to a fixed pool of worker threads"""
+
+    def __init__(self, address, workers=None, access_log=False, sessions=None):
+        self.workers = max(1, int(workers or Config.SERVER_WORKERS))
+        self.access_log = access_log
+        self.sessions = sessions or SessionStore()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pantry-http')
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+        super().__init__(address, PantryRequestHandler)
+
+    def has_waiting_connections(self):
+        return self._waiting > 0
+
+    def process_request(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting += 1
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def service_actions(self):
+        self.sessions.purge()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def serve(host=None, port=None, workers=None, access_log=False):
+    """Run the server until interrupted"""
+    host = host or Config.SERVER_HOST
+    port = Config.SERVER_PORT if port is None else port
+    server = PantryHTTPServer((host, port), workers, access_log)
+    print(f"Serving the Pantry API on http://{host}:{server.server_port} "
+          f"with {server.workers} workers (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping the server...")
+    finally:
+        server.server_close()
+    return True
@@ -0,0 +1,85 @@
+"""
+Input validation rules shared by the interactive CLI and bulk import.
+
+Each validator takes an already stripped string and returns an error
+message, or None when the value is acceptable.
+"""
+
+
+def _letters_and_spaces(value):
+    return all(c.isalpha() or c.isspace() for c in value)
+
+
+def validate_recipe_name(name):
+    """Validate a recipe name"""
+    if not name:
+        return "Recipe name is required."
+    if len(name) < 4:
+        return "Recipe name must be at least 4 characters long."
+    if name.isdigit():
+        return "Recipe name cannot be only numbers."
+    if name[0].isdigit():
+        return "Recipe name cannot start with a number."
+    if not _letters_and_spaces(name):
+        return "Recipe name must contain only letters and spaces."
+    return None
+
+
+def validate_country_name(name):
+    """Validate a country name"""
+    if not name:
+        return "Country name is required."
+    if not _letters_and_spaces(name):
+        return "Country name must contain only letters and spaces."
+    return None
+
+
+def validate_instructions(instructions):
+    """Validate recipe instructions"""
+    if not instructions:
+        return "Instructions are required."
+    if instructions.isdigit():
+        return "Instructions cannot be only numbers."
+    if instructions[0].isdigit():
+        return "Instructions cannot start with a number."
+    return None
+
+
+def validate_duration(value, label):
+    """Validate an optional preparation or cooking time"""
+    if value and value.isdigit():
+        return f"{label} cannot be only numbers."
+    return None
+
+
+def validate_servings(value):
+    """Validate an optional positive integer number of servings"""
+    if value and (not value.isdigit() or int(value) <= 0):
+        return "Please enter a valid positive integer for servings."
+    return None
+
+
+def validate_ingredient_name(name):
+    """Validate an ingredient name"""
+    if not name:
+        return "Ingredient name is required."
+    if len(name) < 2:
+        return "Ingredient name must be at least 2 characters long."
+    if name.isdigit():
+        return "Ingredient name cannot be only numbers."
+    if name[0].isdigit():
+        return "Ingredient name cannot start with a number."
+    if not _letters_and_spaces(name):
+        return "Ingredient name must contain only letters and spaces."
+    return None
+
+
+def validate_quantity(quantity):
+    """Validate a required numeric ingredient quantity"""
+    if not quantity:
+        return "Quantity is required."
+    try:
+        float(quantity)
+    except ValueError:
+        return "Please enter a valid number for quantity."
+    return None
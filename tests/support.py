@@ -0,0 +1,27 @@
+"""
+Shared setup for the tests: point the application at an in-memory SQLite
+database and make its modules importable. Import this before anything
+imports config or the pantry modules.
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['DB_PATH'] = ':memory:'
+os.environ['QUERY_STATS'] = '0'
+os.environ['SLOW_QUERY_LOG'] = ''
+os.environ['SCHEMA_MARKER'] = ''
+for directory in (REPO_ROOT, os.path.join(REPO_ROOT, 'pantry'), os.path.join(REPO_ROOT, 'benchmarks')):
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+
+
+def connect():
+    """Connect the shared vault and bring the schema up to date; returns the vault"""
+    from db import pantry_vault
+    import migrations
+    pantry_vault.connect()
+    migrations.migrate(pantry_vault)
+    return pantry_vault
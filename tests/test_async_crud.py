@@ -0,0 +1,82 @@
+"""
+Tests for the async CRUD wrappers.
+
+    python -m unittest discover -s tests
+"""
+
+import asyncio
+import inspect
+import unittest
+from unittest import mock
+
+import support
+
+from db import Session, pantry_vault
+import async_crud
+import crud
+
+# Sync classes and the async class that mirrors each; search and matching share one
+MIRRORS = [
+    (crud.UserCRUD, async_crud.AsyncUserCRUD),
+    (crud.CountryCRUD, async_crud.AsyncCountryCRUD),
+    (crud.FoodCRUD, async_crud.AsyncFoodCRUD),
+    (crud.RecipeCRUD, async_crud.AsyncRecipeCRUD),
+    (crud.IngredientCRUD, async_crud.AsyncIngredientCRUD),
+    (crud.SearchCRUD, async_crud.AsyncSearchCRUD),
+    (crud.PantryMatchCRUD, async_crud.AsyncSearchCRUD),
+]
+
+# Left out on purpose, as the async_crud docstring explains
+NOT_MIRRORED = ('iter_all_', 'display_', 'index_', 'unindex_', 'add_recipe_text', 'add_recipe_ingredients',
+                'rebuild_index', 'ensure_index', 'is_active')
+
+
+def public_methods(cls):
+    return {name for name, value in vars(cls).items()
+            if isinstance(value, staticmethod) and not name.startswith('_')}
+
+
+class AsyncSurfaceTest(unittest.TestCase):
+
+    def test_every_data_method_has_an_async_version(self):
+        for sync, wrapper in MIRRORS:
+            expected = {name for name in public_methods(sync) if not name.startswith(NOT_MIRRORED)}
+            with self.subTest(cls=sync.__name__):
+                missing = expected - public_methods(wrapper)
+                self.assertEqual(missing, set())
+                for name in expected:
+                    self.assertTrue(inspect.iscoroutinefunction(getattr(wrapper, name)), name)
+
+
+class AsyncCallTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+
+    def test_session_methods_skip_the_thread_pool(self):
+        session = Session(pantry_vault, {'id': 1, 'user_name': 'cook'})
+
+        async def use_session():
+            user = await async_crud.AsyncUserCRUD.get_current_user(session)
+            await async_crud.AsyncUserCRUD.logout_user(session)
+            return user
+
+        with mock.patch.object(async_crud.async_pantry_vault, 'run') as run:
+            self.assertEqual(asyncio.run(use_session())['user_name'], 'cook')
+        run.assert_not_called()
+        self.assertFalse(session)
+
+    def test_recipes_by_country(self):
+        pantry_vault.execute_update("DELETE FROM recipe_ingredients")
+        pantry_vault.execute_update("DELETE FROM recipes")
+        if crud.CountryCRUD.get_country_by_name('Peru') is None:
+            crud.CountryCRUD.add_country('Peru')
+        peru = crud.CountryCRUD.get_country_by_name('Peru')['id']
+        crud.RecipeCRUD.add_recipe('Ceviche', peru, 'Cure')
+        recipes = asyncio.run(async_crud.AsyncRecipeCRUD.get_recipes_by_country(peru))
+        self.assertEqual([recipe['name'] for recipe in recipes], ['Ceviche'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Login throttling and verification cache tests.
+
+    python -m unittest discover -s tests
+"""
+
+import unittest
+from unittest import mock
+
+import support
+
+from config import Config
+from db import pantry_vault
+from cache import TTLCache
+import auth
+from auth import Authenticator, LoginThrottled, RateLimiter
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LoginThrottledTest(unittest.TestCase):
+
+    def test_retry_after_is_whole_seconds(self):
+        self.assertEqual(LoginThrottled(0.2).retry_after, 1)
+        self.assertEqual(LoginThrottled(9.1).retry_after, 10)
+
+    def test_endless_wait_is_capped(self):
+        self.assertEqual(LoginThrottled(float('inf')).retry_after, auth.MAX_RETRY_AFTER)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(auth.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_wait(self):
+        limiter = RateLimiter(burst=2, per_minute=6)
+        self.assertEqual(limiter.acquire('a'), 0)
+        self.assertEqual(limiter.acquire('a'), 0)
+        self.assertAlmostEqual(limiter.acquire('a'), 10.0)
+        # Other keys have their own bucket
+        self.assertEqual(limiter.acquire('b'), 0)
+
+    def test_tokens_refill_over_time(self):
+        limiter = RateLimiter(burst=1, per_minute=6)
+        limiter.acquire('a')
+        self.clock.now += 5
+        self.assertAlmostEqual(limiter.acquire('a'), 5.0)
+        self.clock.now += 5
+        self.assertEqual(limiter.acquire('a'), 0)
+
+    def test_no_refill_rate_waits_forever(self):
+        limiter = RateLimiter(burst=1, per_minute=0)
+        limiter.acquire('a')
+        self.assertEqual(limiter.acquire('a'), float('inf'))
+
+    def test_refund_returns_the_token(self):
+        limiter = RateLimiter(burst=1, per_minute=0)
+        self.assertEqual(limiter.acquire('a'), 0)
+        limiter.refund('a')
+        self.assertEqual(limiter.acquire('a'), 0)
+
+    def test_refund_never_exceeds_the_burst(self):
+        limiter = RateLimiter(burst=1, per_minute=0)
+        limiter.acquire('a')
+        limiter.refund('a')
+        limiter.refund('a')
+        self.assertEqual(limiter.acquire('a'), 0)
+        self.assertNotEqual(limiter.acquire('a'), 0)
+
+    def test_least_recently_used_keys_are_dropped(self):
+        limiter = RateLimiter(burst=1, per_minute=0, max_keys=2)
+        for key in ('a', 'b', 'c'):
+            limiter.acquire(key)
+        self.assertEqual(len(limiter), 2)
+        # 'a' was forgotten and starts again with a full bucket
+        self.assertEqual(limiter.acquire('a'), 0)
+        self.assertNotEqual(limiter.acquire('c'), 0)
+
+
+class AuthenticatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+        with mock.patch.object(Config, 'PASSWORD_ITERATIONS', 1000):
+            pantry_vault.execute_update("DELETE FROM users WHERE user_name = %s", ('auth_cook',))
+            pantry_vault.register_user('auth_cook', 'auth_cook@example.com', 'secret')
+
+    def make(self, user_burst=3, source_burst=10):
+        return Authenticator(
+            pantry_vault, cache=TTLCache(max_entries=16, ttl=60),
+            users=RateLimiter(user_burst, 0), sources=RateLimiter(source_burst, 0)
+        )
+
+    def test_given_limiters_are_used(self):
+        users, sources = RateLimiter(1, 0), RateLimiter(1, 0)
+        authenticator = Authenticator(pantry_vault, users=users, sources=sources)
+        self.assertIs(authenticator.users, users)
+        self.assertIs(authenticator.sources, sources)
+
+    def test_second_login_is_served_from_the_cache(self):
+        authenticator = self.make()
+        with mock.patch.object(pantry_vault, 'open_session', wraps=pantry_vault.open_session) as open_session:
+            first = authenticator.authenticate('auth_cook', 'secret')
+            second = authenticator.authenticate('auth_cook', 'secret')
+        self.assertEqual(open_session.call_count, 1)
+        self.assertEqual(first.user, second.user)
+        stats = authenticator.stats()
+        self.assertEqual((stats['cache_hits'], stats['db_queries'], stats['succeeded']), (1, 1, 2))
+
+    def test_failures_are_not_cached(self):
+        authenticator = self.make()
+        self.assertIsNone(authenticator.authenticate('auth_cook', 'wrong'))
+        self.assertIsNone(authenticator.authenticate('auth_cook', 'wrong'))
+        self.assertEqual(authenticator.stats()['db_queries'], 2)
+
+    def test_cache_key_hides_the_password(self):
+        authenticator = self.make()
+        key = authenticator._cache_key('auth_cook', 'secret')
+        self.assertNotIn(b'secret', key)
+        self.assertEqual(key, authenticator._cache_key('auth_cook', 'secret'))
+        self.assertNotEqual(key, authenticator._cache_key('auth_cook', 'secreT'))
+        # The separator keeps name and password from running together
+        self.assertNotEqual(authenticator._cache_key('ab', 'c'), authenticator._cache_key('a', 'bc'))
+        # Each process (here, each Authenticator) has its own key
+        self.assertNotEqual(key, self.make()._cache_key('auth_cook', 'secret'))
+
+    def test_forget_drops_cached_logins(self):
+        authenticator = self.make()
+        authenticator.authenticate('auth_cook', 'secret')
+        authenticator.forget()
+        authenticator.authenticate('auth_cook', 'secret')
+        self.assertEqual(authenticator.stats()['db_queries'], 2)
+
+    def test_failures_wear_down_the_user_bucket(self):
+        authenticator = self.make(user_burst=2)
+        authenticator.authenticate('auth_cook', 'wrong')
+        authenticator.authenticate('AUTH_COOK', 'wrong')
+        with self.assertRaises(LoginThrottled) as raised:
+            authenticator.authenticate('auth_cook', 'secret')
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(authenticator.stats()['throttled_user'], 1)
+
+    def test_successful_logins_refund_their_tokens(self):
+        authenticator = self.make(user_burst=1, source_burst=1)
+        for _ in range(3):
+            self.assertIsNotNone(authenticator.authenticate('auth_cook', 'secret', source='10.0.0.1'))
+
+    def test_throttled_source_refunds_the_user_token(self):
+        authenticator = self.make(user_burst=1, source_burst=1)
+        authenticator.authenticate('someone', 'wrong', source='10.0.0.1')
+        with self.assertRaises(LoginThrottled):
+            authenticator.authenticate('auth_cook', 'secret', source='10.0.0.1')
+        self.assertEqual(authenticator.stats()['throttled_source'], 1)
+        # The user's token was given back, so another source can still log in
+        self.assertIsNotNone(authenticator.authenticate('auth_cook', 'secret', source='10.0.0.2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
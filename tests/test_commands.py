@@ -0,0 +1,50 @@
+"""
+Scripted command tests against an in-memory SQLite database.
+
+    python -m unittest discover -s tests
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import support
+
+from db import pantry_vault
+import commands
+
+
+class BatchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+
+    def run_batch(self, text):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as handle:
+            handle.write(text)
+        self.addCleanup(os.remove, handle.name)
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            ok = commands.run_batch(argparse.Namespace(file=handle.name, stop_on_error=False))
+        return ok, out.getvalue(), err.getvalue()
+
+    def test_batch_checks_out_one_connection(self):
+        before = pantry_vault.pool_stats()['checkouts']
+        ok, out, err = self.run_batch("countries list --format json\n# comment\n\ningredients list --format json\n")
+        self.assertTrue(ok, err)
+        self.assertIn("Ran 2 commands (0 failed)", err)
+        self.assertEqual(pantry_vault.pool_stats()['checkouts'] - before, 1)
+
+    def test_bad_line_is_reported_and_counted(self):
+        ok, out, err = self.run_batch("countries list --format json\nnonsense\n")
+        self.assertFalse(ok)
+        self.assertIn("line 2:", err)
+        self.assertIn("Ran 2 commands (1 failed)", err)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Country count tests: the counts kept as the catalog changes must match
+what rebuild() computes from scratch.
+
+    python -m unittest discover -s tests
+"""
+
+import unittest
+
+import support
+
+from db import pantry_vault
+from crud import CountryCRUD, FoodCRUD, IngredientCRUD, RecipeCRUD
+import country_stats
+
+
+class CountryStatsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+        pantry_vault.register_user('stats_cook', 'stats_cook@example.com', 'secret')
+        cls.user_id = pantry_vault.execute_query(
+            "SELECT id FROM users WHERE user_name = %s", ('stats_cook',)
+        )[0]['id']
+
+    def setUp(self):
+        # Countries stay, since other tests hold their IDs in the reference cache
+        for table in ('recipe_ingredients', 'food_ingredients', 'recipes', 'foods'):
+            pantry_vault.execute_update(f"DELETE FROM {table}")
+        country_stats.rebuild(pantry_vault)
+
+    def country(self, name):
+        if CountryCRUD.get_country_by_name(name) is None:
+            self.assertTrue(CountryCRUD.add_country(name))
+        return CountryCRUD.get_country_by_name(name)['id']
+
+    def recipe(self, name, country_id, *ingredients):
+        return RecipeCRUD.add_recipe_with_ingredients(
+            {'name': name, 'country_id': country_id, 'instructions': 'Cook', 'user_id': self.user_id},
+            [{'name': ingredient, 'quantity': '1', 'unit': 'cup'} for ingredient in ingredients]
+        )
+
+    def snapshot(self):
+        stats = pantry_vault.execute_query(
+            "SELECT country_id, foods, recipes, ingredients FROM country_stats ORDER BY country_id"
+        )
+        pairs = pantry_vault.execute_query(
+            "SELECT country_id, ingredient_id, uses FROM country_ingredients ORDER BY country_id, ingredient_id"
+        )
+        return ([tuple(row.values()) for row in stats], [tuple(row.values()) for row in pairs])
+
+    def assert_matches_rebuild(self):
+        kept = self.snapshot()
+        self.assertTrue(CountryCRUD.rebuild_stats())
+        self.assertEqual(kept, self.snapshot())
+
+    def test_counts_match_rebuild_after_adds_and_deletes(self):
+        ghana = self.country('Ghana')
+        kenya = self.country('Kenya')
+        self.assertTrue(FoodCRUD.add_food('Kenkey', ghana))
+        self.assertTrue(FoodCRUD.add_food('Ugali', kenya))
+        jollof = self.recipe('Jollof', ghana, 'rice', 'tomato', 'pepper')
+        waakye = self.recipe('Waakye', ghana, 'rice', 'beans')
+        pilau = self.recipe('Pilau', kenya, 'rice', 'cumin', 'cumin')
+        plain = RecipeCRUD.add_recipe('Chapati', kenya, 'Roll', user_id=self.user_id)
+        flour = IngredientCRUD.resolve_ingredient_ids(['flour'])['flour']
+        self.assertTrue(RecipeCRUD.add_ingredient_to_recipe(plain, flour, '2', 'cups'))
+        self.assert_matches_rebuild()
+
+        # Rice stays counted for Ghana through Waakye; tomato and pepper go
+        self.assertEqual(RecipeCRUD.delete_recipes([jollof, pilau], user_id=self.user_id), 2)
+        self.assert_matches_rebuild()
+        overview = {row['name']: (row['foods'], row['recipes'], row['ingredients'])
+                    for row in CountryCRUD.get_country_overview()}
+        self.assertEqual((overview['Ghana'], overview['Kenya']), ((1, 1, 2), (1, 1, 1)))
+
+        self.recipe('Jollof', ghana, 'rice', 'tomato')
+        self.assertEqual(RecipeCRUD.delete_recipes([waakye, plain], user_id=self.user_id), 2)
+        self.assert_matches_rebuild()
+
+    def test_removal_from_a_country_without_a_row_is_ignored(self):
+        ghana = self.country('Ghana')
+        pantry_vault.execute_update("DELETE FROM country_stats")
+        country_stats.count(pantry_vault, ghana, recipes=-1)
+        self.assertEqual(self.snapshot(), ([], []))
+        country_stats.count(pantry_vault, ghana, recipes=1)
+        self.assertEqual(self.snapshot(), ([(ghana, 0, 1, 0)], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
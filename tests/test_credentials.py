@@ -0,0 +1,126 @@
+"""
+Password hashing tests, and the upgrade of old hashes when users log in.
+
+    python -m unittest discover -s tests
+"""
+
+import unittest
+from unittest import mock
+
+import support
+
+from config import Config
+from db import pantry_vault
+import credentials
+
+# Cheap hashes keep the tests fast; the format does not depend on the cost
+ITERATIONS = 1000
+
+
+class CredentialsTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(Config, 'PASSWORD_ITERATIONS', ITERATIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hash_format(self):
+        stored = credentials.hash_password('secret')
+        algorithm, iterations, salt, digest = stored.split('$')
+        self.assertEqual((algorithm, int(iterations)), ('pbkdf2_sha256', ITERATIONS))
+        self.assertEqual(len(credentials._decode(salt)), credentials.SALT_BYTES)
+        self.assertEqual(credentials._decode(digest),
+                         credentials._derive('secret', credentials._decode(salt), ITERATIONS))
+        self.assertTrue(credentials.is_hashed(stored))
+
+    def test_each_hash_has_its_own_salt(self):
+        self.assertNotEqual(credentials.hash_password('secret'), credentials.hash_password('secret'))
+
+    def test_verify_hashed_password(self):
+        stored = credentials.hash_password('secret')
+        self.assertTrue(credentials.verify_password('secret', stored))
+        self.assertFalse(credentials.verify_password('Secret', stored))
+
+    def test_verify_reads_the_cost_from_the_hash(self):
+        stored = credentials.hash_password('secret', iterations=500)
+        self.assertTrue(credentials.verify_password('secret', stored))
+
+    def test_legacy_plain_password(self):
+        self.assertFalse(credentials.is_hashed('secret'))
+        self.assertTrue(credentials.verify_password('secret', 'secret'))
+        self.assertFalse(credentials.verify_password('other', 'secret'))
+        self.assertFalse(credentials.verify_password('', ''))
+        self.assertFalse(credentials.verify_password('', None))
+
+    def test_malformed_hash_is_treated_as_plain(self):
+        self.assertFalse(credentials.is_hashed('pbkdf2_sha256$many$salt$hash'))
+        self.assertFalse(credentials.verify_password('secret', 'pbkdf2_sha256$many$salt$hash'))
+
+    def test_needs_rehash(self):
+        self.assertTrue(credentials.needs_rehash('secret'))
+        self.assertTrue(credentials.needs_rehash(credentials.hash_password('secret', iterations=500)))
+        self.assertFalse(credentials.needs_rehash(credentials.hash_password('secret')))
+
+    def test_verify_unknown_user_hashes_at_the_current_cost(self):
+        with mock.patch.object(credentials, 'verify_password', wraps=credentials.verify_password) as verify:
+            self.assertFalse(credentials.verify_unknown_user('secret'))
+        password, stored = verify.call_args.args
+        self.assertEqual(password, 'secret')
+        self.assertEqual(stored.split('$')[1], str(ITERATIONS))
+
+
+class LoginUpgradeTest(unittest.TestCase):
+    """open_session() verifies in Python and stores a fresh hash when the old one is out of date"""
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+
+    def setUp(self):
+        patcher = mock.patch.object(Config, 'PASSWORD_ITERATIONS', ITERATIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pantry_vault.execute_update("DELETE FROM users WHERE user_name LIKE %s", ('login_%',))
+
+    def add_user(self, name, stored):
+        pantry_vault.execute_update(
+            "INSERT INTO users (user_name, email, password) VALUES (%s, %s, %s)", (name, f"{name}@example.com", stored)
+        )
+
+    def stored(self, name):
+        return pantry_vault.find_user(name)['password']
+
+    def test_register_stores_a_hash(self):
+        ok, _ = pantry_vault.register_user('login_new', 'login_new@example.com', 'secret')
+        self.assertTrue(ok)
+        self.assertTrue(credentials.verify_password('secret', self.stored('login_new')))
+        session = pantry_vault.open_session('login_new', 'secret')
+        self.assertEqual(session.user['user_name'], 'login_new')
+        self.assertNotIn('password', session.user)
+
+    def test_plain_password_is_hashed_on_login(self):
+        self.add_user('login_plain', 'secret')
+        self.assertIsNotNone(pantry_vault.open_session('login_plain', 'secret'))
+        stored = self.stored('login_plain')
+        self.assertTrue(credentials.is_hashed(stored))
+        self.assertFalse(credentials.needs_rehash(stored))
+        self.assertIsNotNone(pantry_vault.open_session('login_plain', 'secret'))
+
+    def test_old_cost_is_upgraded_on_login(self):
+        self.add_user('login_cheap', credentials.hash_password('secret', iterations=500))
+        self.assertIsNotNone(pantry_vault.open_session('login_cheap', 'secret'))
+        self.assertEqual(self.stored('login_cheap').split('$')[1], str(ITERATIONS))
+
+    def test_wrong_password_leaves_the_hash_alone(self):
+        self.add_user('login_wrong', 'secret')
+        self.assertIsNone(pantry_vault.open_session('login_wrong', 'other'))
+        self.assertEqual(self.stored('login_wrong'), 'secret')
+
+    def test_unknown_user_costs_a_verification(self):
+        with mock.patch.object(credentials, 'verify_unknown_user', wraps=credentials.verify_unknown_user) as unknown:
+            self.assertIsNone(pantry_vault.open_session('login_nobody', 'secret'))
+        unknown.assert_called_once_with('secret')
+
+
+if __name__ == '__main__':
+    unittest.main()
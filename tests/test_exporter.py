@@ -0,0 +1,66 @@
+"""
+Export tests against an in-memory SQLite database.
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import support
+
+from db import pantry_vault
+import exporter
+
+
+class ExportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+        pantry_vault.execute_update("INSERT IGNORE INTO countries (name) VALUES (%s), (%s)", ('Kenya', 'Rwanda'))
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def export(self):
+        return exporter.export_vault(self.directory.name, 'jsonl', entities=('countries',), progress=None)
+
+    def test_export_leaves_only_final_files(self):
+        report = self.export()
+        self.assertEqual(os.listdir(self.directory.name), ['countries.jsonl'])
+        with open(report['countries']['path'], encoding='utf-8') as handle:
+            self.assertEqual(len(handle.readlines()), report['countries']['rows'])
+
+    def test_failed_export_keeps_the_previous_file(self):
+        path = self.export()['countries']['path']
+        with open(path, encoding='utf-8') as handle:
+            previous = handle.read()
+
+        def failing_stream(entity, batch_size=None):
+            yield {'id': 1, 'name': 'Partial'}
+            raise ConnectionError("lost the server mid-export")
+
+        with mock.patch.object(exporter, 'iter_entity', failing_stream):
+            with self.assertRaises(ConnectionError):
+                self.export()
+        self.assertEqual(os.listdir(self.directory.name), ['countries.jsonl'])
+        with open(path, encoding='utf-8') as handle:
+            self.assertEqual(handle.read(), previous)
+
+    def test_failed_first_export_leaves_nothing(self):
+        def failing_stream(entity, batch_size=None):
+            raise ConnectionError("no server")
+            yield
+
+        with mock.patch.object(exporter, 'iter_entity', failing_stream):
+            with self.assertRaises(ConnectionError):
+                self.export()
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Tests for the benchmark statistics helpers.
+
+    python -m unittest discover -s tests
+"""
+
+import unittest
+
+import support
+
+from harness import percentile, summarize
+
+
+class PercentileTest(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.50), 50)
+        self.assertEqual(percentile(samples, 0.95), 95)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertEqual(percentile(samples, 1.0), 100)
+
+    def test_small_samples(self):
+        samples = list(range(1, 21))
+        self.assertEqual(percentile(samples, 0.95), 19)
+        self.assertEqual(percentile(samples, 0.99), 20)
+        self.assertEqual(percentile([7], 0.5), 7)
+        self.assertEqual(percentile([1, 2, 3], 0.5), 2)
+
+    def test_bounds(self):
+        self.assertEqual(percentile([], 0.95), 0.0)
+        self.assertEqual(percentile([1, 2, 3], 0.0), 1)
+
+    def test_summary_uses_nearest_rank(self):
+        summary = summarize([n / 1000 for n in range(1, 101)])
+        self.assertAlmostEqual(summary['p99_ms'], 99.0)
+        self.assertAlmostEqual(summary['max_ms'], 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
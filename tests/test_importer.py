@@ -0,0 +1,89 @@
+"""
+Import tests against an in-memory SQLite database.
+
+    python -m pytest tests
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import support
+
+from db import pantry_vault
+import importer
+
+GOOD = '{"name": "Jollof Rice", "country": "Ghana", "instructions": "Simmer", "ingredients": [{"name": "rice", "quantity": "2", "unit": "cups"}]}'
+LATER = '{"name": "Fufu", "country": "Ghana", "instructions": "Pound"}'
+
+
+class JsonLinesImportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+
+    def setUp(self):
+        pantry_vault.execute_update("DELETE FROM recipe_ingredients")
+        pantry_vault.execute_update("DELETE FROM recipes")
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_import(self, *lines):
+        path = os.path.join(self.directory.name, 'recipes.jsonl')
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(lines) + '\n')
+        out = io.StringIO()
+        summary = importer.RecipeImporter(chunk_size=2, out=out).run(path)
+        return summary, out.getvalue()
+
+    def progress_rows(self):
+        return pantry_vault.execute_query("SELECT name, rows_done, imported FROM import_progress")
+
+    def imported_names(self):
+        return sorted(row['name'] for row in pantry_vault.execute_query("SELECT name FROM recipes"))
+
+    def test_invalid_json_line_is_rejected(self):
+        summary, log = self.run_import(GOOD, 'not json at all', LATER)
+        self.assertEqual((summary['imported'], summary['rejected']), (2, 1))
+        self.assertIn("Row 2 skipped: Not valid JSON", log)
+        self.assertEqual(self.imported_names(), ['Fufu', 'Jollof Rice'])
+
+    def test_non_object_record_is_rejected(self):
+        summary, log = self.run_import(GOOD, '["a list"]', '42', LATER)
+        self.assertEqual((summary['imported'], summary['rejected']), (2, 2))
+        self.assertIn("Row 2 skipped: Each record must be an object", log)
+        self.assertIn("Row 3 skipped: Each record must be an object", log)
+        self.assertEqual(self.imported_names(), ['Fufu', 'Jollof Rice'])
+
+
+    def test_resume_after_a_crash_imports_each_row_once(self):
+        lines = [f'{{"name": "{name} Stew", "country": "Kenya", "instructions": "Simmer"}}'
+                 for name in ('Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon')]
+        save = importer.RecipeImporter._save_checkpoint
+        calls = []
+
+        def crash_on_second_chunk(self, state):
+            save(self, state)
+            calls.append(state['rows_done'])
+            if len(calls) == 2:
+                raise KeyboardInterrupt("killed before the chunk committed")
+
+        with mock.patch.object(importer.RecipeImporter, '_save_checkpoint', crash_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import(*lines)
+        self.assertEqual(self.imported_names(), ['Alpha Stew', 'Beta Stew'])
+        self.assertEqual([(row['rows_done'], row['imported']) for row in self.progress_rows()], [(2, 2)])
+
+        summary, log = self.run_import(*lines)
+        self.assertIn("Resuming import after row 2", log)
+        self.assertEqual(summary['imported'], 5)
+        self.assertEqual(self.imported_names(), sorted(f"{name} Stew" for name in
+                                                       ('Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon')))
+        self.assertEqual(self.progress_rows(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+ConnectionPool tests with stand-in connections.
+
+    python -m unittest discover -s tests
+"""
+
+import threading
+import time
+import unittest
+
+import support
+
+from db import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def make_pool(self, size=1, timeout=2.0, connect=FakeConnection):
+        return ConnectionPool(connect, size=size, timeout=timeout, check_fn=lambda conn: not conn.closed)
+
+    def acquire_in_thread(self, pool):
+        """Start a thread blocked on acquire(); returns (thread, result dict)"""
+        result = {}
+
+        def worker():
+            started = time.monotonic()
+            try:
+                result['conn'] = pool.acquire()
+            except PoolTimeout as e:
+                result['error'] = e
+            result['waited'] = time.monotonic() - started
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        # Give the worker time to find the pool full and start waiting
+        time.sleep(0.1)
+        return thread, result
+
+    def test_reuses_released_connections(self):
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+
+    def test_times_out_when_full(self):
+        pool = self.make_pool(timeout=0.1)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_wakes_when_a_connection_is_returned(self):
+        pool = self.make_pool()
+        conn = pool.acquire()
+        thread, result = self.acquire_in_thread(pool)
+        pool.release(conn)
+        thread.join()
+        self.assertIs(result.get('conn'), conn)
+
+    def test_waiter_wakes_when_a_connection_is_discarded(self):
+        pool = self.make_pool()
+        conn = pool.acquire()
+        thread, result = self.acquire_in_thread(pool)
+        pool.release(conn, discard=True)
+        thread.join()
+        self.assertNotIn('error', result)
+        self.assertIsNot(result['conn'], conn)
+        self.assertTrue(conn.closed)
+        self.assertLess(result['waited'], 1.0)
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_waiter_wakes_when_a_connect_fails(self):
+        gate = threading.Event()
+        attempts = []
+
+        def connect():
+            attempts.append(1)
+            if len(attempts) == 1:
+                gate.wait()
+                raise ConnectionError("refused")
+            return FakeConnection()
+
+        pool = self.make_pool(connect=connect)
+        failing = threading.Thread(target=lambda: self.assertRaises(ConnectionError, pool.acquire))
+        failing.start()
+        time.sleep(0.05)
+        thread, result = self.acquire_in_thread(pool)
+        gate.set()
+        failing.join()
+        thread.join()
+        self.assertNotIn('error', result)
+        self.assertLess(result['waited'], 1.0)
+
+    def test_discards_under_contention_keep_the_pool_usable(self):
+        pool = self.make_pool(size=2, timeout=5.0)
+        errors = []
+
+        def worker():
+            try:
+                for n in range(50):
+                    conn = pool.acquire()
+                    pool.release(conn, discard=n % 3 == 0)
+            except PoolTimeout as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = pool.stats()
+        self.assertLessEqual(stats['open'], 2)
+        self.assertEqual(stats['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Grid rendering tests, checked against tabulate's "grid" format.
+
+    python -m unittest discover -s tests
+"""
+
+import unittest
+
+import support
+
+from tabulate import tabulate
+
+from cache import data_versions
+from render import grid_lines, render_grid, render_table, _width
+
+HEADERS = ["ID", "Name", "Servings"]
+
+CASES = {
+    'plain': [[1, "Jollof Rice", 4], [22, "Fufu", None]],
+    'decimals': [[1, "Ugali", 2.5], [2, "Sukuma", 10], [3, "Chapati", "12.25"]],
+    'mixed column': [[1, "Pilau", "4"], [2, "Matoke", "two"]],
+    'multiline cells': [[1, "Kelp Stew\nwith salt", 2], [2, "Fish", "3"], [3, "A\nB\nC", None]],
+    'empty': [],
+}
+
+
+class GridTest(unittest.TestCase):
+
+    def test_matches_tabulate(self):
+        for name, rows in CASES.items():
+            with self.subTest(case=name):
+                self.assertEqual(render_grid(HEADERS, rows), tabulate(rows, headers=HEADERS, tablefmt='grid'))
+
+    def test_multiline_header_matches_tabulate(self):
+        rows = [["a\nbb", "x"], ["c", "long\ny"]]
+        headers = ["Name\nTwo", "N"]
+        self.assertEqual(render_grid(headers, rows), tabulate(rows, headers=headers, tablefmt='grid'))
+
+    def test_wide_characters_keep_columns_aligned(self):
+        rows = [[1, "日本語のレシピ", 2], [2, "Rice", 3], [3, "Crème brûlée", 4]]
+
+        def separator_columns(line):
+            return [_width(line[:index]) for index, char in enumerate(line) if char in '+|']
+
+        lines = render_grid(HEADERS, rows).split("\n")
+        for line in lines:
+            self.assertEqual(separator_columns(line), separator_columns(lines[0]), line)
+        self.assertEqual(_width("日本語"), 6)
+        self.assertEqual(_width("Crème"), 5)
+
+    def test_fixed_widths_clip_each_line(self):
+        lines = list(grid_lines(["Name", "N"], [["abcdefgh\nxy", 1], ["日本語日本", 2]], widths=[5, 3]))
+        self.assertEqual(lines[3:5], ["| abcde |   1 |", "| xy    |     |"])
+        self.assertEqual(lines[6], "| 日本  |   2 |")
+        self.assertEqual(len({_width(line) for line in lines}), 1)
+
+
+class RenderCacheTest(unittest.TestCase):
+
+    def render(self, records):
+        return render_table('test', ('recipes',), records, ["ID", "Name"], lambda record: [record['id'], record['name']])
+
+    def test_rows_changed_elsewhere_are_rendered_again(self):
+        version = data_versions.version('recipes')
+        first = self.render([{'id': 1, 'name': "Fufu"}])
+        # Same IDs and data version, as after an edit made by another process
+        second = self.render([{'id': 1, 'name': "Banku"}])
+        self.assertEqual(data_versions.version('recipes'), version)
+        self.assertIn("Fufu", first)
+        self.assertIn("Banku", second)
+
+    def test_unchanged_rows_come_from_the_cache(self):
+        records = [{'id': 2, 'name': "Ugali"}]
+        self.assertIs(self.render(records), self.render(list(records)))
+
+
+if __name__ == '__main__':
+    unittest.main()
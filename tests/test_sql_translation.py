@@ -0,0 +1,92 @@
+"""
+Tests for rewriting the MySQL statements the code base writes into SQLite syntax.
+
+    python -m unittest discover -s tests
+"""
+
+import unittest
+
+import support
+
+from db import pantry_vault, _mysql_to_sqlite
+
+REWRITES = [
+    ("SELECT id FROM recipes WHERE name = %s AND user_id = %s",
+     "SELECT id FROM recipes WHERE name = ? AND user_id = ?"),
+    ("SELECT LAST_INSERT_ID()", "SELECT last_insert_rowid()"),
+    ("select last_insert_id()", "select last_insert_rowid()"),
+    ("CREATE TABLE t (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(50))",
+     "CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(50))"),
+    ("INSERT IGNORE INTO ingredients (name) VALUES (%s), (%s)",
+     "INSERT INTO ingredients (name) VALUES (?), (?) ON CONFLICT DO NOTHING"),
+    ("insert ignore into ingredients (name) VALUES (%s);",
+     "INSERT INTO ingredients (name) VALUES (?) ON CONFLICT DO NOTHING"),
+    ("INSERT INTO totals (k, n, m) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n), m = VALUES(m)",
+     "INSERT INTO totals (k, n, m) VALUES (?, ?, ?) ON CONFLICT (k) DO UPDATE SET n = n + excluded.n, m = excluded.m"),
+    ("INSERT INTO pairs (a, b, n) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)",
+     "INSERT INTO pairs (a, b, n) VALUES (?, ?, ?) ON CONFLICT (a, b) DO UPDATE SET n = n + excluded.n"),
+    ("INSERT INTO totals (k, n, m) VALUES (%s, %s, %s) AS new ON DUPLICATE KEY UPDATE n = n + new.n, m = new.m",
+     "INSERT INTO totals (k, n, m) VALUES (?, ?, ?) ON CONFLICT (k) DO UPDATE SET n = n + excluded.n, m = excluded.m"),
+    ("INSERT INTO pairs (a, b, n) VALUES (%s, %s, %s) as row_ ON DUPLICATE KEY UPDATE n = n + row_.n",
+     "INSERT INTO pairs (a, b, n) VALUES (?, ?, ?) ON CONFLICT (a, b) DO UPDATE SET n = n + excluded.n"),
+]
+
+
+class TranslationTest(unittest.TestCase):
+
+    def test_rewrites(self):
+        for mysql, sqlite in REWRITES:
+            with self.subTest(mysql=mysql):
+                self.assertEqual(_mysql_to_sqlite(mysql), sqlite)
+
+    def test_plain_statements_are_unchanged(self):
+        query = "UPDATE recipes SET name = 'VALUES(x)' WHERE id = 1"
+        self.assertEqual(_mysql_to_sqlite(query), query)
+
+
+class RoundTripTest(unittest.TestCase):
+    """The rewritten statements run on SQLite and do what MySQL would"""
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+        pantry_vault.execute_ddl(
+            "CREATE TABLE IF NOT EXISTS translation_items (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(50) UNIQUE)"
+        )
+        pantry_vault.execute_ddl(
+            "CREATE TABLE IF NOT EXISTS translation_pairs (a INT, b INT, n INT NOT NULL, PRIMARY KEY (a, b))"
+        )
+
+    def setUp(self):
+        pantry_vault.execute_update("DELETE FROM translation_items")
+        pantry_vault.execute_update("DELETE FROM translation_pairs")
+
+    def test_auto_increment_and_last_insert_id(self):
+        with pantry_vault.lease():
+            first = pantry_vault.execute_insert("INSERT INTO translation_items (name) VALUES (%s)", ('a',))
+            rows = pantry_vault.execute_query("SELECT LAST_INSERT_ID() AS id")
+        self.assertEqual(rows[0]['id'], first)
+
+    def test_insert_ignore_skips_duplicates(self):
+        pantry_vault.execute_update("INSERT INTO translation_items (name) VALUES (%s)", ('a',))
+        added = pantry_vault.execute_update("INSERT IGNORE INTO translation_items (name) VALUES (%s), (%s)", ('a', 'b'))
+        self.assertEqual(added, 1)
+        names = [row['name'] for row in pantry_vault.execute_query("SELECT name FROM translation_items ORDER BY name")]
+        self.assertEqual(names, ['a', 'b'])
+
+    def test_upsert_adds_to_the_existing_row(self):
+        for query in (
+            "INSERT INTO translation_pairs (a, b, n) VALUES (%s, %s, %s) AS new ON DUPLICATE KEY UPDATE n = n + new.n",
+            "INSERT INTO translation_pairs (a, b, n) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)",
+        ):
+            with self.subTest(query=query):
+                pantry_vault.execute_update("DELETE FROM translation_pairs")
+                pantry_vault.execute_update(query, (1, 2, 3))
+                pantry_vault.execute_update(query, (1, 2, 4))
+                pantry_vault.execute_update(query, (1, 3, 5))
+                rows = pantry_vault.execute_query("SELECT a, b, n FROM translation_pairs ORDER BY b")
+                self.assertEqual([(row['a'], row['b'], row['n']) for row in rows], [(1, 2, 7), (1, 3, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Transaction, savepoint and streaming tests against an in-memory SQLite database.
+
+    python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import unittest
+
+import support
+
+from db import pantry_vault
+
+
+class TransactionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        support.connect()
+        pantry_vault.execute_ddl("CREATE TABLE IF NOT EXISTS txn_items (name VARCHAR(50) PRIMARY KEY)")
+
+    def setUp(self):
+        pantry_vault.execute_update("DELETE FROM txn_items")
+
+    def add(self, name):
+        return pantry_vault.execute_update("INSERT INTO txn_items (name) VALUES (%s)", (name,))
+
+    def names(self):
+        return sorted(row['name'] for row in pantry_vault.execute_query("SELECT name FROM txn_items"))
+
+    def test_block_commits_at_the_end(self):
+        with pantry_vault.transaction():
+            self.add('a')
+            self.add('b')
+        self.assertEqual(self.names(), ['a', 'b'])
+
+    def test_error_rolls_back_and_propagates(self):
+        with self.assertRaises(ValueError):
+            with pantry_vault.transaction():
+                self.add('a')
+                raise ValueError("stop")
+        self.assertEqual(self.names(), [])
+        self.assertFalse(pantry_vault.in_transaction())
+
+    def test_nested_block_rolls_back_only_its_own_work(self):
+        with pantry_vault.transaction():
+            self.add('outer')
+            with self.assertRaises(ValueError):
+                with pantry_vault.transaction():
+                    self.add('inner')
+                    with pantry_vault.transaction():
+                        self.add('innermost')
+                    raise ValueError("undo inner")
+            with pantry_vault.transaction():
+                self.add('second')
+        self.assertEqual(self.names(), ['outer', 'second'])
+
+    def test_savepoint_rollback_drops_its_commit_callbacks(self):
+        ran = []
+        with pantry_vault.transaction():
+            pantry_vault.on_commit(lambda: ran.append('outer'))
+            with self.assertRaises(ValueError):
+                with pantry_vault.transaction():
+                    pantry_vault.on_commit(lambda: ran.append('inner'))
+                    raise ValueError("undo inner")
+            with pantry_vault.transaction():
+                pantry_vault.on_commit(lambda: ran.append('kept'))
+            self.assertEqual(ran, [])
+        self.assertEqual(ran, ['outer', 'kept'])
+
+    def test_callbacks_are_dropped_on_rollback(self):
+        ran = []
+        with self.assertRaises(ValueError):
+            with pantry_vault.transaction():
+                pantry_vault.on_commit(lambda: ran.append('never'))
+                raise ValueError("stop")
+        self.assertEqual(ran, [])
+
+    def test_on_commit_outside_a_transaction_runs_now(self):
+        ran = []
+        pantry_vault.on_commit(lambda: ran.append('now'))
+        self.assertEqual(ran, ['now'])
+
+    def test_batch_commit_keeps_earlier_batches(self):
+        ran = []
+        with self.assertRaises(ValueError):
+            with pantry_vault.transaction() as txn:
+                self.add('first')
+                pantry_vault.on_commit(lambda: ran.append('first'))
+                txn.commit()
+                self.assertEqual(ran, ['first'])
+                self.add('second')
+                raise ValueError("stop")
+        self.assertEqual(self.names(), ['first'])
+        self.assertEqual(txn.commits, 1)
+
+    def test_commit_inside_a_nested_block_is_refused(self):
+        with pantry_vault.transaction() as txn:
+            with self.assertRaises(RuntimeError):
+                with pantry_vault.transaction():
+                    txn.commit()
+
+    def test_errors_raise_inside_a_transaction(self):
+        self.add('dup')
+        with self.assertRaises(Exception):
+            with pantry_vault.transaction():
+                self.add('dup')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(self.add('dup'), 0)
+        self.assertIn("Update error", output.getvalue())
+
+    def test_stream_inside_a_transaction_sees_its_rows(self):
+        with pantry_vault.transaction():
+            self.add('pending')
+            in_use = pantry_vault.pool_stats()['in_use']
+            rows = pantry_vault.iter_query("SELECT name FROM txn_items")
+            self.assertEqual([row['name'] for row in rows], ['pending'])
+            self.assertEqual(pantry_vault.pool_stats()['in_use'], in_use)
+
+    def test_stream_inside_a_lease_uses_the_leased_connection(self):
+        self.add('a')
+        with pantry_vault.lease():
+            in_use = pantry_vault.pool_stats()['in_use']
+            stream = pantry_vault.iter_query("SELECT name FROM txn_items")
+            self.assertEqual(next(stream)['name'], 'a')
+            self.assertEqual(pantry_vault.pool_stats()['in_use'], in_use)
+            # Another statement can run on the connection while the stream is open
+            self.add('b')
+            self.assertEqual(list(stream), [])
+            stream.close()
+        self.assertEqual(self.names(), ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()